@@ -1,16 +1,26 @@
 from datetime import datetime, timedelta
-from typing import Optional
+from collections import OrderedDict
+from typing import Optional, Tuple
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status, Header
 from fastapi.security import OAuth2PasswordBearer
 from sqlmodel import Session, select
 import os
+import threading
+import time
+
+from .database import get_session
+from .models import User, UserContext, ScanThresholds
+from .security_2fa import get_totp_instance
 
 # Configuration (should be in .env ideally)
 SECRET_KEY = os.getenv("JWT_SECRET", "super-secret-key-change-me")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
+# Seconds a resolved user (id, limits, API key) is reused before it is read again
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "60"))
+CACHE_SIZE = 4096
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
@@ -31,18 +41,52 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+_token_cache: "OrderedDict[str, Tuple[float, Optional[str]]]" = OrderedDict()
+_user_cache: "OrderedDict[str, Tuple[float, UserContext]]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+def _cache_get(cache: OrderedDict, key: str):
+    with _cache_lock:
+        entry = cache.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.time():
+            del cache[key]
+            return None
+        cache.move_to_end(key)
+        return entry
+
+def _cache_put(cache: OrderedDict, key: str, expires: float, value):
+    with _cache_lock:
+        cache[key] = (expires, value)
+        cache.move_to_end(key)
+        while len(cache) > CACHE_SIZE:
+            cache.popitem(last=False)
+
+def decode_token_subject(token: str) -> Optional[str]:
+    """JWT subject; verified tokens are cached until their own expiry."""
+    cached = _cache_get(_token_cache, token)
+    if cached is not None:
+        return cached[1]
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        username = payload.get("sub")
+        expires = float(payload["exp"]) if payload.get("exp") else None
+    except (JWTError, ValueError):
+        # ValueError: an `exp` claim that is not a number
+        return None
+    if username and expires:
+        _cache_put(_token_cache, token, expires, username)
+    return username
+
 async def get_current_user_username(token: str = Depends(oauth2_scheme)):
     """
     Standard JWT auth. Falls back to 'guest' if in stateless mode
     and validate_master_totp would pass.
     """
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username:
-            return username
-    except Exception:
-        pass
+    username = decode_token_subject(token)
+    if username:
+        return username
     
     # If JWT fails, we check if we are in stateless mode (handled by routers)
     # Returning None here allows the router to decide.
@@ -57,9 +101,7 @@ def validate_master_totp(x_totp_code: str = Header(None)):
     if not master_secret:
         return True
         
-    import pyotp
-    totp = pyotp.TOTP(master_secret)
-    if x_totp_code and totp.verify(x_totp_code):
+    if x_totp_code and get_totp_instance(master_secret).verify(x_totp_code):
         return True
     
     raise HTTPException(
@@ -68,12 +110,7 @@ def validate_master_totp(x_totp_code: str = Header(None)):
         headers={"WWW-Authenticate": "TOTP"},
     )
 
-def get_guest_user(is_valid: bool = Depends(validate_master_totp), session: Session = Depends(get_session)):
-    """
-    Returns a 'guest' user from DB or creates one if missing.
-    Used for stateless operation while keeping logic compatible with User model.
-    """
-    from .models import User
+def _get_or_create_guest(session: Session) -> User:
     guest = session.exec(select(User).where(User.username == "guest")).first()
     if not guest:
         guest = User(username="guest", hashed_password="STATLESS_MODE_ACTIVE")
@@ -82,6 +119,13 @@ def get_guest_user(is_valid: bool = Depends(validate_master_totp), session: Sess
         session.refresh(guest)
     return guest
 
+def get_guest_user(is_valid: bool = Depends(validate_master_totp), session: Session = Depends(get_session)):
+    """
+    Returns a 'guest' user from DB or creates one if missing.
+    Used for stateless operation while keeping logic compatible with User model.
+    """
+    return _get_or_create_guest(session)
+
 async def get_active_username(
     username: Optional[str] = Depends(get_current_user_username),
     totp_valid: bool = Depends(validate_master_totp)
@@ -91,3 +135,37 @@ async def get_active_username(
     otherwise returns 'guest' if TOTP is valid.
     """
     return username or "guest"
+
+def current_user(username: str = Depends(get_active_username), session: Session = Depends(get_session)) -> UserContext:
+    """
+    The active user, resolved once per request (FastAPI caches dependencies per
+    request) and kept for USER_CACHE_TTL seconds across requests. Routes that
+    write user columns load the row with `session.get(User, user.id)`.
+    """
+    cached = _cache_get(_user_cache, username)
+    if cached is not None:
+        return cached[1]
+    user = session.exec(select(User).where(User.username == username)).first()
+    if user is None and username == "guest":
+        user = _get_or_create_guest(session)
+    if user is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
+    context = UserContext(
+        id=user.id,
+        username=user.username,
+        daily_api_limit=user.daily_api_limit,
+        gemini_api_key=user.gemini_api_key,
+        scan_thresholds=ScanThresholds(
+            gap_pct=user.scan_gap_pct,
+            change_pct=user.scan_change_pct,
+            min_volume_ratio=user.scan_min_volume_ratio,
+            min_gap_z=user.scan_min_gap_z,
+        ),
+    )
+    _cache_put(_user_cache, username, time.time() + USER_CACHE_TTL, context)
+    return context
+
+def invalidate_user(username: str):
+    """Drops the cached context after the user's settings changed."""
+    with _cache_lock:
+        _user_cache.pop(username, None)
@@ -0,0 +1,180 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .bar_store import bar_store
+from .executors import run_in
+from .gap_matrix import GapMatrix
+from .research_executor import ResearchExecutor
+from .strategy import FEE_RATE
+
+DIRECTIONS = ("fade", "follow")
+
+def trade_returns(
+    matrix: GapMatrix, threshold_pct: float, hold_days: int = 0, direction: str = "fade", fee_rate: float = FEE_RATE
+) -> np.ndarray:
+    """
+    Net return of every overreaction trade as a (symbols x days-1) array, NaN
+    where there is no trade. Column j is the session of day j+1: entry at its
+    open when |open / previous close - 1| >= threshold_pct, exit at the close
+    `hold_days` sessions later (0 = same day). Previous close and holding
+    period count each symbol's own sessions (GapMatrix.sessions), so stocks
+    and 24/7 crypto can share one matrix. "fade" trades against the gap (buy
+    gap-downs, short gap-ups), "follow" with it. Round-trip fees are deducted
+    per trade. Trades whose exit lies beyond the data are dropped.
+    """
+    return _trades(matrix, threshold_pct, hold_days, direction, fee_rate)[0]
+
+def _trades(
+    matrix: GapMatrix, threshold_pct: float, hold_days: int, direction: str, fee_rate: float
+) -> Tuple[np.ndarray, np.ndarray]:
+    """`trade_returns` plus, per trade, the returns column of its exit day."""
+    n, width = matrix.close.shape
+    returns = np.full((n, width), np.nan)
+    exits = np.zeros((n, width), dtype=np.intp)
+    if width < hold_days + 2:
+        return returns[:, 1:], exits[:, 1:]
+
+    bars, columns = matrix.sessions()
+    open_, close = bars["Open"], bars["Close"]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        entry = open_[:, 1:]
+        gap = entry / close[:, :-1] - 1
+        exit_close = np.full_like(entry, np.nan)
+        exit_close[:, : entry.shape[1] - hold_days] = close[:, 1 + hold_days:]
+        exit_column = np.zeros(entry.shape, dtype=np.intp)
+        exit_column[:, : entry.shape[1] - hold_days] = columns[:, 1 + hold_days:]
+        side = -np.sign(gap) if direction == "fade" else np.sign(gap)
+        signal = np.abs(gap) * 100 >= threshold_pct
+        packed = np.where(signal, side * (exit_close / entry - 1) - fee_rate, np.nan)
+
+    # Back from session slots to the matrix dates (slot k+1 lies in date column columns[:, k+1])
+    np.put_along_axis(returns, columns[:, 1:], packed, axis=1)
+    np.put_along_axis(exits, columns[:, 1:], exit_column, axis=1)
+    return returns[:, 1:], exits[:, 1:] - 1
+
+def evaluate(
+    matrix: GapMatrix,
+    threshold_pct: float,
+    hold_days: int = 0,
+    direction: str = "fade",
+    fee_rate: float = FEE_RATE,
+    include_curve: bool = True,
+) -> Dict[str, Any]:
+    """
+    Backtest statistics of one parameter set. A trade is open for
+    `hold_days + 1` sessions (entry open to exit close), so the equity curve
+    splits the capital into that many staggered sleeves; each entry day's
+    trades share one sleeve equally and each trade's return is booked on its
+    own exit day.
+    """
+    returns, exits = _trades(matrix, threshold_pct, hold_days, direction, fee_rate)
+    taken = ~np.isnan(returns)
+    trades = int(taken.sum())
+    per_day = np.broadcast_to(taken.sum(axis=0), returns.shape)
+
+    daily = np.zeros(returns.shape[1])
+    np.add.at(daily, exits[taken], returns[taken] / per_day[taken] / (hold_days + 1))
+    equity = np.cumprod(1 + daily)
+    # The peak starts at the initial capital, so a loss on the first day counts as drawdown
+    drawdown = equity / np.maximum(np.maximum.accumulate(equity), 1.0) - 1 if len(equity) else np.zeros(0)
+
+    result = {
+        "threshold": threshold_pct,
+        "hold_days": hold_days,
+        "direction": direction,
+        "trades": trades,
+        "hit_rate": round(float((returns[taken] > 0).mean()) * 100, 2) if trades else None,
+        "avg_return_pct": round(float(returns[taken].mean()) * 100, 3) if trades else None,
+        "total_return_pct": round(float(equity[-1] - 1) * 100, 2) if len(equity) else 0.0,
+        "max_drawdown_pct": round(float(drawdown.min()) * 100, 2) if len(drawdown) else 0.0,
+    }
+    if include_curve:
+        times = matrix.dates[1:].astype(np.int64)
+        result["equity_curve"] = [
+            {"time": int(t), "equity": round(float(e), 5)} for t, e in zip(times, equity)
+        ]
+    return result
+
+# --- Parameter grid (one process per core) ---
+
+_grid_pool: Optional[ProcessPoolExecutor] = None
+_grid_pool_lock = threading.Lock()
+
+def _grid_workers() -> int:
+    return int(os.getenv("BACKTEST_WORKERS", "0")) or os.cpu_count() or 1
+
+def grid_pool() -> ProcessPoolExecutor:
+    """
+    Process pool of the grid runs, created on first use and kept until
+    shutdown_grid_pool (app lifespan). Workers are spawned, not forked: the
+    pool is started from a worker thread of the server, and fork would copy
+    locks held by other threads (logging, sqlite, executors) into the children.
+    """
+    global _grid_pool
+    with _grid_pool_lock:
+        if _grid_pool is None:
+            _grid_pool = ProcessPoolExecutor(max_workers=_grid_workers(), mp_context=multiprocessing.get_context("spawn"))
+        return _grid_pool
+
+def shutdown_grid_pool():
+    global _grid_pool
+    with _grid_pool_lock:
+        pool, _grid_pool = _grid_pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+def _evaluate_cells(job: Tuple[GapMatrix, List[Tuple[float, int, str, float]]]) -> List[Dict[str, Any]]:
+    matrix, cells = job
+    return [
+        evaluate(matrix, threshold_pct, hold_days, direction, fee_rate, include_curve=False)
+        for threshold_pct, hold_days, direction, fee_rate in cells
+    ]
+
+def run_grid(
+    matrix: GapMatrix,
+    thresholds: List[float],
+    hold_periods: List[int],
+    direction: str = "fade",
+    fee_rate: float = FEE_RATE,
+    max_workers: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """Evaluates threshold x holding period on the process pool; rows sorted by total return."""
+    cells = [(float(t), int(h), direction, fee_rate) for t in thresholds for h in hold_periods]
+    if not cells:
+        return []
+    workers = min(len(cells), max_workers or _grid_workers())
+    if workers == 1:
+        results = _evaluate_cells((matrix, cells))
+    else:
+        # One job per worker, so the matrix is pickled `workers` times instead of once per cell
+        jobs = [(matrix, cells[i::workers]) for i in range(workers)]
+        try:
+            results = [row for rows in grid_pool().map(_evaluate_cells, jobs) for row in rows]
+        except BrokenProcessPool:
+            # A worker died (e.g. killed for memory): the next grid starts a fresh pool
+            shutdown_grid_pool()
+            raise
+    return sorted(results, key=lambda r: r["total_return_pct"], reverse=True)
+
+# --- Data loading ---
+
+def load_bars(symbol: str, period: str) -> pd.DataFrame:
+    """Daily bars from the local bar store (synced from Yahoo if due)."""
+    bars = bar_store.history(symbol, period=period)
+    if len(bars) < 2:
+        raise LookupError("Keine Kursdaten")
+    return bars
+
+async def load_matrix(symbols: List[str], period: str, executor: ResearchExecutor) -> Tuple[GapMatrix, List[Dict[str, str]]]:
+    """Loads all symbols concurrently on the research executor; returns the full-history matrix and load errors."""
+    rows, errors = await executor.run(symbols, lambda symbol: {"symbol": symbol, "bars": load_bars(symbol, period)})
+    frames = {row["symbol"]: row["bars"] for row in rows}
+    matrix = await run_in("cpu", GapMatrix.from_frames, frames, None)
+    return matrix, errors
@@ -0,0 +1,259 @@
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, Optional
+from urllib.parse import quote
+
+import numpy as np
+import pandas as pd
+import yfinance as yf
+
+from .leader import file_lock
+from .metrics import upstream_call
+
+logger = logging.getLogger(__name__)
+
+# Column name -> on-disk dtype. Every column is a raw little-endian array file.
+COLUMNS = {
+    "time": np.dtype("<i8"),     # bar date as epoch seconds (UTC midnight)
+    "open": np.dtype("<f8"),
+    "high": np.dtype("<f8"),
+    "low": np.dtype("<f8"),
+    "close": np.dtype("<f8"),
+    "volume": np.dtype("<f8"),
+}
+_SOURCE_COLUMNS = {"open": "Open", "high": "High", "low": "Low", "close": "Close", "volume": "Volume"}
+
+# yfinance periods the store can answer from daily bars
+PERIOD_OFFSETS = {
+    "5d": pd.DateOffset(days=7),
+    "1mo": pd.DateOffset(months=1),
+    "3mo": pd.DateOffset(months=3),
+    "6mo": pd.DateOffset(months=6),
+    "1y": pd.DateOffset(years=1),
+    "2y": pd.DateOffset(years=2),
+    "5y": pd.DateOffset(years=5),
+    "10y": pd.DateOffset(years=10),
+}
+
+def _empty_columns() -> Dict[str, np.ndarray]:
+    return {name: np.empty(0, dtype=dtype) for name, dtype in COLUMNS.items()}
+
+def frame_to_columns(frame: Optional[pd.DataFrame]) -> Dict[str, np.ndarray]:
+    """Converts a yfinance history frame into store columns (one row per date)."""
+    if frame is None or frame.empty:
+        return _empty_columns()
+    frame = frame.dropna(subset=["Close"])
+    index = frame.index
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    times = index.normalize().values.astype("datetime64[s]").astype(np.int64)
+    # yfinance occasionally repeats the current day; keep the last row per date
+    keep = np.append(times[1:] != times[:-1], True)
+    cols = {"time": times[keep]}
+    for name, source in _SOURCE_COLUMNS.items():
+        cols[name] = frame[source].to_numpy(dtype=np.float64)[keep]
+    return cols
+
+class BarStore:
+    """
+    Persistent per-symbol store of daily OHLCV bars.
+    Each column is an append-only file that is memory-mapped for reads, so
+    date-range slices come straight from disk without parsing. Only the
+    missing tail is fetched from Yahoo, at most once per `refresh_interval`.
+    The newest upstream bar may still change (open session), so it is kept
+    as a provisional tail in meta.json and only appended once a newer bar exists.
+    """
+
+    def __init__(self, root: str = "bar_store", refresh_interval: float = 900.0):
+        self.root = root
+        self.refresh_interval = refresh_interval
+        self._guard = threading.Lock()
+        self._locks: Dict[str, threading.Lock] = {}
+        self._columns: Dict[str, Dict[str, np.ndarray]] = {}
+        self._meta: Dict[str, dict] = {}
+
+    # --- Public API ---
+
+    @staticmethod
+    def supports(period: str) -> bool:
+        return period in PERIOD_OFFSETS or period in ("ytd", "max")
+
+    def read(self, symbol: str, start: Optional[int] = None, end: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """Returns bars with start <= time < end (epoch seconds), syncing the tail first if due."""
+        self.ensure(symbol)
+        cols = self._load(symbol)
+        times = cols["time"]
+        lo = 0 if start is None else int(np.searchsorted(times, start, "left"))
+        hi = len(times) if end is None else int(np.searchsorted(times, end, "left"))
+        result = {name: col[lo:hi] for name, col in cols.items()}
+
+        tail = self._get_meta(symbol).get("tail")
+        if tail and (start is None or tail["time"] >= start) and (end is None or tail["time"] < end):
+            if not len(times) or tail["time"] > times[-1]:
+                result = {
+                    name: np.append(col, np.array([tail[name]], dtype=COLUMNS[name]))
+                    for name, col in result.items()
+                }
+        return result
+
+    def read_period(self, symbol: str, period: str) -> Dict[str, np.ndarray]:
+        """Returns the bars covered by a yfinance-style period string."""
+        return self.read(symbol, start=self.period_start(period))
+
+    def history(
+        self, symbol: str, period: Optional[str] = None, start: Optional[str] = None, end: Optional[str] = None
+    ) -> pd.DataFrame:
+        """yfinance-compatible view (`Open`/`High`/`Low`/`Close`/`Volume` by date)."""
+        if period is not None:
+            cols = self.read_period(symbol, period)
+        else:
+            cols = self.read(
+                symbol,
+                start=int(pd.Timestamp(start).timestamp()) if start else None,
+                end=int(pd.Timestamp(end).timestamp()) if end else None,
+            )
+        index = pd.to_datetime(cols["time"], unit="s")
+        return pd.DataFrame(
+            {source: np.asarray(cols[name]) for name, source in _SOURCE_COLUMNS.items()},
+            index=index,
+        )
+
+    @staticmethod
+    def period_start(period: str) -> Optional[int]:
+        today = pd.Timestamp.now(tz="UTC").tz_localize(None).normalize()
+        if period == "max":
+            return None
+        if period == "ytd":
+            return int(today.replace(month=1, day=1).timestamp())
+        return int((today - PERIOD_OFFSETS[period]).timestamp())
+
+    def ensure(self, symbol: str) -> None:
+        """Fetches the missing tail from upstream if the last sync is older than the refresh interval."""
+        if time.time() - self._get_meta(symbol).get("last_sync", 0) < self.refresh_interval:
+            return
+        # The file lock serializes syncs of other worker processes sharing the store directory
+        with self._lock(symbol), file_lock(self._dir(symbol) + ".lock"):
+            # Another worker may have synced meanwhile: reload meta and columns from disk
+            if os.path.exists(os.path.join(self._dir(symbol), "meta.json")):
+                self._meta.pop(symbol, None)
+                self._columns.pop(symbol, None)
+            if time.time() - self._get_meta(symbol).get("last_sync", 0) < self.refresh_interval:
+                return
+            self._sync(symbol)
+
+    # --- Upstream sync ---
+
+    def _sync(self, symbol: str) -> None:
+        cols = self._load(symbol)
+        times = cols["time"]
+        try:
+            with upstream_call("yfinance", "history", symbol) as call:
+                if len(times) == 0:
+                    frame = yf.Ticker(symbol).history(period="max", interval="1d")
+                else:
+                    start = pd.Timestamp(int(times[-1]), unit="s").strftime("%Y-%m-%d")
+                    frame = yf.Ticker(symbol).history(start=start, interval="1d")
+                if frame.empty:
+                    call.outcome = "empty"
+        except Exception as e:
+            logger.warning("bar store sync failed", extra={"symbol": symbol, "error": str(e)})
+            self._save_meta(symbol, {**self._get_meta(symbol), "last_sync": time.time()})
+            return
+
+        new = frame_to_columns(frame)
+        if len(times) and len(new["time"]) and new["time"][0] == times[-1]:
+            # Yahoo re-adjusts the whole history after splits/dividends; rebuild if the overlap moved
+            if not np.isclose(new["close"][0], cols["close"][-1], rtol=1e-4):
+                self._rewrite(symbol, _empty_columns())
+                self._save_meta(symbol, {})
+                return self._sync(symbol)
+
+        n = len(new["time"])
+        if n == 0:
+            self._save_meta(symbol, {**self._get_meta(symbol), "last_sync": time.time()})
+            return
+
+        last = times[-1] if len(times) else None
+        final = {name: col[:-1] for name, col in new.items()}
+        if last is not None:
+            fresh = final["time"] > last
+            final = {name: col[fresh] for name, col in final.items()}
+        self._append(symbol, final)
+        tail = {name: col[-1].item() for name, col in new.items()}
+        self._save_meta(symbol, {"last_sync": time.time(), "tail": tail})
+
+    # --- Storage ---
+
+    def _dir(self, symbol: str) -> str:
+        return os.path.join(self.root, quote(symbol, safe=""))
+
+    def _lock(self, symbol: str) -> threading.Lock:
+        with self._guard:
+            return self._locks.setdefault(symbol, threading.Lock())
+
+    def _load(self, symbol: str) -> Dict[str, np.ndarray]:
+        cols = self._columns.get(symbol)
+        if cols is not None:
+            return cols
+        directory = self._dir(symbol)
+        paths = {name: os.path.join(directory, f"{name}.bin") for name in COLUMNS}
+        if not all(os.path.exists(p) for p in paths.values()):
+            return _empty_columns()
+        # A crash mid-append can leave columns of different length; trust the shortest
+        n = min(os.path.getsize(p) // COLUMNS[name].itemsize for name, p in paths.items())
+        if n == 0:
+            cols = _empty_columns()
+        else:
+            cols = {name: np.memmap(p, dtype=COLUMNS[name], mode="r", shape=(n,)) for name, p in paths.items()}
+        self._columns[symbol] = cols
+        return cols
+
+    def _append(self, symbol: str, cols: Dict[str, np.ndarray]) -> None:
+        if not len(cols["time"]):
+            return
+        directory = self._dir(symbol)
+        os.makedirs(directory, exist_ok=True)
+        for name, dtype in COLUMNS.items():
+            with open(os.path.join(directory, f"{name}.bin"), "ab") as f:
+                f.write(np.ascontiguousarray(cols[name], dtype=dtype).tobytes())
+        self._columns.pop(symbol, None)
+
+    def _rewrite(self, symbol: str, cols: Dict[str, np.ndarray]) -> None:
+        # Replace files instead of truncating: readers holding old memmaps keep the old inode
+        directory = self._dir(symbol)
+        os.makedirs(directory, exist_ok=True)
+        for name, dtype in COLUMNS.items():
+            path = os.path.join(directory, f"{name}.bin")
+            with open(path + ".tmp", "wb") as f:
+                f.write(np.ascontiguousarray(cols[name], dtype=dtype).tobytes())
+            os.replace(path + ".tmp", path)
+        self._columns.pop(symbol, None)
+
+    def _get_meta(self, symbol: str) -> dict:
+        meta = self._meta.get(symbol)
+        if meta is None:
+            try:
+                with open(os.path.join(self._dir(symbol), "meta.json")) as f:
+                    meta = json.load(f)
+            except (OSError, ValueError):
+                meta = {}
+            self._meta[symbol] = meta
+        return meta
+
+    def _save_meta(self, symbol: str, meta: dict) -> None:
+        self._meta[symbol] = meta
+        directory = self._dir(symbol)
+        # Unknown symbols only get the in-memory sync marker, no directory
+        if not os.path.isdir(directory) and not meta.get("tail"):
+            return
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, "meta.json")
+        with open(path + ".tmp", "w") as f:
+            json.dump(meta, f)
+        os.replace(path + ".tmp", path)
+
+# Process-wide store shared by the chart endpoint and IdeaAnalyst
+bar_store = BarStore(os.getenv("BAR_STORE_DIR", "bar_store"))
@@ -0,0 +1,43 @@
+import struct
+from typing import Any, Dict, List
+
+import numpy as np
+
+PRICE_COLUMNS = ("open", "high", "low", "close")
+
+# Binary layout (little-endian):
+#   u32 bar count | u32 price column count (4)
+#   f64 time[n] (epoch seconds) | f32 open[n] | f32 high[n] | f32 low[n] | f32 close[n]
+# The 8 byte header keeps the time block aligned for a JS Float64Array view.
+BINARY_HEADER = struct.Struct("<II")
+BINARY_MEDIA_TYPE = "application/octet-stream"
+
+def _rounded(bars: Dict[str, np.ndarray], decimals: int) -> List[List[float]]:
+    return [np.round(np.asarray(bars[name], dtype=np.float64), decimals).tolist() for name in PRICE_COLUMNS]
+
+def serialize_rows(bars: Dict[str, np.ndarray], decimals: int = 2) -> List[Dict[str, Any]]:
+    """Lightweight Charts row format: [{time: 'YYYY-MM-DD', open, high, low, close}, ...]."""
+    times = np.datetime_as_string(np.asarray(bars["time"]).astype("datetime64[s]"), unit="D").tolist()
+    opens, highs, lows, closes = _rounded(bars, decimals)
+    return [
+        {"time": t, "open": o, "high": h, "low": l, "close": c}
+        for t, o, h, l, c in zip(times, opens, highs, lows, closes)
+    ]
+
+def serialize_columnar(bars: Dict[str, np.ndarray], decimals: int = 2) -> Dict[str, List]:
+    """Column format: {time: [epoch seconds], open: [...], high: [...], low: [...], close: [...]}."""
+    opens, highs, lows, closes = _rounded(bars, decimals)
+    return {
+        "time": np.asarray(bars["time"], dtype=np.int64).tolist(),
+        "open": opens, "high": highs, "low": lows, "close": closes,
+    }
+
+def serialize_binary(bars: Dict[str, np.ndarray]) -> bytes:
+    """Compact buffer (see BINARY_HEADER for the layout); float32 prices, float64 times."""
+    n = len(bars["time"])
+    parts = [
+        BINARY_HEADER.pack(n, len(PRICE_COLUMNS)),
+        np.asarray(bars["time"], dtype="<f8").tobytes(),
+    ]
+    parts.extend(np.asarray(bars[name], dtype="<f4").tobytes() for name in PRICE_COLUMNS)
+    return b"".join(parts)
@@ -0,0 +1,48 @@
+import re
+from typing import Any, Dict, Optional
+
+# Rule-based fast path for commands with a fixed structure; everything else goes to Gemini.
+# Patterns run against `normalize_command` output (lower case, single spaces, no trailing punctuation).
+_NUMBER = r"(\d+(?:[.,]\d+)?)"
+
+_STATUS = re.compile(r"^(?:status|trades|meine trades|(?:zeig(?:e)? (?:mir )?)?(?:den )?status (?:meiner|der) trades)$")
+_SCAN = re.compile(
+    r"^(?:zeig(?:e)? (?:mir )?(?:die )?)?(verlierer|gewinner|losers|gainers)"
+    r"(?: (?:>|über|ueber|mehr als|ab))? ?" + _NUMBER + r" ?%?$"
+)
+_SCAN_PLAIN = re.compile(r"^(?:scan|scanne(?: den markt)?|markt scannen)$")
+# Written in capitals ("AAPL", "BTCUSDT") the last word is taken as ticker; "Apple" needs the model
+_TICKER_AT_END = re.compile(r"(?:^|\s)[A-Z][A-Z0-9.\-]{0,14}[!?.]*$")
+_TRADE = re.compile(
+    r"^(kauf(?:e|en)?|buy|verkauf(?:e|en)?|sell) " + _NUMBER + r"(?: (?:stück|stk\.?|x))? ([a-z][a-z0-9.\-]{0,14})$"
+)
+
+def normalize_command(text: str) -> str:
+    """Canonical form used for the rule parser and as the command cache key."""
+    return re.sub(r"\s+", " ", text.strip().lower()).rstrip("!?. ")
+
+def _number(value: str) -> float:
+    number = float(value.replace(",", "."))
+    return int(number) if number.is_integer() else number
+
+def parse_command(text: str) -> Optional[Dict[str, Any]]:
+    """Returns the action for a trivially structured command, or None if the model is needed."""
+    command = normalize_command(text)
+
+    if _STATUS.match(command):
+        return {"action": "status"}
+
+    if _SCAN_PLAIN.match(command):
+        return {"action": "scan"}
+
+    match = _SCAN.match(command)
+    if match:
+        kind = "losers" if match.group(1) in ("verlierer", "losers") else "gainers"
+        return {"action": "scan", "filters": {"threshold": _number(match.group(2)), "type": kind}}
+
+    match = _TRADE.match(command)
+    if match and _TICKER_AT_END.search(text.strip()):
+        side = "sell" if match.group(1).startswith(("verkauf", "sell")) else "buy"
+        return {"action": "trade", "symbol": match.group(3).upper(), "side": side, "quantity": _number(match.group(2))}
+
+    return None
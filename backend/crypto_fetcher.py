@@ -1,24 +1,47 @@
+import logging
 from binance.client import Client
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
+from .metrics import upstream_call
+from .quote_engine import QuoteEngine, default_engine
+
+logger = logging.getLogger(__name__)
 
 class CryptoFetcher:
     """Handles live crypto prices and performance data using Binance."""
-    
-    def __init__(self, api_key: str = "", api_secret: str = ""):
-        self.client = Client(api_key, api_secret)
+
+    def __init__(
+        self, api_key: str = "", api_secret: str = "", engine: Optional[QuoteEngine] = None, client: Optional[Client] = None
+    ):
+        self.client = client or Client(api_key, api_secret)
+        self.engine = engine or default_engine
 
     async def fetch_crypto(self, symbols: list) -> Dict[str, Any]:
+        """Fetches quotes for all symbols with a single 24h ticker call."""
+        if not symbols:
+            return {}
+        return await self.engine.run(self._fetch_crypto_sync, list(symbols))
+
+    def _fetch_crypto_sync(self, symbols: List[str]) -> Dict[str, Any]:
         data = {}
-        for symbol in symbols:
+        try:
+            # Without a symbol Binance returns the 24h stats (incl. lastPrice) of every pair
+            with upstream_call("binance", "ticker_24hr", symbols):
+                tickers = self.client.get_ticker()
+        except Exception as e:
+            logger.warning("crypto ticker request failed", extra={"error": str(e)})
+            return data
+
+        wanted = set(symbols)
+        for stats in tickers:
+            symbol = stats.get("symbol")
+            if symbol not in wanted:
+                continue
             try:
-                ticker = self.client.get_symbol_ticker(symbol=symbol)
-                # 24h stats for priceChangePercent
-                stats = self.client.get_ticker(symbol=symbol)
                 data[symbol] = {
-                    "price": float(ticker['price']),
+                    "price": float(stats['lastPrice']),
                     "change": float(stats['priceChangePercent']),
                     "type": "crypto"
                 }
             except Exception as e:
-                print(f"Error fetching crypto {symbol}: {e}")
+                logger.warning("crypto quote parse failed", extra={"symbol": symbol, "error": str(e)})
         return data
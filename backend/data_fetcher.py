@@ -1,4 +1,7 @@
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
+from binance.client import Client
+from .quote_engine import default_engine
+from .quote_cache import quote_cache
 from .stock_fetcher import StockFetcher
 from .crypto_fetcher import CryptoFetcher
 from .stock_scanner import StockScanner
@@ -10,36 +13,36 @@ class DataFetcher:
     to specialized modules. Follows 'One File, One Purpose' guidelines.
     """
     
-    def __init__(self):
-        # Initialize specialized modules
-        self.stock_fetcher = StockFetcher()
-        self.crypto_fetcher = CryptoFetcher()
+    def __init__(self, binance_client: Optional[Client] = None, market_search: Optional[MarketSearch] = None):
+        # Initialize specialized modules; the app builds one instance per process (see services.py)
+        self.quote_engine = default_engine
+        self.cache = quote_cache
+        self.stock_fetcher = StockFetcher(self.quote_engine)
+        self.crypto_fetcher = CryptoFetcher(engine=self.quote_engine, client=binance_client)
         self.stock_scanner = StockScanner()
         # MarketSearch needs the binance client from CryptoFetcher
-        self.market_search = MarketSearch(self.crypto_fetcher.client)
+        self.market_search = market_search or MarketSearch(self.crypto_fetcher.client)
 
     async def fetch_stocks(self, symbols: list):
-        """Delegates to StockFetcher."""
-        return await self.stock_fetcher.fetch_stocks(symbols)
+        """Delegates to StockFetcher (through the shared quote cache)."""
+        return await self.cache.get_many("stock_quote", symbols, self.stock_fetcher.fetch_stocks)
 
-    async def fetch_crypto(self, symbols: list):
-        """Delegates to CryptoFetcher."""
-        return await self.crypto_fetcher.fetch_crypto(symbols)
+    async def fetch_daily_bars(self, symbols: list):
+        """Daily OHLCV per stock for the gap matrix (uncached, the scan scheduler paces it)."""
+        return await self.stock_fetcher.fetch_daily_bars(symbols)
 
-    async def fetch_all_data(self):
-        """Orchestrates combined data fetch."""
-        stocks = ["AAPL", "TSLA", "NVDA", "MSFT"]
-        cryptos = ["BTCUSDT", "ETHUSDT", "BNBUSDT"]
-        
-        stock_data = await self.fetch_stocks(stocks)
-        crypto_data = await self.fetch_crypto(cryptos)
-        
-        return {**stock_data, **crypto_data}
+    async def fetch_crypto(self, symbols: list):
+        """Delegates to CryptoFetcher (through the shared quote cache)."""
+        return await self.cache.get_many("crypto_quote", symbols, self.crypto_fetcher.fetch_crypto)
 
     async def filter_stocks(self, criteria: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Delegates to StockScanner."""
         return await self.stock_scanner.filter_stocks(criteria)
 
+    async def fundamentals_ready(self) -> bool:
+        """Delegates to StockScanner (False while the fundamentals table is still empty)."""
+        return await self.stock_scanner.has_snapshot()
+
     def search(self, query: str) -> List[Dict[str, str]]:
         """Delegates to MarketSearch."""
         return self.market_search.search(query)
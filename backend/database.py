@@ -1,13 +1,70 @@
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
 from sqlmodel import SQLModel, create_engine, Session
 import os
 
-sqlite_file_name = "trading_dashboard.db"
+from .metrics import instrument_engine
+from .migrations import run_migrations
+
+sqlite_file_name = os.getenv("DB_FILE", "trading_dashboard.db")
 sqlite_url = f"sqlite:///{sqlite_file_name}"
 
-engine = create_engine(sqlite_url, echo=False)
+# Applied to every new connection. WAL lets readers run while a scan writes,
+# busy_timeout makes writers wait for the lock instead of failing with
+# "database is locked"; synchronous=NORMAL is durable enough under WAL.
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": int(os.getenv("DB_BUSY_TIMEOUT_MS", "5000")),
+    "cache_size": -int(os.getenv("DB_CACHE_KB", "20000")),  # negative = KiB
+    "mmap_size": int(os.getenv("DB_MMAP_BYTES", str(256 * 1024 * 1024))),
+    "temp_store": "MEMORY",
+}
+
+def build_engine(url: str = sqlite_url, production: bool = True, pool_size: int = 10, max_overflow: int = 20) -> Engine:
+    """
+    SQLite engine for the app. `production=False` gives the plain default
+    engine (rollback journal, no pragmas), which the DB benchmark compares against.
+    """
+    if not production:
+        return create_engine(url, echo=False)
+
+    engine = create_engine(
+        url,
+        echo=False,
+        # Sessions are used from the threadpool; each connection is still used by one thread at a time
+        connect_args={"check_same_thread": False, "timeout": SQLITE_PRAGMAS["busy_timeout"] / 1000},
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=30,
+    )
+
+    @event.listens_for(engine, "connect")
+    def _apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+    return engine
+
+engine = build_engine(
+    pool_size=int(os.getenv("DB_POOL_SIZE", "10")),
+    max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "20")),
+)
+# Query counts per request and background job for /metrics
+instrument_engine(engine)
+
+def ensure_indexes(bind: Engine = engine):
+    """create_all skips existing tables, so indexes added later are created here."""
+    for table in SQLModel.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=bind, checkfirst=True)
 
 def create_db_and_tables():
     SQLModel.metadata.create_all(engine)
+    run_migrations(engine)
+    ensure_indexes()
 
 def get_session():
     with Session(engine) as session:
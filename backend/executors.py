@@ -0,0 +1,71 @@
+import asyncio
+import contextvars
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+# One bounded thread pool per class of blocking work, so a slow class (a scan
+# downloading thousands of symbols, a hung Yahoo call) can only exhaust its own
+# threads. Interactive requests never queue behind background jobs.
+#   market_data  interactive quotes, charts, market overview, Binance calls
+#   bulk         scan / backtest bar downloads and the fundamentals refresh
+#   news         per-symbol Yahoo news lookups (no batch endpoint)
+#   research     per-symbol IdeaAnalyst research (yfinance info/history, ResearchExecutor)
+#   db           SQLite work started from async code
+#   cpu          password hashing and other CPU-bound work that releases the GIL
+POOL_SIZES = {
+    "market_data": int(os.getenv("EXECUTOR_MARKET_DATA", "16")),
+    "bulk": int(os.getenv("EXECUTOR_BULK", "8")),
+    "news": int(os.getenv("EXECUTOR_NEWS", "32")),
+    "research": int(os.getenv("EXECUTOR_RESEARCH", "16")),
+    "db": int(os.getenv("EXECUTOR_DB", "16")),
+    "cpu": int(os.getenv("EXECUTOR_CPU", str(os.cpu_count() or 2))),
+}
+
+def bind_context(func: Callable[..., Any]) -> Callable[..., Any]:
+    """
+    Wraps `func` to run in a copy of the caller's context variables.
+    run_in_executor does not propagate them, and the per-request metrics
+    (metrics.py) must follow the work into the worker thread.
+    """
+    context = contextvars.copy_context()
+
+    def run(*args, **kwargs):
+        return context.copy().run(func, *args, **kwargs)
+    return run
+
+class Executors:
+    """Process-wide registry of the per-class pools (created on first use)."""
+
+    def __init__(self, sizes: Dict[str, int] = POOL_SIZES):
+        self.sizes = sizes
+        self._pools: Dict[str, ThreadPoolExecutor] = {}
+        self._guard = threading.Lock()
+
+    def pool(self, kind: str) -> ThreadPoolExecutor:
+        pool = self._pools.get(kind)
+        if pool is None:
+            with self._guard:
+                pool = self._pools.get(kind)
+                if pool is None:
+                    pool = ThreadPoolExecutor(self.sizes[kind], thread_name_prefix=kind)
+                    self._pools[kind] = pool
+        return pool
+
+    async def run(self, kind: str, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """Runs a blocking call on the pool of its class and awaits the result."""
+        return await asyncio.get_running_loop().run_in_executor(self.pool(kind), bind_context(functools.partial(func, *args, **kwargs)))
+
+    def shutdown(self):
+        with self._guard:
+            pools, self._pools = self._pools, {}
+        for pool in pools.values():
+            pool.shutdown(wait=False, cancel_futures=True)
+
+executors = Executors()
+
+async def run_in(kind: str, func: Callable[..., Any], *args, **kwargs) -> Any:
+    """`await run_in("db", func, ...)`: shorthand for the shared registry."""
+    return await executors.run(kind, func, *args, **kwargs)
@@ -0,0 +1,94 @@
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import yfinance as yf
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlmodel import Session
+
+from .database import engine
+from .executors import run_in
+from .metrics import job_context, upstream_call
+from .models import Fundamentals
+
+logger = logging.getLogger(__name__)
+
+# yfinance `info` key -> Fundamentals column
+INFO_FIELDS = {
+    "longName": "name",
+    "sector": "sector",
+    "currentPrice": "price",
+    "marketCap": "market_cap",
+    "trailingPE": "trailing_pe",
+    "dividendYield": "dividend_yield",
+    "priceToBook": "price_to_book",
+    "profitMargins": "profit_margins",
+}
+
+class FundamentalsRefresher:
+    """
+    Background job that snapshots yfinance fundamentals for a whole universe
+    into the Fundamentals table, so StockScanner never waits on Yahoo. The
+    lookups run on the "bulk" pool, at most `max_in_flight` at a time so a
+    scan's downloads still find free threads there.
+    """
+
+    def __init__(self, universe: List[str], interval_hours: float = 12.0, max_in_flight: int = 4, chunk_size: int = 200):
+        self.universe = universe
+        self.interval_hours = interval_hours
+        self.max_in_flight = max_in_flight
+        self.chunk_size = chunk_size
+        self.last_refresh: Optional[datetime] = None
+
+    async def run_forever(self):
+        while True:
+            with job_context("fundamentals_refresher"):
+                await self.refresh()
+            await asyncio.sleep(self.interval_hours * 3600)
+
+    async def refresh(self) -> int:
+        """Fetches `info` for every symbol (bounded, on the bulk pool) and upserts each chunk in one statement."""
+        semaphore = asyncio.Semaphore(self.max_in_flight)
+
+        async def fetch(symbol: str) -> Optional[Dict[str, Any]]:
+            async with semaphore:
+                return await run_in("bulk", self._fetch_row, symbol)
+
+        stored = 0
+        for i in range(0, len(self.universe), self.chunk_size):
+            chunk = self.universe[i:i + self.chunk_size]
+            rows = [row for row in await asyncio.gather(*(fetch(s) for s in chunk)) if row]
+            stored += await run_in("db", self._upsert, rows)
+        self.last_refresh = datetime.utcnow()
+        logger.info("fundamentals refresh finished", extra={"stored": stored, "universe": len(self.universe)})
+        return stored
+
+    def _fetch_row(self, symbol: str) -> Optional[Dict[str, Any]]:
+        try:
+            with upstream_call("yfinance", "info", symbol) as call:
+                info = yf.Ticker(symbol).info
+                if not info:
+                    call.outcome = "empty"
+        except Exception as e:
+            logger.warning("fundamentals request failed", extra={"symbol": symbol, "error": str(e)})
+            return None
+        if not info:
+            return None
+        row = {column: info.get(key) for key, column in INFO_FIELDS.items()}
+        row["symbol"] = symbol
+        row["updated_at"] = datetime.utcnow()
+        return row
+
+    def _upsert(self, rows: List[Dict[str, Any]]) -> int:
+        if not rows:
+            return 0
+        statement = sqlite_insert(Fundamentals)
+        statement = statement.on_conflict_do_update(
+            index_elements=["symbol"],
+            set_={column: statement.excluded[column] for column in rows[0] if column != "symbol"},
+        )
+        with Session(engine) as session:
+            session.execute(statement, rows)
+            session.commit()
+        return len(rows)
@@ -0,0 +1,169 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional, Tuple
+
+from .models import ScanThresholds
+
+FIELDS = ("Open", "High", "Low", "Close", "Volume")
+
+class GapMatrix:
+    """
+    Daily bars of a whole universe as aligned 2-D arrays (symbols x days, oldest
+    day first, NaN where a symbol has no bar). The last column is the newest
+    date of any symbol; a symbol may lack it (lagging bar, other exchange
+    holidays), so per-symbol metrics use `latest_bars`.
+    """
+
+    def __init__(self, symbols: List[str], bars: Dict[str, np.ndarray], dates: Optional[np.ndarray] = None):
+        self.symbols = np.asarray(symbols, dtype=object)
+        self.dates = np.asarray(dates if dates is not None else [], dtype="datetime64[s]")
+        self.open = bars["Open"]
+        self.high = bars["High"]
+        self.low = bars["Low"]
+        self.close = bars["Close"]
+        self.volume = bars["Volume"]
+
+    @classmethod
+    def from_frames(cls, frames: Dict[str, pd.DataFrame], days: Optional[int] = 40) -> "GapMatrix":
+        """Aligns per-symbol OHLCV frames on a common date index and keeps the last `days` rows (None: all)."""
+        if not frames:
+            empty = np.empty((0, 0))
+            return cls([], {field: empty for field in FIELDS})
+        symbols = list(frames)
+        # One outer join on the dates for all symbols, then one (days, symbols, field) cube
+        table = pd.concat([frames[s][list(FIELDS)] for s in symbols], axis=1, keys=symbols, sort=True).sort_index()
+        if days is not None:
+            table = table.iloc[-days:]
+        cube = table.to_numpy(dtype=np.float64).reshape(len(table), len(symbols), len(FIELDS))
+        index = table.index.tz_localize(None) if getattr(table.index, "tz", None) is not None else table.index
+        return cls(
+            symbols,
+            {field: cube[:, :, i].T.copy() for i, field in enumerate(FIELDS)},
+            dates=index.values.astype("datetime64[s]"),
+        )
+
+    def sessions(self) -> Tuple[Dict[str, np.ndarray], np.ndarray]:
+        """
+        The fields with each symbol's own bars packed to the right (missing days
+        dropped, date order kept, NaN-padded on the left), plus for every packed
+        slot the matrix column it came from. Consecutive slots are consecutive
+        sessions of that symbol, whatever calendar the other symbols trade on.
+        """
+        fields = {field: getattr(self, field.lower()) for field in FIELDS}
+        valid = ~np.isnan(self.close)
+        # Stable sort of the validity flags moves every symbol's bars to the end, in date order
+        columns = np.argsort(valid, axis=1, kind="stable")
+        keep = np.take_along_axis(valid, columns, axis=1)
+        packed = {field: np.where(keep, np.take_along_axis(values, columns, axis=1), np.nan) for field, values in fields.items()}
+        return packed, columns
+
+    def latest_bars(self, max_lag: int = 3) -> Dict[str, np.ndarray]:
+        """
+        The fields packed per symbol like `sessions`, so each symbol's own
+        newest bar is the last column. Symbols whose newest bar is more than
+        `max_lag` dates behind the newest date of the matrix are all NaN:
+        their data is stale.
+        """
+        if self.close.size == 0:
+            return {field: getattr(self, field.lower()) for field in FIELDS}
+        packed, _ = self.sessions()
+        valid = ~np.isnan(self.close)
+        lag = np.argmax(valid[:, ::-1], axis=1)
+        fresh = (valid.any(axis=1) & (lag <= max_lag))[:, None]
+        return {field: np.where(fresh, values, np.nan) for field, values in packed.items()}
+
+def compute_gap_metrics(
+    matrix: GapMatrix, atr_window: int = 14, volume_window: int = 20, max_lag: int = 3
+) -> Dict[str, np.ndarray]:
+    """
+    One vectorized pass over the universe, each symbol on its own last bars
+    (see GapMatrix.latest_bars):
+    gap_pct (open vs. previous close), change_pct (close vs. previous close),
+    volume_ratio (today's volume / average of the previous `volume_window` days),
+    atr_pct (average true range of the previous `atr_window` days, % of the previous close)
+    and gap_z (gap_pct / atr_pct, the gap in units of normal daily range).
+    """
+    n = len(matrix.symbols)
+    if n == 0 or matrix.close.shape[1] < 2:
+        nan = np.full(n, np.nan)
+        return {"symbol": matrix.symbols, "price": nan, "prev_close": nan, "gap_pct": nan,
+                "change_pct": nan, "volume_ratio": nan, "atr_pct": nan, "gap_z": nan}
+
+    bars = matrix.latest_bars(max_lag)
+    close, volume = bars["Close"], bars["Volume"]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        prev_close = close[:, -2]
+        price = close[:, -1]
+        gap_pct = (bars["Open"][:, -1] / prev_close - 1) * 100
+        change_pct = (price / prev_close - 1) * 100
+
+        # True range per day needs the day before, so column 0 has none
+        prior_close = close[:, :-1]
+        high, low = bars["High"][:, 1:], bars["Low"][:, 1:]
+        true_range = np.fmax(high - low, np.fmax(np.abs(high - prior_close), np.abs(low - prior_close)))
+        # Exclude today so the gap is measured against the range before it
+        atr = _nanmean(true_range[:, -atr_window - 1:-1])
+        atr_pct = atr / prev_close * 100
+        gap_z = gap_pct / atr_pct
+
+        volume_ratio = volume[:, -1] / _nanmean(volume[:, -volume_window - 1:-1])
+
+    return {
+        "symbol": matrix.symbols,
+        "price": price,
+        "prev_close": prev_close,
+        "gap_pct": gap_pct,
+        "change_pct": change_pct,
+        "volume_ratio": volume_ratio,
+        "atr_pct": atr_pct,
+        "gap_z": gap_z,
+    }
+
+def quote_metrics(quotes: Dict[str, Dict[str, float]]) -> Dict[str, np.ndarray]:
+    """Metrics for symbols that only have a quote (price + change, e.g. 24/7 crypto): no gap, volume or ATR."""
+    symbols = list(quotes)
+    nan = np.full(len(symbols), np.nan)
+    return {
+        "symbol": np.asarray(symbols, dtype=object),
+        "price": np.array([quotes[s]["price"] for s in symbols], dtype=np.float64),
+        "prev_close": nan,
+        "gap_pct": nan,
+        "change_pct": np.array([quotes[s]["change"] for s in symbols], dtype=np.float64),
+        "volume_ratio": nan,
+        "atr_pct": nan,
+        "gap_z": nan,
+    }
+
+def concat_metrics(*parts: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    return {key: np.concatenate([p[key] for p in parts]) for key in parts[0]}
+
+def overreaction_mask(metrics: Dict[str, np.ndarray], thresholds: ScanThresholds) -> np.ndarray:
+    """
+    Symbols whose gap or close-to-close move reaches its threshold and that pass
+    the optional volume and ATR filters (a filter of 0 is off). NaN never passes
+    a comparison, so quote-only symbols are judged on change_pct alone.
+    """
+    with np.errstate(invalid="ignore"):
+        moved = (np.abs(metrics["gap_pct"]) >= thresholds.gap_pct) | (np.abs(metrics["change_pct"]) >= thresholds.change_pct)
+        volume_ok = (thresholds.min_volume_ratio <= 0) | (metrics["volume_ratio"] >= thresholds.min_volume_ratio)
+        z_ok = (thresholds.min_gap_z <= 0) | (np.abs(metrics["gap_z"]) >= thresholds.min_gap_z)
+    return moved & volume_ok & z_ok
+
+def metrics_rows(metrics: Dict[str, np.ndarray], mask: Optional[np.ndarray] = None) -> List[Dict[str, Optional[float]]]:
+    """Selected rows as JSON-friendly dicts (NaN -> None), rounded for storage."""
+    index = np.flatnonzero(mask) if mask is not None else np.arange(len(metrics["symbol"]))
+    rows = []
+    for i in index:
+        row = {"symbol": metrics["symbol"][i]}
+        for key in ("price", "gap_pct", "change_pct", "volume_ratio", "atr_pct", "gap_z"):
+            value = float(metrics[key][i])
+            row[key] = None if np.isnan(value) else round(value, 4)
+        rows.append(row)
+    return rows
+
+def _nanmean(values: np.ndarray) -> np.ndarray:
+    # np.nanmean warns on all-NaN rows; count-based mean returns NaN for them silently
+    counts = np.sum(~np.isnan(values), axis=1)
+    sums = np.nansum(values, axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(counts > 0, sums / counts, np.nan)
@@ -1,62 +1,146 @@
+import asyncio
 import os
 import json
-from typing import Optional, Dict, Any
+import logging
+import copy
+import time
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Set, Tuple
 from google import genai
+from google.genai import types
+from .command_parser import normalize_command, parse_command
+from .metrics import cache_lookup, upstream_call
+
+MODEL_ID = "gemini-1.5-flash"
+
+logger = logging.getLogger(__name__)
+
+# Static part of the prompt; sent as system instruction so each request only carries the command
+SYSTEM_INSTRUCTION = """
+Handle als Trading-Assistent für FinDash. Übersetze den deutschen Befehl des Nutzers in ein JSON-Format.
+Nutze das folgende 'yfinance Capability Manual' zur Auswahl der richtigen Filterkeys.
+
+### yfinance Capability Manual (Kriterien mapping):
+- Marktkapitalisierung: 'market_cap' (in USD)
+- KGV (Kurs-Gewinn-Verhältnis): 'trailing_pe'
+- Dividendenrendite (z.B. 0.05 für 5%): 'dividend_yield'
+- Kurs-Buch-Verhältnis: 'price_to_book'
+- Nettomarge: 'profit_margins' (z.B. 0.2 für 20%)
+- Sektor/Branche: 'sector' (z.B. 'Technology', 'Financial Services', 'Healthcare')
+- Preis: 'current_price'
+
+Mögliche Aktionen: 'scan', 'trade', 'status', 'filter', 'research'.
+
+JSON-Format Beispiele:
+- "Zeig mir Verlierer > 5%": {"action": "scan", "filters": {"threshold": 5, "type": "losers"}}
+- "Kauf 10 AAPL": {"action": "trade", "symbol": "AAPL", "side": "buy", "quantity": 10}
+- "Status meiner Trades": {"action": "status"}
+- "Filtere Tech Aktien mit KGV unter 25 und Dividende über 2%": {"action": "filter", "criteria": {"sector": "Technology", "trailing_pe_max": 25, "dividend_yield_min": 0.02}}
+- "Ich möchte testen ob Dividenden-Aktien weniger Schwankungen haben": {"action": "research", "title": "Dividende vs Volatilität", "suggested_symbols": ["JNJ", "PG", "KO", "PEP", "XOM"], "hypothesis": "high_div_low_vol"}
+- "Abnormal returns after div-ex?": {"action": "research", "title": "Abnormale Renditen (Ex-Div)", "suggested_symbols": ["AAPL", "T", "VZ", "MAIN"], "hypothesis": "ex_div_returns"}
+- "Hätte die Overnight-Overreaction-Strategie bei Tech-Werten funktioniert?": {"action": "research", "title": "Backtest Overnight-Overreaction", "suggested_symbols": ["AAPL", "MSFT", "NVDA", "AMD", "TSLA"], "hypothesis": "overnight_overreaction"}
+
+Antworte NUR mit dem JSON.
+"""
 
 class GeminiNLP:
-    def __init__(self, api_key: Optional[str] = None):
+    """
+    Translates German commands to structured actions.
+    Order: local rule parser, then the command cache (normalized text -> action,
+    LRU with TTL), then Gemini through a pooled async client per API key.
+    """
+
+    def __init__(self, api_key: Optional[str] = None, cache_ttl: float = 3600.0, cache_size: int = 1024, max_clients: int = 64):
         self.api_key = api_key or os.getenv("GEMINI_API_KEY")
         if not self.api_key:
-            print("Warning: GEMINI_API_KEY not set")
+            logger.warning("GEMINI_API_KEY not set")
+        self.cache_ttl = cache_ttl
+        self.cache_size = cache_size
+        self.max_clients = max_clients
+        self._cache: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._clients: "OrderedDict[str, genai.Client]" = OrderedDict()
+        # Closing evicted clients (their async pools need an await), kept so aclose() can wait for them
+        self._closing: Set[asyncio.Task] = set()
+
+    def resolve_local(self, text: str) -> Optional[Dict[str, Any]]:
+        """Action from the rule parser or the command cache; None means the model is needed."""
+        action = parse_command(text)
+        if action is not None:
+            return action
+        key = normalize_command(text)
+        cached = self._cache.get(key)
+        if cached is not None and cached[0] <= time.monotonic():
+            del self._cache[key]
+            cached = None
+        cache_lookup("gemini_command", "miss" if cached is None else "hit")
+        if cached is None:
+            return None
+        self._cache.move_to_end(key)
+        return copy.deepcopy(cached[1])
 
-    def process_command(self, text: str, api_key: Optional[str] = None):
+    async def process_command(self, text: str, api_key: Optional[str] = None) -> Dict[str, Any]:
         """
         Translates German commands to structured actions.
         Uses provided api_key or falls back to environment variable.
         """
+        action = self.resolve_local(text)
+        if action is not None:
+            return action
+
         key_to_use = api_key or self.api_key
         if not key_to_use:
             return {"error": "Gemini API key not configured"}
-            
-        client = genai.Client(api_key=key_to_use)
-        model_id = "gemini-1.5-flash"
-        
-        prompt = f"""
-        Handle als Trading-Assistent für FinDash. Übersetze den folgenden deutschen Befehl in ein JSON-Format.
-        Nutze das folgende 'yfinance Capability Manual' zur Auswahl der richtigen Filterkeys.
-
-        ### yfinance Capability Manual (Kriterien mapping):
-        - Marktkapitalisierung: 'market_cap' (in USD)
-        - KGV (Kurs-Gewinn-Verhältnis): 'trailing_pe'
-        - Dividendenrendite (z.B. 0.05 für 5%): 'dividend_yield'
-        - Kurs-Buch-Verhältnis: 'price_to_book'
-        - Nettomarge: 'profit_margins' (z.B. 0.2 für 20%)
-        - Sektor/Branche: 'sector' (z.B. 'Technology', 'Financial Services', 'Healthcare')
-        - Preis: 'current_price'
-
-        Mögliche Aktionen: 'scan', 'trade', 'status', 'filter', 'research'.
-
-        Befehl: "{text}"
-
-        JSON-Format Beispiele:
-        - "Zeig mir Verlierer > 5%": {{"action": "scan", "filters": {{"threshold": 5, "type": "losers"}}}}
-        - "Kauf 10 AAPL": {{"action": "trade", "symbol": "AAPL", "side": "buy", "quantity": 10}}
-        - "Status meiner Trades": {{"action": "status"}}
-        - "Filtere Tech Aktien mit KGV unter 25 und Dividende über 2%": {{"action": "filter", "criteria": {{"sector": "Technology", "trailing_pe_max": 25, "dividend_yield_min": 0.02}}}}
-        - "Ich möchte testen ob Dividenden-Aktien weniger Schwankungen haben": {{"action": "research", "title": "Dividende vs Volatilität", "suggested_symbols": ["JNJ", "PG", "KO", "PEP", "XOM"], "hypothesis": "high_div_low_vol"}}
-        - "Abnormal returns after div-ex?": {{"action": "research", "title": "Abnormale Renditen (Ex-Div)", "suggested_symbols": ["AAPL", "T", "VZ", "MAIN"], "hypothesis": "ex_div_returns"}}
-
-        Antworte NUR mit dem JSON.
-        """
-        
+
         try:
-            response = client.models.generate_content(
-                model=model_id,
-                contents=prompt
-            )
+            with upstream_call("gemini", "generate_content"):
+                response = await self._client(key_to_use).aio.models.generate_content(
+                    model=MODEL_ID,
+                    contents=f'Befehl: "{text}"',
+                    config=types.GenerateContentConfig(
+                        system_instruction=SYSTEM_INSTRUCTION,
+                        response_mime_type="application/json",
+                    ),
+                )
             # Basic cleanup of markdown code blocks if present
             clean_text = response.text.replace('```json', '').replace('```', '').strip()
-            return json.loads(clean_text)
+            action = json.loads(clean_text)
         except Exception as e:
-            print(f"Gemini error: {e}")
+            logger.warning("Gemini request failed", extra={"error": str(e)})
             return {"error": str(e)}
+
+        if isinstance(action, dict) and "action" in action:
+            self._remember(normalize_command(text), action)
+        return action
+
+    async def aclose(self):
+        """Closes the pooled clients' HTTP connections."""
+        for client in self._clients.values():
+            await self._close_client(client)
+        self._clients.clear()
+        await asyncio.gather(*self._closing, return_exceptions=True)
+
+    @staticmethod
+    async def _close_client(client: genai.Client):
+        await client.aio.aclose()
+        client.close()
+
+    def _client(self, api_key: str) -> genai.Client:
+        client = self._clients.get(api_key)
+        if client is None:
+            client = genai.Client(api_key=api_key)
+            self._clients[api_key] = client
+            if len(self._clients) > self.max_clients:
+                _, old = self._clients.popitem(last=False)
+                # Called from process_command, so a loop is running; close both pools in the background
+                task = asyncio.ensure_future(self._close_client(old))
+                self._closing.add(task)
+                task.add_done_callback(self._closing.discard)
+        self._clients.move_to_end(api_key)
+        return client
+
+    def _remember(self, key: str, action: Dict[str, Any]):
+        self._cache[key] = (time.monotonic() + self.cache_ttl, copy.deepcopy(action))
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
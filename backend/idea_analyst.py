@@ -1,139 +1,166 @@
 import yfinance as yf
 import pandas as pd
 import numpy as np
-from typing import List, Dict, Any, Optional
-import asyncio
+from typing import List, Dict, Any, Optional, AsyncIterator, Callable, Tuple
+from .bar_store import bar_store
+from .backtest import evaluate, load_bars
+from .gap_matrix import GapMatrix
+from .metrics import upstream_call
+from .research_executor import ResearchExecutor, default_executor
 
 class IdeaAnalyst:
     """
     Analyzes trading ideas and hypotheses using yfinance data.
+    Each hypothesis computes one row per symbol; the rows are fanned out over
+    the ResearchExecutor, so a run takes about as long as its slowest symbol.
     """
 
-    def __init__(self):
-        pass
+    def __init__(self, executor: Optional[ResearchExecutor] = None):
+        self.executor = executor or default_executor
 
     async def analyze(self, hypothesis: str, symbols: List[str]) -> Dict[str, Any]:
+        summary, columns, row_func = self._spec(hypothesis)
+        results, errors = await self.executor.run(symbols, row_func)
+        return {"summary": summary, "columns": columns, "data": results, "errors": errors}
+
+    async def analyze_stream(self, hypothesis: str, symbols: List[str]) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Streaming variant of `analyze`: yields a 'header' event (summary, columns)
+        first, then one 'row' or 'error' event per symbol as soon as it is
+        computed, and a final 'done' event with the counts.
+        """
+        summary, columns, row_func = self._spec(hypothesis)
+        yield {"event": "header", "summary": summary, "columns": columns}
+        rows = errors = 0
+        async for symbol, row, error in self.executor.stream(symbols, row_func):
+            if error is None:
+                rows += 1
+                yield {"event": "row", "data": row}
+            else:
+                errors += 1
+                yield {"event": "error", "symbol": symbol, "error": error}
+        yield {"event": "done", "rows": rows, "errors": errors}
+
+    def _spec(self, hypothesis: str) -> Tuple[str, List[Dict[str, str]], Callable[[str], Dict[str, Any]]]:
+        """(summary, columns, per-symbol row function) of a hypothesis."""
         if hypothesis == "high_div_low_vol":
-            return await self._analyze_div_vs_vol(symbols)
+            return (
+                "Vergleich von Dividendenrendite und annualisierter Volatilität (1J).",
+                [
+                    {"key": "symbol", "label": "Symbol"},
+                    {"key": "name", "label": "Name"},
+                    {"key": "price", "label": "Preis"},
+                    {"key": "div_yield", "label": "Div Rendite %"},
+                    {"key": "volatility", "label": "Volatilität %"}
+                ],
+                self._div_vs_vol_row,
+            )
         elif hypothesis == "ex_div_returns":
-            return await self._analyze_ex_div_returns(symbols)
+            return (
+                "Kursbewegung (+/- 10 Tage) um den letzten Ex-Dividenden-Tag.",
+                [
+                    {"key": "symbol", "label": "Symbol"},
+                    {"key": "last_ex_div", "label": "Ex-Tag"},
+                    {"key": "period_return", "label": "Rendite %"},
+                    {"key": "current_price", "label": "Preis"}
+                ],
+                self._ex_div_row,
+            )
+        elif hypothesis == "overnight_overreaction":
+            return (
+                "Backtest Overnight-Overreaction (5J): Einstieg zur Eröffnung gegen Gaps ab 5%, "
+                "Ausstieg zum Schlusskurs, 0,20% Round-Trip-Gebühren.",
+                [
+                    {"key": "symbol", "label": "Symbol"},
+                    {"key": "trades", "label": "Trades"},
+                    {"key": "hit_rate", "label": "Trefferquote %"},
+                    {"key": "avg_return_pct", "label": "Ø Rendite %"},
+                    {"key": "total_return_pct", "label": "Gesamtrendite %"},
+                    {"key": "max_drawdown_pct", "label": "Max Drawdown %"}
+                ],
+                self._overreaction_row,
+            )
         else:
-            return await self._generic_research(symbols)
-
-    async def _analyze_div_vs_vol(self, symbols: List[str]) -> Dict[str, Any]:
-        results = []
-        for symbol in symbols:
-            try:
-                ticker = yf.Ticker(symbol)
-                # Fetch 1 year of data for volatility
-                hist = await asyncio.to_thread(ticker.history, period="1y")
-                info = ticker.info
-                
-                if not hist.empty:
-                    # Calculate annualized volatility
-                    returns = hist['Close'].pct_change().dropna()
-                    vol = returns.std() * np.sqrt(252) * 100
-                    
-                    div_yield = info.get("dividendYield", 0) * 100 if info.get("dividendYield") else 0
-                    
-                    results.append({
-                        "symbol": symbol,
-                        "name": info.get("longName", symbol),
-                        "price": info.get("currentPrice"),
-                        "div_yield": round(div_yield, 2),
-                        "volatility": round(vol, 2),
-                        "market_cap": info.get("marketCap")
-                    })
-            except Exception as e:
-                print(f"Error analyzing {symbol}: {e}")
-                
+            return (
+                "Allgemeine Marktdaten für die angefragten Symbole.",
+                [
+                    {"key": "symbol", "label": "Symbol"},
+                    {"key": "name", "label": "Name"},
+                    {"key": "price", "label": "Preis"},
+                    {"key": "market_cap", "label": "Market Cap"}
+                ],
+                self._generic_row,
+            )
+
+    def _div_vs_vol_row(self, symbol: str) -> Dict[str, Any]:
+        # 1 year of daily bars for volatility, served from the local bar store
+        hist = bar_store.history(symbol, period="1y")
+        if hist.empty:
+            raise LookupError("Keine Kursdaten")
+        info = self.executor.info(symbol)
+
+        # Calculate annualized volatility
+        returns = hist['Close'].pct_change().dropna()
+        vol = returns.std() * np.sqrt(252) * 100
+
+        div_yield = info.get("dividendYield", 0) * 100 if info.get("dividendYield") else 0
+
         return {
-            "summary": "Vergleich von Dividendenrendite und annualisierter Volatilität (1J).",
-            "columns": [
-                {"key": "symbol", "label": "Symbol"},
-                {"key": "name", "label": "Name"},
-                {"key": "price", "label": "Preis"},
-                {"key": "div_yield", "label": "Div Rendite %"},
-                {"key": "volatility", "label": "Volatilität %"}
-            ],
-            "data": results
+            "symbol": symbol,
+            "name": info.get("longName", symbol),
+            "price": info.get("currentPrice"),
+            "div_yield": round(div_yield, 2),
+            "volatility": round(vol, 2),
+            "market_cap": info.get("marketCap")
         }
 
-    async def _analyze_ex_div_returns(self, symbols: List[str]) -> Dict[str, Any]:
-        results = []
-        for symbol in symbols:
-            try:
-                ticker = yf.Ticker(symbol)
-                actions = await asyncio.to_thread(lambda: ticker.actions)
-                if actions is None or actions.empty:
-                    continue
-                
-                divs = actions[actions['Dividends'] > 0]
-                if divs.empty:
-                    continue
-                
-                # Get last ex-div date
-                last_ex_div = divs.index[-1]
-                
-                # Fetch history around that date
-                start_date = (last_ex_div - pd.Timedelta(days=10)).strftime('%Y-%m-%d')
-                end_date = (last_ex_div + pd.Timedelta(days=10)).strftime('%Y-%m-%d')
-                hist = await asyncio.to_thread(ticker.history, start=start_date, end=end_date)
-                
-                if not hist.empty:
-                    # Calculate return 5 days before to 5 days after
-                    # This is a simplified "abnormal return" proxy
-                    # For a real one we'd need a benchmark, but let's keep it simple for now as requested
-                    try:
-                        price_before = hist['Close'].iloc[0]
-                        price_after = hist['Close'].iloc[-1]
-                        total_return = ((price_after - price_before) / price_before) * 100
-                        
-                        results.append({
-                            "symbol": symbol,
-                            "last_ex_div": last_ex_div.strftime('%Y-%m-%d'),
-                            "period_return": round(total_return, 2),
-                            "current_price": yf.Ticker(symbol).info.get("currentPrice")
-                        })
-                    except:
-                        pass
-                        
-            except Exception as e:
-                print(f"Error analyzing ex-div for {symbol}: {e}")
+    def _ex_div_row(self, symbol: str) -> Dict[str, Any]:
+        with upstream_call("yfinance", "actions", symbol):
+            actions = yf.Ticker(symbol).actions
+        if actions is None or actions.empty:
+            raise LookupError("Keine Dividendendaten")
+
+        divs = actions[actions['Dividends'] > 0]
+        if divs.empty:
+            raise LookupError("Keine Dividendendaten")
+
+        # Get last ex-div date
+        last_ex_div = divs.index[-1]
+
+        # History around that date
+        start_date = (last_ex_div - pd.Timedelta(days=10)).strftime('%Y-%m-%d')
+        end_date = (last_ex_div + pd.Timedelta(days=10)).strftime('%Y-%m-%d')
+        hist = bar_store.history(symbol, start=start_date, end=end_date)
+        if hist.empty:
+            raise LookupError("Keine Kursdaten um den Ex-Tag")
+
+        # Calculate return 5 days before to 5 days after
+        # This is a simplified "abnormal return" proxy
+        # For a real one we'd need a benchmark, but let's keep it simple for now as requested
+        price_before = hist['Close'].iloc[0]
+        price_after = hist['Close'].iloc[-1]
+        total_return = ((price_after - price_before) / price_before) * 100
 
         return {
-            "summary": "Kursbewegung (+/- 10 Tage) um den letzten Ex-Dividenden-Tag.",
-            "columns": [
-                {"key": "symbol", "label": "Symbol"},
-                {"key": "last_ex_div", "label": "Ex-Tag"},
-                {"key": "period_return", "label": "Rendite %"},
-                {"key": "current_price", "label": "Preis"}
-            ],
-            "data": results
+            "symbol": symbol,
+            "last_ex_div": last_ex_div.strftime('%Y-%m-%d'),
+            "period_return": round(total_return, 2),
+            "current_price": self.executor.info(symbol).get("currentPrice")
         }
 
-    async def _generic_research(self, symbols: List[str]) -> Dict[str, Any]:
-        results = []
-        for symbol in symbols:
-            try:
-                ticker = yf.Ticker(symbol)
-                info = ticker.info
-                results.append({
-                    "symbol": symbol,
-                    "name": info.get("longName", symbol),
-                    "price": info.get("currentPrice"),
-                    "market_cap": info.get("marketCap"),
-                    "sector": info.get("sector")
-                })
-            except:
-                pass
+    def _overreaction_row(self, symbol: str) -> Dict[str, Any]:
+        matrix = GapMatrix.from_frames({symbol: load_bars(symbol, "5y")}, days=None)
+        result = evaluate(matrix, threshold_pct=5.0, include_curve=False)
+        return {"symbol": symbol, **{key: result[key] for key in (
+            "trades", "hit_rate", "avg_return_pct", "total_return_pct", "max_drawdown_pct"
+        )}}
+
+    def _generic_row(self, symbol: str) -> Dict[str, Any]:
+        info = self.executor.info(symbol)
         return {
-            "summary": "Allgemeine Marktdaten für die angefragten Symbole.",
-            "columns": [
-                {"key": "symbol", "label": "Symbol"},
-                {"key": "name", "label": "Name"},
-                {"key": "price", "label": "Preis"},
-                {"key": "market_cap", "label": "Market Cap"}
-            ],
-            "data": results
+            "symbol": symbol,
+            "name": info.get("longName", symbol),
+            "price": info.get("currentPrice"),
+            "market_cap": info.get("marketCap"),
+            "sector": info.get("sector")
         }
@@ -0,0 +1,84 @@
+import asyncio
+import logging
+import os
+from contextlib import contextmanager
+from typing import Awaitable, Callable
+
+try:
+    import fcntl
+except ImportError:  # not on Linux: a single process is assumed, every lock is granted
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+@contextmanager
+def file_lock(path: str):
+    """Blocking exclusive lock across processes (flock on `path`), e.g. around migrations."""
+    if fcntl is None:
+        yield
+        return
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+class LeaderLease:
+    """
+    Leader election between the worker processes of one deployment
+    (`uvicorn --workers N`): the process holding a non-blocking flock on the
+    lock file is the leader and runs the background jobs; the others retry
+    every `retry_seconds`. The kernel drops the lock when the leader exits, so
+    another worker takes over without stale-lease timeouts.
+    """
+
+    def __init__(self, path: str, retry_seconds: float = 15.0):
+        self.path = path
+        self.retry_seconds = retry_seconds
+        self._file = None
+
+    @property
+    def is_leader(self) -> bool:
+        return self._file is not None
+
+    def try_acquire(self) -> bool:
+        if self._file is not None:
+            return True
+        if fcntl is None:
+            self._file = open(os.devnull, "w")
+            return True
+        f = open(self.path, "a+")
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            f.close()
+            return False
+        # The pid is only informational (who is leading right now)
+        f.truncate(0)
+        f.write(f"{os.getpid()}\n")
+        f.flush()
+        self._file = f
+        logger.info("leader lease acquired", extra={"path": self.path, "pid": os.getpid()})
+        return True
+
+    def release(self):
+        if self._file is not None:
+            if fcntl is not None:
+                fcntl.flock(self._file, fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
+
+    async def run(self, job: Callable[[], Awaitable[None]]):
+        """Waits until this process leads, then runs `job` (a background loop) in it."""
+        while not self.try_acquire():
+            await asyncio.sleep(self.retry_seconds)
+        await job()
+
+def build_leader_lease(db_file: str) -> LeaderLease:
+    """Lease on LEADER_LOCK_FILE (default: next to the database, so one leader per deployment)."""
+    return LeaderLease(
+        os.getenv("LEADER_LOCK_FILE", f"{db_file}.leader"),
+        retry_seconds=float(os.getenv("LEADER_RETRY_SECONDS", "15")),
+    )
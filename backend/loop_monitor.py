@@ -0,0 +1,73 @@
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+class LoopBlockMonitor:
+    """
+    Debug aid that reports event-loop blocks. A coroutine on the loop bumps a
+    heartbeat every `interval` seconds; a watchdog thread checks it, and when
+    the heartbeat is older than `threshold_ms` it logs the loop thread's
+    current stack (the code that is blocking) once per block, plus the total
+    blocked time when the loop resumes. A stack that points at harmless code
+    means the loop was starved of the GIL by a CPU-heavy worker thread.
+    Enabled with LOOP_BLOCK_WARN_MS (see `build_loop_monitor`).
+    """
+
+    def __init__(self, threshold_ms: float = 100.0, interval: float = 0.01):
+        self.threshold = threshold_ms / 1000
+        self.interval = interval
+        self.blocks = 0
+        self._beat = time.monotonic()
+        self._loop_thread_id: Optional[int] = None
+        self._stop = threading.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+
+    async def start(self):
+        self._loop_thread_id = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.create_task(self._heartbeat())
+        self._thread = threading.Thread(target=self._watch, name="loop-monitor", daemon=True)
+        self._thread.start()
+
+    async def stop(self):
+        self._stop.set()
+        if self._task:
+            self._task.cancel()
+        if self._thread:
+            self._thread.join(timeout=1)
+
+    async def _heartbeat(self):
+        while True:
+            now = time.monotonic()
+            lag = now - self._beat - self.interval
+            if lag > self.threshold:
+                logger.warning("event loop was blocked", extra={"blocked_ms": round(lag * 1000)})
+            self._beat = now
+            await asyncio.sleep(self.interval)
+
+    def _watch(self):
+        reported = None
+        while not self._stop.wait(self.threshold / 2):
+            beat = self._beat
+            if time.monotonic() - beat - self.interval <= self.threshold or reported == beat:
+                continue
+            # Still in the same block: report its stack only once
+            reported = beat
+            self.blocks += 1
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = "".join(traceback.format_stack(frame)) if frame else "(no frame)"
+            logger.warning("event loop blocked", extra={"threshold_ms": round(self.threshold * 1000), "stack": stack})
+
+def build_loop_monitor() -> Optional[LoopBlockMonitor]:
+    """Monitor configured from LOOP_BLOCK_WARN_MS; None (disabled) when unset."""
+    threshold = os.getenv("LOOP_BLOCK_WARN_MS")
+    return LoopBlockMonitor(threshold_ms=float(threshold)) if threshold else None
@@ -3,12 +3,63 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse
 import uvicorn
+import asyncio
 import os
+from contextlib import asynccontextmanager
 
-from .database import create_db_and_tables
-from .routers import auth, watchlists, public, trading, users
+from .backtest import shutdown_grid_pool
+from .database import create_db_and_tables, sqlite_file_name
+from .log_config import configure_logging
+from .metrics import MetricsMiddleware
+from .executors import executors
+from .leader import build_leader_lease, file_lock
+from .loop_monitor import build_loop_monitor
+from .fundamentals_refresher import FundamentalsRefresher
+from .universe import load_universe
+from .price_hub import build_price_hub
+from .services import Services
+from .routers import auth, watchlists, public, trading, users, prices
 
-app = FastAPI(title="AI-Native Trading Dashboard")
+# Structured (JSON) logs, see log_config.py
+configure_logging()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Debug aid: LOOP_BLOCK_WARN_MS=50 logs the stack of anything blocking the event loop longer
+    monitor = build_loop_monitor()
+    if monitor:
+        await monitor.start()
+    # With `uvicorn --workers N` every worker starts here; migrations run one worker at a time
+    with file_lock(f"{sqlite_file_name}.migrate.lock"):
+        create_db_and_tables()
+    # Background jobs run in one worker only (the leader); the others take over if it exits
+    leader = build_leader_lease(sqlite_file_name)
+    # Fetchers and API clients are built once here and shared by all requests (see services.py)
+    app.state.services = Services()
+    # Keep the screener's fundamentals table fresh in the background
+    refresher = FundamentalsRefresher(
+        load_universe(), interval_hours=float(os.getenv("FUNDAMENTALS_REFRESH_HOURS", "12"))
+    )
+    fundamentals_task = asyncio.create_task(leader.run(refresher.run_forever))
+    # Overnight-gap scan snapshots for /scan
+    scan_task = asyncio.create_task(leader.run(app.state.services.scan_scheduler.run_forever))
+    # Live price push for /ws/prices
+    app.state.price_hub = build_price_hub(app.state.services.data_fetcher.fetch_stocks)
+    await app.state.price_hub.start()
+    try:
+        yield
+    finally:
+        fundamentals_task.cancel()
+        scan_task.cancel()
+        await app.state.price_hub.stop()
+        await app.state.services.aclose()
+        executors.shutdown()
+        shutdown_grid_pool()
+        leader.release()
+        if monitor:
+            await monitor.stop()
+
+app = FastAPI(title="AI-Native Trading Dashboard", lifespan=lifespan)
 
 # CORS Configuration
 app.add_middleware(
@@ -17,10 +68,8 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
-
-@app.on_event("startup")
-def on_startup():
-    create_db_and_tables()
+# Outermost, so latency includes the other middleware; exposed at /metrics
+app.add_middleware(MetricsMiddleware)
 
 # Register Routers
 app.include_router(auth.router)
@@ -28,6 +77,7 @@ app.include_router(watchlists.router)
 app.include_router(public.router)
 app.include_router(trading.router)
 app.include_router(users.router)
+app.include_router(prices.router)
 
 # Static Files & Frontend Orchestration
 # Serve frontend assets from /static
@@ -1,44 +1,217 @@
+import logging
+import threading
+import time
+from bisect import bisect_left
+from collections import OrderedDict
+from typing import Iterable, List, Dict, Optional, Set, Tuple
+
 import requests
 from binance.client import Client
-from typing import List, Dict
+
+from .executors import bind_context, executors
+from .metrics import cache_lookup, upstream_call
+
+logger = logging.getLogger(__name__)
+
+# Binance exchange info has no asset names; these cover the common name searches
+ASSET_NAMES = {
+    "BTC": "Bitcoin", "ETH": "Ethereum", "BNB": "Binance Coin", "SOL": "Solana",
+    "XRP": "Ripple", "ADA": "Cardano", "DOGE": "Dogecoin", "DOT": "Polkadot",
+    "AVAX": "Avalanche", "LINK": "Chainlink", "LTC": "Litecoin", "TRX": "Tron",
+    "MATIC": "Polygon", "SHIB": "Shiba Inu", "UNI": "Uniswap", "XLM": "Stellar",
+    "ATOM": "Cosmos", "NEAR": "Near Protocol", "TON": "Toncoin", "PEPE": "Pepe",
+}
+# Ranking of quote assets when several pairs match equally well
+QUOTE_RANK = {"USDT": 0, "USDC": 1, "FDUSD": 2, "EUR": 3, "BTC": 4, "ETH": 5, "BNB": 6}
+
+class _CryptoIndex:
+    """Sorted token arrays over the tradable Binance pairs; prefix lookups are two bisects."""
+
+    def __init__(self, symbols: List[Dict[str, str]]):
+        self.symbols = symbols
+        self.known = {s["symbol"] for s in symbols}
+        self.by_symbol = sorted((s["symbol"], i) for i, s in enumerate(symbols))
+        self.by_base = sorted((s["base"], i) for i, s in enumerate(symbols))
+        self.by_quote = sorted((s["quote"], i) for i, s in enumerate(symbols))
+        self.by_name = sorted(
+            (word, i) for i, s in enumerate(symbols) if s["name"] != s["symbol"] for word in s["name"].upper().split()
+        )
+
+    @staticmethod
+    def _prefix(keys: List[Tuple[str, int]], prefix: str) -> List[int]:
+        lo = bisect_left(keys, (prefix, -1))
+        hi = bisect_left(keys, (prefix + "\uffff", -1))
+        return [i for _, i in keys[lo:hi]]
+
+    def _rank(self, i: int) -> Tuple[int, int, str]:
+        s = self.symbols[i]
+        return QUOTE_RANK.get(s["quote"], len(QUOTE_RANK)), len(s["symbol"]), s["symbol"]
+
+    def search(self, query: str, limit: int) -> List[int]:
+        buckets = [
+            self._prefix(self.by_symbol, query),
+            self._prefix(self.by_base, query),
+            self._prefix(self.by_name, query),
+            self._prefix(self.by_quote, query),
+        ]
+        seen, result = set(), []
+        for bucket in buckets:
+            for i in sorted(set(bucket) - seen, key=self._rank):
+                seen.add(i)
+                result.append(i)
+                if len(result) >= limit:
+                    return result
+        return result
 
 class MarketSearch:
-    """Handles searching for tickers across Yahoo Finance and Binance."""
-    
-    def __init__(self, binance_client: Client):
+    """
+    Handles searching for tickers across Yahoo Finance and Binance.
+    Crypto matches come from an in-memory index over the Binance exchange info,
+    rebuilt in the background every `refresh_interval` seconds instead of being
+    downloaded per query; after a failed rebuild the next attempt waits
+    `retry_interval` seconds. Yahoo results are cached per normalized query.
+    """
+
+    def __init__(
+        self,
+        binance_client: Client,
+        session: Optional[requests.Session] = None,
+        refresh_interval: float = 3600.0,
+        retry_interval: float = 60.0,
+        yahoo_ttl: float = 600.0,
+        yahoo_cache_size: int = 2048,
+    ):
         self.binance_client = binance_client
+        self.session = session or requests.Session()
+        self.refresh_interval = refresh_interval
+        self.retry_interval = retry_interval
+        self.yahoo_ttl = yahoo_ttl
+        self.yahoo_cache_size = yahoo_cache_size
+        self._index: Optional[_CryptoIndex] = None
+        self._index_built = 0.0
+        # Time of the last rebuild attempt, successful or not
+        self._index_attempted = float("-inf")
+        self._index_lock = threading.Lock()
+        self._refreshing = False
+        self._yahoo_cache: "OrderedDict[str, Tuple[float, List[Dict[str, str]]]]" = OrderedDict()
+        self._yahoo_lock = threading.Lock()
 
     def search(self, query: str) -> List[Dict[str, str]]:
         results = []
-        
+
         # Search Stocks (Yahoo)
         try:
-            url = f"https://query2.finance.yahoo.com/v1/finance/search?q={query}&quotesCount=5&newsCount=0"
-            headers = {"User-Agent": "Mozilla/5.0"}
-            res = requests.get(url, headers=headers)
-            res.raise_for_status()
-            quotes = res.json().get('quotes', [])
-            for q in quotes:
-                results.append({
-                    "symbol": q.get("symbol"),
-                    "name": q.get("shortname") or q.get("longname"),
-                    "type": "stock"
-                })
+            results.extend(self._search_yahoo(query))
         except Exception as e:
-            print(f"Yahoo Search error: {e}")
+            logger.warning("Yahoo search failed", extra={"query": query, "error": str(e)})
 
         # Search Crypto (Binance)
         try:
-            info = self.binance_client.get_exchange_info()
-            symbols = [s['symbol'] for s in info['symbols']]
-            matches = [s for s in symbols if query.upper() in s]
-            for m in matches[:5]:
-                results.append({
-                    "symbol": m,
-                    "name": m,
-                    "type": "crypto"
-                })
+            results.extend(self._search_crypto(query))
         except Exception as e:
-            print(f"Binance Search error: {e}")
-            
+            logger.warning("Binance search failed", extra={"query": query, "error": str(e)})
+
         return results
+
+    def is_known_crypto(self, symbol: str) -> bool:
+        """True if the symbol is a tradable Binance pair (uses the cached index)."""
+        return symbol.upper() in self._crypto_index().known
+
+    def known_stocks(self, symbols: Iterable[str]) -> Set[str]:
+        """
+        The symbols Yahoo lists (exact symbol match in its search, cached per
+        query like the search box). Lookups run on the market_data pool;
+        Yahoo errors propagate, so callers can tell "unknown" from "unchecked".
+        """
+        symbols = [s.upper() for s in symbols]
+        listed = executors.pool("market_data").map(bind_context(self._is_listed), symbols)
+        return {symbol for symbol, ok in zip(symbols, listed) if ok}
+
+    def _is_listed(self, symbol: str) -> bool:
+        return any((q.get("symbol") or "").upper() == symbol for q in self._search_yahoo(symbol))
+
+    def _search_crypto(self, query: str, limit: int = 5) -> List[Dict[str, str]]:
+        index = self._crypto_index()
+        return [
+            {"symbol": index.symbols[i]["symbol"], "name": index.symbols[i]["name"], "type": "crypto"}
+            for i in index.search(query.strip().upper(), limit)
+        ]
+
+    def _search_yahoo(self, query: str) -> List[Dict[str, str]]:
+        key = query.strip().lower()
+        now = time.monotonic()
+        with self._yahoo_lock:
+            cached = self._yahoo_cache.get(key)
+            if cached and cached[0] > now:
+                self._yahoo_cache.move_to_end(key)
+                cache_lookup("yahoo_search", "hit")
+                return cached[1]
+
+        cache_lookup("yahoo_search", "miss")
+        with upstream_call("yahoo", "search"):
+            res = self.session.get(
+                "https://query2.finance.yahoo.com/v1/finance/search",
+                params={"q": query, "quotesCount": 5, "newsCount": 0},
+                headers={"User-Agent": "Mozilla/5.0"},
+                timeout=5,
+            )
+            res.raise_for_status()
+        results = [
+            {"symbol": q.get("symbol"), "name": q.get("shortname") or q.get("longname"), "type": "stock"}
+            for q in res.json().get('quotes', [])
+        ]
+
+        with self._yahoo_lock:
+            self._yahoo_cache[key] = (now + self.yahoo_ttl, results)
+            self._yahoo_cache.move_to_end(key)
+            while len(self._yahoo_cache) > self.yahoo_cache_size:
+                self._yahoo_cache.popitem(last=False)
+        return results
+
+    def _crypto_index(self) -> _CryptoIndex:
+        now = time.monotonic()
+        if self._index is None:
+            # First use builds synchronously; afterwards stale indexes are rebuilt in the background
+            with self._index_lock:
+                if self._index is None:
+                    if now - self._index_attempted < self.retry_interval:
+                        raise RuntimeError("Binance index unavailable, retrying later")
+                    try:
+                        self._rebuild_index()
+                    finally:
+                        self._index_attempted = time.monotonic()
+        elif (
+            now - self._index_built > self.refresh_interval
+            and now - self._index_attempted > self.retry_interval
+            and not self._refreshing
+        ):
+            self._refreshing = True
+            threading.Thread(target=self._background_rebuild, daemon=True).start()
+        return self._index
+
+    def _background_rebuild(self):
+        try:
+            with self._index_lock:
+                self._rebuild_index()
+        except Exception as e:
+            logger.warning("Binance index refresh failed", extra={"error": str(e)})
+        finally:
+            # Failed rebuilds back off too, so searches during an outage do not each start one
+            self._index_attempted = time.monotonic()
+            self._refreshing = False
+
+    def _rebuild_index(self):
+        with upstream_call("binance", "exchange_info"):
+            info = self.binance_client.get_exchange_info()
+        symbols = [
+            {
+                "symbol": s["symbol"],
+                "base": s.get("baseAsset", ""),
+                "quote": s.get("quoteAsset", ""),
+                "name": ASSET_NAMES.get(s.get("baseAsset", ""), s["symbol"]),
+            }
+            for s in info["symbols"]
+            if s.get("status", "TRADING") == "TRADING"
+        ]
+        self._index = _CryptoIndex(symbols)
+        self._index_built = time.monotonic()
@@ -0,0 +1,357 @@
+import contextvars
+import logging
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Prometheus text exposition format, version 0.0.4
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 250, 1000)
+
+# Distinct symbols tracked per upstream endpoint; further symbols are counted as "_other"
+MAX_SYMBOL_LABELS = int(os.getenv("METRICS_MAX_SYMBOLS", "500"))
+# Requests slower than this are logged as warnings with their query/upstream counts
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "1000"))
+
+access_log = logging.getLogger("backend.access")
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+class _Metric(ABC):
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels[name]) for name in self.labels)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}", *self._samples()]
+
+    @abstractmethod
+    def _samples(self) -> List[str]:
+        """The exposition lines of all label sets."""
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = ()):
+        super().__init__(name, help, labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def values(self) -> Dict[Tuple[str, ...], float]:
+        with self._lock:
+            return dict(self._values)
+
+    def _samples(self) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labels, key)} {_format_value(v)}" for key, v in sorted(self.values().items())]
+
+class Gauge(Counter):
+    """Value set at scrape time by a collector (see `MetricsRegistry.on_collect`)."""
+    kind = "gauge"
+
+    def set(self, value: float, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = (), buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+        # key -> [count per bucket (non-cumulative, last = +Inf), sum]
+        self._values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels: str):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][index] += 1
+            state[1] += value
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, (list(counts), total)) for key, (counts, total) in self._values.items())
+        lines = []
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="%s"' % _format_value(bound)
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {_format_value(round(total, 6))}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {cumulative}")
+        return lines
+
+class MetricsRegistry:
+    """
+    Minimal in-process metrics registry rendered in the Prometheus text format
+    at /metrics. Collectors registered with `on_collect` refresh gauges right
+    before each scrape.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], None]] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def on_collect(self, collector: Callable[[], None]):
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        for collector in self._collectors:
+            collector()
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+registry = MetricsRegistry()
+
+REQUEST_LATENCY = registry.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template", ("method", "route", "status")
+))
+REQUEST_DB_QUERIES = registry.register(Histogram(
+    "http_request_db_queries", "SQL statements executed per HTTP request", ("route",), COUNT_BUCKETS
+))
+REQUEST_UPSTREAM_CALLS = registry.register(Histogram(
+    "http_request_upstream_calls", "Upstream API calls made per HTTP request", ("route",), COUNT_BUCKETS
+))
+DB_QUERIES = registry.register(Counter(
+    "db_queries_total", "SQL statements executed, by originating route or background job", ("origin",)
+))
+UPSTREAM_CALLS = registry.register(Counter(
+    "upstream_calls_total", "Upstream API calls by service, endpoint, outcome and originating route/job",
+    ("service", "endpoint", "outcome", "origin"),
+))
+UPSTREAM_LATENCY = registry.register(Histogram(
+    "upstream_call_duration_seconds", "Upstream API call latency", ("service", "endpoint", "outcome")
+))
+UPSTREAM_SYMBOLS = registry.register(Counter(
+    "upstream_symbol_requests_total", "Symbols requested from upstream APIs (batched calls count each symbol)",
+    ("service", "endpoint", "symbol"),
+))
+CACHE_LOOKUPS = registry.register(Counter(
+    "cache_lookups_total", "Cache lookups by cache and result (hit, stale, coalesced, miss)", ("cache", "result")
+))
+CACHE_HIT_RATIO = registry.register(Gauge(
+    "cache_hit_ratio", "Share of lookups served without an upstream call (hit, stale or coalesced)", ("cache",)
+))
+
+# --- Per-request / per-job attribution ---
+
+class RequestStats:
+    """
+    Counters of the current HTTP request or background job. Lives in a
+    context variable, so it follows the request into worker threads started
+    through executors.py (which copy the context).
+    """
+    __slots__ = ("scope", "name", "db_queries", "upstream_calls", "cache_hits", "cache_misses", "_lock")
+
+    def __init__(self, name: str = "", scope: Optional[dict] = None):
+        self.scope = scope
+        self.name = name
+        self.db_queries = 0
+        self.upstream_calls = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self._lock = threading.Lock()
+
+    @property
+    def origin(self) -> str:
+        """Route template of the request ("/chart-data", not the raw path) or the job name."""
+        if self.scope is None:
+            return self.name
+        route = self.scope.get("route")
+        return getattr(route, "path", None) or "unmatched"
+
+    def add(self, field: str, amount: int = 1):
+        with self._lock:
+            setattr(self, field, getattr(self, field) + amount)
+
+_current: contextvars.ContextVar[Optional[RequestStats]] = contextvars.ContextVar("request_stats", default=None)
+
+def current_origin() -> str:
+    stats = _current.get()
+    return stats.origin if stats is not None else "other"
+
+@contextmanager
+def job_context(name: str):
+    """Attributes DB queries and upstream calls inside the block to background job `name`."""
+    token = _current.set(RequestStats(name))
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+# --- Upstream calls ---
+
+class UpstreamCall:
+    """Handle yielded by `upstream_call`; set `outcome` (e.g. "empty") when a call fails silently."""
+    __slots__ = ("outcome",)
+
+    def __init__(self):
+        self.outcome = "ok"
+
+_seen_symbols: Dict[Tuple[str, str], set] = {}
+_seen_lock = threading.Lock()
+
+def _symbol_label(service: str, endpoint: str, symbol: str) -> str:
+    with _seen_lock:
+        seen = _seen_symbols.setdefault((service, endpoint), set())
+        if symbol in seen:
+            return symbol
+        if len(seen) < MAX_SYMBOL_LABELS:
+            seen.add(symbol)
+            return symbol
+    return "_other"
+
+@contextmanager
+def upstream_call(service: str, endpoint: str, symbols: Union[str, Iterable[str], None] = None):
+    """
+    Counts and times one upstream call. An exception escaping the block marks
+    the call as "error" (and is re-raised); otherwise the outcome is "ok" unless
+    the caller set another one on the yielded handle.
+
+        with upstream_call("yfinance", "download", batch) as call:
+            frame = yf.download(batch, ...)
+            if frame.empty:
+                call.outcome = "empty"
+    """
+    call = UpstreamCall()
+    started = time.perf_counter()
+    try:
+        yield call
+    except BaseException:
+        call.outcome = "error"
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        UPSTREAM_CALLS.inc(service=service, endpoint=endpoint, outcome=call.outcome, origin=current_origin())
+        UPSTREAM_LATENCY.observe(elapsed, service=service, endpoint=endpoint, outcome=call.outcome)
+        for symbol in ([symbols] if isinstance(symbols, str) else symbols or ()):
+            UPSTREAM_SYMBOLS.inc(service=service, endpoint=endpoint, symbol=_symbol_label(service, endpoint, symbol))
+        stats = _current.get()
+        if stats is not None:
+            stats.add("upstream_calls")
+
+# --- Caches ---
+
+def cache_lookup(cache: str, result: str, count: int = 1):
+    """Records `count` lookups of `cache` with result "hit", "stale", "coalesced" or "miss"."""
+    if count <= 0:
+        return
+    CACHE_LOOKUPS.inc(count, cache=cache, result=result)
+    stats = _current.get()
+    if stats is not None:
+        stats.add("cache_misses" if result == "miss" else "cache_hits", count)
+
+def _collect_hit_ratios():
+    totals: Dict[str, List[float]] = {}
+    for (cache, result), value in CACHE_LOOKUPS.values().items():
+        served, lookups = totals.setdefault(cache, [0.0, 0.0])
+        totals[cache] = [served + (value if result != "miss" else 0.0), lookups + value]
+    for cache, (served, lookups) in totals.items():
+        CACHE_HIT_RATIO.set(round(served / lookups, 4) if lookups else 0.0, cache=cache)
+
+registry.on_collect(_collect_hit_ratios)
+
+# --- Database ---
+
+def instrument_engine(engine: Engine):
+    """Counts every SQL statement run through `engine`, per request and per origin."""
+    @event.listens_for(engine, "before_cursor_execute")
+    def _count_query(conn, cursor, statement, parameters, context, executemany):
+        stats = _current.get()
+        DB_QUERIES.inc(origin=stats.origin if stats is not None else "other")
+        if stats is not None:
+            stats.add("db_queries")
+
+# --- HTTP ---
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording latency, DB query and upstream call counts per
+    route template. Requests slower than SLOW_REQUEST_MS are logged as warnings,
+    all others at debug level.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats(scope=scope)
+        token = _current.set(stats)
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            _current.reset(token)
+            route = stats.origin
+            REQUEST_LATENCY.observe(elapsed, method=scope["method"], route=route, status=str(status))
+            REQUEST_DB_QUERIES.observe(stats.db_queries, route=route)
+            REQUEST_UPSTREAM_CALLS.observe(stats.upstream_calls, route=route)
+            level = logging.WARNING if elapsed * 1000 >= SLOW_REQUEST_MS else logging.DEBUG
+            if access_log.isEnabledFor(level):
+                access_log.log(level, "request", extra={
+                    "method": scope["method"],
+                    "route": route,
+                    "path": scope["path"],
+                    "status": status,
+                    "duration_ms": round(elapsed * 1000, 1),
+                    "db_queries": stats.db_queries,
+                    "upstream_calls": stats.upstream_calls,
+                    "cache_hits": stats.cache_hits,
+                    "cache_misses": stats.cache_misses,
+                })
@@ -0,0 +1,76 @@
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+# Small idempotent schema migrations for existing databases. create_all only
+# creates missing tables, so changes to existing ones are applied here on startup.
+
+def _index_is_unique(conn, table: str, index: str):
+    """True/False for an existing index, None if it does not exist."""
+    for row in conn.execute(text(f"PRAGMA index_list('{table}')")):
+        if row[1] == index:
+            return bool(row[2])
+    return None
+
+def make_ticker_symbol_unique(conn):
+    """
+    Ticker.symbol used to be indexed but not unique. Duplicates are merged
+    into the newest row per symbol (watchlist links are moved over), then the
+    index is rebuilt as unique.
+    """
+    if _index_is_unique(conn, "ticker", "ix_ticker_symbol") is not False:
+        return
+    conn.execute(text(
+        "CREATE TEMP TABLE ticker_dupes AS "
+        "SELECT t.id AS id, k.keep_id AS keep_id FROM ticker t "
+        "JOIN (SELECT symbol, MAX(id) AS keep_id FROM ticker GROUP BY symbol HAVING COUNT(*) > 1) k "
+        "ON t.symbol = k.symbol AND t.id != k.keep_id"
+    ))
+    # OR IGNORE: a watchlist holding both copies keeps one link, the other is deleted below
+    conn.execute(text(
+        "UPDATE OR IGNORE watchlisttickerlink "
+        "SET ticker_id = (SELECT keep_id FROM ticker_dupes WHERE ticker_dupes.id = watchlisttickerlink.ticker_id) "
+        "WHERE ticker_id IN (SELECT id FROM ticker_dupes)"
+    ))
+    conn.execute(text("DELETE FROM watchlisttickerlink WHERE ticker_id IN (SELECT id FROM ticker_dupes)"))
+    conn.execute(text("DELETE FROM ticker WHERE id IN (SELECT id FROM ticker_dupes)"))
+    conn.execute(text("DROP TABLE ticker_dupes"))
+    conn.execute(text("DROP INDEX ix_ticker_symbol"))
+    conn.execute(text("CREATE UNIQUE INDEX ix_ticker_symbol ON ticker (symbol)"))
+
+def add_user_scan_thresholds(conn):
+    """Per-user scan thresholds; existing users get the previous fixed 5% rule."""
+    columns = {row[1] for row in conn.execute(text("PRAGMA table_info('user')"))}
+    for column, default in (
+        ("scan_gap_pct", 5.0),
+        ("scan_change_pct", 5.0),
+        ("scan_min_volume_ratio", 0.0),
+        ("scan_min_gap_z", 0.0),
+    ):
+        if column not in columns:
+            conn.execute(text(f'ALTER TABLE "user" ADD COLUMN {column} FLOAT NOT NULL DEFAULT {default}'))
+
+def backfill_position_aggregates(conn):
+    """Builds the per-symbol/side aggregates once from trades recorded before they existed."""
+    if conn.execute(text("SELECT 1 FROM positionaggregate LIMIT 1")).first():
+        return
+    conn.execute(text(
+        "INSERT INTO positionaggregate (symbol, side, open_trades, open_quantity, open_cost, open_fees, "
+        "closed_trades, winning_trades, realized_pnl, updated_at) "
+        "SELECT symbol, side, "
+        "SUM(status = 'open'), "
+        "TOTAL(CASE WHEN status = 'open' THEN quantity END), "
+        "TOTAL(CASE WHEN status = 'open' THEN quantity * entry_price END), "
+        "TOTAL(CASE WHEN status = 'open' THEN fees END), "
+        "SUM(status = 'closed'), "
+        "SUM(status = 'closed' AND p_and_l > 0), "
+        "TOTAL(CASE WHEN status = 'closed' THEN p_and_l END), "
+        "CURRENT_TIMESTAMP "
+        "FROM trade GROUP BY symbol, side"
+    ))
+
+MIGRATIONS = [make_ticker_symbol_unique, add_user_scan_thresholds, backfill_position_aggregates]
+
+def run_migrations(engine: Engine):
+    with engine.begin() as conn:
+        for migration in MIGRATIONS:
+            migration(conn)
@@ -1,5 +1,6 @@
-from typing import Optional, List
+from typing import Optional, List, Dict, Any
 from datetime import datetime
+from sqlalchemy import Column, Index, JSON
 from sqlmodel import SQLModel, Field, Relationship
 
 class User(SQLModel, table=True):
@@ -18,7 +19,35 @@ class User(SQLModel, table=True):
     api_calls_today: int = Field(default=0)
     last_call_date: Optional[str] = None # To reset the counter daily
 
+    # Overreaction scan thresholds (see ScanThresholds)
+    scan_gap_pct: float = Field(default=5.0)
+    scan_change_pct: float = Field(default=5.0)
+    scan_min_volume_ratio: float = Field(default=0.0)
+    scan_min_gap_z: float = Field(default=0.0)
+
+class ScanThresholds(SQLModel):
+    """
+    When a symbol counts as overreaction: |overnight gap| >= gap_pct or
+    |close-to-close change| >= change_pct, and, if set above 0, today's volume
+    at least min_volume_ratio x its average and |gap / ATR| >= min_gap_z.
+    """
+    gap_pct: float = 5.0
+    change_pct: float = 5.0
+    min_volume_ratio: float = 0.0
+    min_gap_z: float = 0.0
+
+class UserContext(SQLModel):
+    """The slowly changing part of a User, cached per username by `auth.current_user`."""
+    id: int
+    username: str
+    daily_api_limit: int
+    gemini_api_key: Optional[str] = None
+    scan_thresholds: ScanThresholds = Field(default_factory=ScanThresholds)
+
 class WatchlistTickerLink(SQLModel, table=True):
+    # The primary key covers watchlist -> tickers; this covers ticker -> watchlists
+    __table_args__ = (Index("ix_watchlisttickerlink_ticker_watchlist", "ticker_id", "watchlist_id"),)
+
     watchlist_id: Optional[int] = Field(
         default=None, foreign_key="watchlist.id", primary_key=True
     )
@@ -27,6 +56,8 @@ class WatchlistTickerLink(SQLModel, table=True):
     )
 
 class Watchlist(SQLModel, table=True):
+    __table_args__ = (Index("ix_watchlist_user_name", "user_id", "name"),)
+
     id: Optional[int] = Field(default=None, primary_key=True)
     name: str = Field(index=True)
     user_id: Optional[int] = Field(default=None, foreign_key="user.id")
@@ -35,8 +66,14 @@ class Watchlist(SQLModel, table=True):
     user: Optional[User] = Relationship(back_populates="watchlists")
     tickers: List["Ticker"] = Relationship(back_populates="watchlists", link_model=WatchlistTickerLink)
 
+class SymbolBatch(SQLModel):
+    """Request body of the batch watchlist endpoints."""
+    symbols: List[str]
+    # Skip symbols that are neither a tradable Binance pair nor listed on Yahoo
+    validate_symbols: bool = True
+
 class TickerBase(SQLModel):
-    symbol: str = Field(index=True)
+    symbol: str = Field(index=True, unique=True)
     name: Optional[str] = None
     last_price: float
     change_pct: float
@@ -58,7 +95,53 @@ class TradeBase(SQLModel):
     status: str = "open"  # 'open', 'closed'
 
 class Trade(TradeBase, table=True):
+    __table_args__ = (
+        Index("ix_trade_status_symbol", "status", "symbol"),
+        Index("ix_trade_symbol_entry_time", "symbol", "entry_time"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     exit_price: Optional[float] = None
     exit_time: Optional[datetime] = None
     p_and_l: Optional[float] = None
+
+class PositionAggregate(SQLModel, table=True):
+    """
+    Running totals per symbol and side, updated in the same transaction as each
+    trade open/close (see portfolio.Portfolio), so positions and P&L never need
+    a pass over the full trade history.
+    """
+    symbol: str = Field(primary_key=True)
+    side: str = Field(primary_key=True)  # 'buy' or 'sell'
+    open_trades: int = 0
+    open_quantity: float = 0.0
+    open_cost: float = 0.0  # sum of quantity * entry_price of the open trades
+    open_fees: float = 0.0
+    closed_trades: int = 0
+    winning_trades: int = 0
+    realized_pnl: float = 0.0  # net of fees
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+class Fundamentals(SQLModel, table=True):
+    """Snapshot of yfinance fundamentals per symbol, refreshed in bulk by FundamentalsRefresher."""
+    symbol: str = Field(primary_key=True)
+    name: Optional[str] = None
+    sector: Optional[str] = Field(default=None, index=True)
+    price: Optional[float] = None
+    market_cap: Optional[float] = Field(default=None, index=True)
+    trailing_pe: Optional[float] = Field(default=None, index=True)
+    dividend_yield: Optional[float] = Field(default=None, index=True)
+    price_to_book: Optional[float] = None
+    profit_margins: Optional[float] = None
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+class ScanSnapshot(SQLModel, table=True):
+    """Result of one overnight-overreaction scan run by ScanScheduler (or a forced /scan refresh)."""
+    id: Optional[int] = Field(default=None, primary_key=True)
+    created_at: datetime = Field(default_factory=datetime.utcnow, index=True)
+    universe_size: int = 0
+    quotes: int = 0  # symbols the upstream actually returned
+    duration_ms: float = 0.0
+    # [{"ticker": {"symbol", "last_price", "change_pct", "updated_at"},
+    #   "metrics": {"gap_pct", "change_pct", "volume_ratio", "atr_pct", "gap_z"}, "traffic_light"}]
+    candidates: List[Dict[str, Any]] = Field(default_factory=list, sa_column=Column(JSON))
@@ -1,31 +1,100 @@
+import logging
 import yfinance as yf
-from typing import List, Dict
+from datetime import datetime, time as dt_time, timedelta, timezone
+from typing import List, Dict, Any, Optional
+from zoneinfo import ZoneInfo
+from .quote_engine import QuoteEngine
+from .quote_cache import QuoteCache, quote_cache
+from .metrics import upstream_call
+from .universe import is_crypto
+
+MARKET_TZ = ZoneInfo("America/New_York")
+MARKET_CLOSE = dt_time(16, 0)
+# News this many days before the overnight window still counts as "maybe related"
+YELLOW_DAYS = 3
+
+logger = logging.getLogger(__name__)
 
 class NewsAPI:
-    def __init__(self):
+    """
+    Yahoo Finance news via yfinance, classified into a traffic light per symbol.
+    Lookups for many symbols run concurrently in worker threads and the
+    publish times are cached per symbol (kind "news" in the quote cache).
+    """
+
+    def __init__(self, cache: Optional[QuoteCache] = None, engine: Optional[QuoteEngine] = None):
         # No API key needed for yfinance news
-        pass
+        self.cache = cache or quote_cache
+        # One symbol per upstream call (yfinance has no batched news endpoint), all in flight at
+        # once on the "news" pool so a scan costs about one round trip
+        self.engine = engine or QuoteEngine(max_in_flight=32, batch_size=1, kind="news")
 
-    def get_market_news(self, symbol: str, limit: int = 5) -> List[Dict]:
+    def get_market_news(self, symbol: str, limit: int = 5) -> Optional[List[Dict]]:
         """
-        Fetches news from Yahoo Finance via yfinance.
+        Fetches news from Yahoo Finance via yfinance (None if the request failed).
         """
         try:
-            ticker = yf.Ticker(symbol)
-            news = ticker.news
+            with upstream_call("yfinance", "news", symbol) as call:
+                news = yf.Ticker(symbol).news or []
+                if not news:
+                    call.outcome = "empty"
             # yfinance news is a list of dicts with 'title', 'publisher', 'link', 'providerPublishTime', etc.
             return news[:limit]
         except Exception as e:
-            print(f"Error fetching yfinance news for {symbol}: {e}")
-            return []
+            logger.warning("news request failed", extra={"symbol": symbol, "error": str(e)})
+            return None
 
-    def get_traffic_light(self, symbol: str) -> str:
+    async def get_traffic_lights(self, symbols: List[str]) -> Dict[str, str]:
         """
-        Signals "Red" if news are found for the jump, 
-        "Green" if no major news are found (technical trade).
+        Traffic light per symbol, all lookups in parallel:
+        "red" if news was published in the overnight window (the move is news-driven),
+        "yellow" if the latest news is from the few days before it,
+        "green" if there is no recent news (technical trade).
         """
-        news = self.get_market_news(symbol, limit=3)
-        # If there's recent news, we flag it as 'red' (news-driven)
-        if news and len(news) > 0:
+        news = await self.cache.get_many("news", symbols, self._fetch_publish_times)
+        return {s: self.classify(s, news.get(s, {}).get("published", [])) for s in symbols}
+
+    def classify(self, symbol: str, published: List[float], now: Optional[datetime] = None) -> str:
+        start = overnight_window_start(symbol, now)
+        if any(ts >= start.timestamp() for ts in published):
             return "red"
+        if any(ts >= (start - timedelta(days=YELLOW_DAYS)).timestamp() for ts in published):
+            return "yellow"
         return "green"
+
+    async def _fetch_publish_times(self, symbols: List[str]) -> Dict[str, Any]:
+        return await self.engine.fetch_batched(symbols, self._publish_times_batch)
+
+    def _publish_times_batch(self, symbols: List[str]) -> Dict[str, Any]:
+        # Quiet symbols get an (empty) entry so they are cached too; failed lookups get none and are retried
+        news = {s: self.get_market_news(s, limit=10) for s in symbols}
+        return {s: {"published": _publish_times(items)} for s, items in news.items() if items is not None}
+
+def overnight_window_start(symbol: str, now: Optional[datetime] = None) -> datetime:
+    """
+    Start of the window in which news explains an overnight move: the previous
+    regular-session close (16:00 New York on the last weekday before today).
+    Crypto trades around the clock, so there it is simply the last 24 hours.
+    """
+    now = now or datetime.now(timezone.utc)
+    if is_crypto(symbol):
+        return now - timedelta(hours=24)
+    day = now.astimezone(MARKET_TZ).date() - timedelta(days=1)
+    while day.weekday() >= 5:
+        day -= timedelta(days=1)
+    return datetime.combine(day, MARKET_CLOSE, tzinfo=MARKET_TZ)
+
+def _publish_times(news: List[Dict]) -> List[float]:
+    """Epoch seconds of each item; handles the old (providerPublishTime) and new (content.pubDate) layouts."""
+    times = []
+    for item in news:
+        try:
+            if item.get("providerPublishTime"):
+                times.append(float(item["providerPublishTime"]))
+                continue
+            pub_date = (item.get("content") or {}).get("pubDate")
+            if pub_date:
+                times.append(datetime.fromisoformat(pub_date.replace("Z", "+00:00")).timestamp())
+        except (TypeError, ValueError, AttributeError):
+            continue
+    return times
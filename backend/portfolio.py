@@ -0,0 +1,171 @@
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlmodel import Session, select
+
+from .models import PositionAggregate, Ticker, Trade
+from .universe import is_crypto
+
+SIDE_SIGN = {"buy": 1.0, "sell": -1.0}
+
+logger = logging.getLogger(__name__)
+
+async def fetch_marks(fetcher, symbols: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Mark prices {symbol: {price, change, updated_at}} from the shared quote cache: one
+    batched stock and one crypto lookup (DataFetcher.fetch_stocks/fetch_crypto).
+    Symbols without a quote are left out; Portfolio falls back to the Ticker table.
+    """
+    symbols = list(symbols)
+    cryptos = [s for s in symbols if is_crypto(s)]
+    stocks = [s for s in symbols if not is_crypto(s)]
+    results = await asyncio.gather(fetcher.fetch_stocks(stocks), fetcher.fetch_crypto(cryptos), return_exceptions=True)
+    now = datetime.utcnow()
+    marks = {}
+    for result in results:
+        if isinstance(result, Exception):
+            logger.warning("mark quotes unavailable", extra={"error": str(result)})
+            continue
+        for symbol, quote in result.items():
+            if quote and quote.get("price"):
+                marks[symbol] = {"price": quote["price"], "change": quote.get("change"), "updated_at": now}
+    return marks
+
+def trade_pnl(side: str, quantity: float, entry_price: float, exit_price: float, fees: float) -> float:
+    """P&L of a closed trade net of its (round-trip) fees."""
+    return SIDE_SIGN[side] * (exit_price - entry_price) * quantity - fees
+
+class Portfolio:
+    """
+    Paper-trading portfolio on top of the Trade table. Opening and closing
+    trades update PositionAggregate with one upsert each (in the caller's
+    transaction). Positions are marked against `quotes` (see fetch_marks;
+    async callers look them up for `open_symbols()` first), falling back to
+    the last price in the Ticker table with one IN query.
+    """
+
+    def __init__(self, session: Session):
+        self.session = session
+
+    def record_open(self, trade: Trade):
+        """Adds a new open trade to its symbol/side aggregate (caller commits)."""
+        self._apply(trade.symbol, trade.side, {
+            "open_trades": 1,
+            "open_quantity": trade.quantity,
+            "open_cost": trade.quantity * trade.entry_price,
+            "open_fees": trade.fees,
+        })
+
+    def close_trade(self, trade: Trade, exit_price: float) -> Trade:
+        """Closes an open trade at `exit_price`, books the realized P&L and commits."""
+        pnl = trade_pnl(trade.side, trade.quantity, trade.entry_price, exit_price, trade.fees)
+        # Conditional update: of two concurrent closes only one books the trade
+        result = self.session.execute(
+            update(Trade)
+            .where(Trade.id == trade.id, Trade.status == "open")
+            .values(status="closed", exit_price=exit_price, exit_time=datetime.utcnow(), p_and_l=pnl)
+        )
+        if result.rowcount != 1:
+            self.session.rollback()
+            raise ValueError(f"Trade {trade.id} is not open")
+        self._apply(trade.symbol, trade.side, {
+            "open_trades": -1,
+            "open_quantity": -trade.quantity,
+            "open_cost": -trade.quantity * trade.entry_price,
+            "open_fees": -trade.fees,
+            "closed_trades": 1,
+            "winning_trades": 1 if pnl > 0 else 0,
+            "realized_pnl": pnl,
+        })
+        self.session.commit()
+        self.session.refresh(trade)
+        return trade
+
+    def open_symbols(self, symbol: Optional[str] = None) -> List[str]:
+        """Symbols with open positions (what `quotes` needs to cover)."""
+        statement = select(PositionAggregate.symbol).where(PositionAggregate.open_trades > 0)
+        if symbol:
+            statement = statement.where(PositionAggregate.symbol == symbol)
+        return sorted(set(self.session.exec(statement).all()))
+
+    def positions(
+        self, symbol: Optional[str] = None, quotes: Optional[Dict[str, Dict[str, Any]]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Open positions per symbol and side, marked to `quotes` or else the
+        Ticker table. Symbols without a usable price (no quote and no Ticker
+        row, or price 0) have no mark and no unrealized P&L.
+        """
+        statement = select(PositionAggregate).where(PositionAggregate.open_trades > 0)
+        if symbol:
+            statement = statement.where(PositionAggregate.symbol == symbol)
+        return self._mark(self.session.exec(statement.order_by(PositionAggregate.symbol)).all(), quotes)
+
+    def summary(self, quotes: Optional[Dict[str, Dict[str, Any]]] = None) -> Dict[str, Any]:
+        """Portfolio totals from the aggregates (one row per symbol/side, independent of the trade count)."""
+        aggregates = self.session.exec(select(PositionAggregate).order_by(PositionAggregate.symbol)).all()
+        positions = self._mark([a for a in aggregates if a.open_trades > 0], quotes)
+        closed = sum(a.closed_trades for a in aggregates)
+        unrealized = sum(p["unrealized_pnl"] for p in positions if p["unrealized_pnl"] is not None)
+        realized = sum(a.realized_pnl for a in aggregates)
+        return {
+            "open_positions": len(positions),
+            "open_trades": sum(a.open_trades for a in aggregates),
+            "closed_trades": closed,
+            "win_rate": round(sum(a.winning_trades for a in aggregates) / closed * 100, 2) if closed else None,
+            "exposure": sum(p["mark_price"] * p["quantity"] for p in positions if p["mark_price"] is not None),
+            "realized_pnl": realized,
+            "unrealized_pnl": unrealized,
+            "total_pnl": realized + unrealized,
+            "unmarked_positions": [p["symbol"] for p in positions if p["mark_price"] is None],
+        }
+
+    def _mark(
+        self, aggregates: List[PositionAggregate], quotes: Optional[Dict[str, Dict[str, Any]]]
+    ) -> List[Dict[str, Any]]:
+        marks = self._marks({a.symbol for a in aggregates}, quotes or {})
+        positions = []
+        for a in aggregates:
+            mark = marks.get(a.symbol)
+            unrealized = None
+            if mark is not None:
+                unrealized = SIDE_SIGN[a.side] * (mark["price"] * a.open_quantity - a.open_cost) - a.open_fees
+            positions.append({
+                "symbol": a.symbol,
+                "side": a.side,
+                "trades": a.open_trades,
+                "quantity": a.open_quantity,
+                "avg_entry_price": a.open_cost / a.open_quantity if a.open_quantity else None,
+                "fees": a.open_fees,
+                "mark_price": mark["price"] if mark else None,
+                "marked_at": mark["updated_at"] if mark else None,
+                "unrealized_pnl": unrealized,
+                "realized_pnl": a.realized_pnl,
+            })
+        return positions
+
+    def _apply(self, symbol: str, side: str, deltas: Dict[str, float]):
+        """Adds `deltas` to the aggregate row in SQL (INSERT ... ON CONFLICT DO UPDATE SET col = col + delta)."""
+        now = datetime.utcnow()
+        statement = sqlite_insert(PositionAggregate).values(symbol=symbol, side=side, updated_at=now, **deltas)
+        table = PositionAggregate.__table__
+        statement = statement.on_conflict_do_update(
+            index_elements=[table.c.symbol, table.c.side],
+            set_={**{key: table.c[key] + statement.excluded[key] for key in deltas}, "updated_at": now},
+        )
+        self.session.execute(statement)
+
+    def _marks(self, symbols, quotes: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        marks = {s: quotes[s] for s in symbols if quotes.get(s, {}).get("price")}
+        # Fallback: the last price a scan or quote wrote into the Ticker table (may be old)
+        missing = [s for s in symbols if s not in marks]
+        if missing:
+            rows = self.session.exec(
+                select(Ticker.symbol, Ticker.last_price, Ticker.updated_at).where(Ticker.symbol.in_(missing))
+            ).all()
+            marks.update({symbol: {"price": price, "updated_at": updated_at} for symbol, price, updated_at in rows if price})
+        return marks
@@ -0,0 +1,274 @@
+import asyncio
+import json
+import logging
+import os
+import random
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+from fastapi import WebSocket, WebSocketDisconnect
+
+from .metrics import job_context
+from .universe import is_crypto
+
+MAX_SYMBOLS_PER_CLIENT = 200
+
+logger = logging.getLogger(__name__)
+
+class PriceSource(ABC):
+    """
+    Upstream price feed. The hub calls `subscribe` when a symbol gets its first
+    client and `unsubscribe` when the last one leaves, so upstream load grows
+    with the number of distinct symbols, not with the number of browser tabs.
+    """
+
+    def __init__(self):
+        self.symbols: Set[str] = set()
+
+    def subscribe(self, symbol: str) -> None:
+        self.symbols.add(symbol)
+
+    def unsubscribe(self, symbol: str) -> None:
+        self.symbols.discard(symbol)
+
+    @abstractmethod
+    async def run(self, hub: "PriceHub") -> None:
+        """Feeds `hub.publish` for the subscribed symbols until cancelled."""
+
+class BinanceStreamSource(PriceSource):
+    """One combined Binance WebSocket; symbols are (un)subscribed on the open connection."""
+
+    URL = "wss://stream.binance.com:9443/stream"
+
+    def __init__(self, url: str = URL):
+        super().__init__()
+        self.url = url
+        self._ws = None
+        self._request_id = 0
+
+    def subscribe(self, symbol: str) -> None:
+        super().subscribe(symbol)
+        self._send("SUBSCRIBE", [symbol])
+
+    def unsubscribe(self, symbol: str) -> None:
+        super().unsubscribe(symbol)
+        self._send("UNSUBSCRIBE", [symbol])
+
+    def _send(self, method: str, symbols: List[str]) -> None:
+        # Without a connection there is nothing to do: (re)connecting subscribes all symbols
+        if self._ws is None or not symbols:
+            return
+        self._request_id += 1
+        message = {"method": method, "params": [f"{s.lower()}@miniTicker" for s in symbols], "id": self._request_id}
+        asyncio.ensure_future(self._ws.send(json.dumps(message)))
+
+    async def run(self, hub: "PriceHub") -> None:
+        import websockets
+
+        backoff = 1.0
+        while True:
+            try:
+                async with websockets.connect(self.url, ping_interval=20) as ws:
+                    self._ws = ws
+                    backoff = 1.0
+                    self._send("SUBSCRIBE", sorted(self.symbols))
+                    async for message in ws:
+                        payload = json.loads(message).get("data")
+                        if not payload or payload.get("e") != "24hrMiniTicker":
+                            continue
+                        close, open_ = float(payload["c"]), float(payload["o"])
+                        change = (close - open_) / open_ * 100 if open_ else 0.0
+                        hub.publish(payload["s"], close, change)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Binance stream error", extra={"error": str(e), "retry_in": backoff})
+            finally:
+                self._ws = None
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 60.0)
+
+class YahooPoller(PriceSource):
+    """Polls all subscribed stock symbols with one batched quote request per interval."""
+
+    def __init__(self, fetch_quotes: Callable[[List[str]], Awaitable[Dict[str, Any]]], interval: float = 15.0):
+        super().__init__()
+        self.fetch_quotes = fetch_quotes
+        self.interval = interval
+
+    async def run(self, hub: "PriceHub") -> None:
+        with job_context("price_hub"):
+            await self._poll(hub)
+
+    async def _poll(self, hub: "PriceHub") -> None:
+        while True:
+            if self.symbols:
+                try:
+                    data = await self.fetch_quotes(sorted(self.symbols))
+                    for symbol, quote in data.items():
+                        hub.publish(symbol, quote["price"], quote["change"])
+                except Exception as e:
+                    logger.warning("Yahoo poller error", extra={"error": str(e)})
+            await asyncio.sleep(self.interval)
+
+class FakePriceSource(PriceSource):
+    """
+    Local stand-in for tests and offline development. Emits a seeded random
+    walk for every subscribed symbol; `push` injects a specific tick.
+    """
+
+    def __init__(self, interval: float = 0.25, seed: int = 0, start_price: float = 100.0):
+        super().__init__()
+        self.interval = interval
+        self.start_price = start_price
+        self._rng = random.Random(seed)
+        self._prices: Dict[str, float] = {}
+        self._hub: Optional["PriceHub"] = None
+
+    def push(self, symbol: str, price: float, change: float = 0.0) -> None:
+        if self._hub is not None:
+            self._hub.publish(symbol, price, change)
+
+    async def run(self, hub: "PriceHub") -> None:
+        self._hub = hub
+        while True:
+            for symbol in list(self.symbols):
+                price = self._prices.get(symbol, self.start_price) * (1 + self._rng.gauss(0, 0.001))
+                self._prices[symbol] = price
+                hub.publish(symbol, price, (price / self.start_price - 1) * 100)
+            await asyncio.sleep(self.interval)
+
+class _Client:
+    __slots__ = ("websocket", "symbols", "pending", "wakeup")
+
+    def __init__(self, websocket: WebSocket):
+        self.websocket = websocket
+        self.symbols: Set[str] = set()
+        self.pending: Dict[str, Dict[str, Any]] = {}
+        self.wakeup = asyncio.Event()
+
+class PriceHub:
+    """
+    In-memory last-price table fed by one upstream subscription per symbol and
+    fanned out to WebSocket clients. Updates per client are coalesced (latest
+    price per symbol wins) and sent at most `max_updates_per_second` times.
+
+    Protocol: clients send {"action": "subscribe" | "unsubscribe", "symbols": [...]}
+    and receive {"type": "prices", "prices": {symbol: {price, change, ts}}}.
+    """
+
+    def __init__(self, crypto_source: PriceSource, stock_source: PriceSource, max_updates_per_second: float = 4.0):
+        self.crypto_source = crypto_source
+        self.stock_source = stock_source
+        self.max_updates_per_second = max_updates_per_second
+        self.prices: Dict[str, Dict[str, Any]] = {}
+        self._subscribers: Dict[str, Set[_Client]] = {}
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self) -> None:
+        sources = {id(s): s for s in (self.crypto_source, self.stock_source)}
+        self._tasks = [asyncio.create_task(source.run(self)) for source in sources.values()]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def publish(self, symbol: str, price: float, change: float) -> None:
+        quote = {"price": price, "change": change, "ts": time.time()}
+        self.prices[symbol] = quote
+        for client in self._subscribers.get(symbol, ()):
+            client.pending[symbol] = quote
+            client.wakeup.set()
+
+    def subscribe(self, client: _Client, symbols: List[str]) -> None:
+        for symbol in symbols:
+            if symbol in client.symbols or len(client.symbols) >= MAX_SYMBOLS_PER_CLIENT:
+                continue
+            client.symbols.add(symbol)
+            subscribers = self._subscribers.setdefault(symbol, set())
+            if not subscribers:
+                self._source(symbol).subscribe(symbol)
+            subscribers.add(client)
+            # Send the last known price right away instead of waiting for the next tick
+            if symbol in self.prices:
+                client.pending[symbol] = self.prices[symbol]
+                client.wakeup.set()
+
+    def unsubscribe(self, client: _Client, symbols: List[str]) -> None:
+        for symbol in symbols:
+            if symbol not in client.symbols:
+                continue
+            client.symbols.discard(symbol)
+            client.pending.pop(symbol, None)
+            subscribers = self._subscribers.get(symbol)
+            if subscribers is None:
+                continue
+            subscribers.discard(client)
+            if not subscribers:
+                del self._subscribers[symbol]
+                self._source(symbol).unsubscribe(symbol)
+
+    async def serve(self, websocket: WebSocket) -> None:
+        """Handles one accepted WebSocket connection until it closes."""
+        client = _Client(websocket)
+        sender = asyncio.create_task(self._send_loop(client))
+        try:
+            while True:
+                try:
+                    message = json.loads(await websocket.receive_text())
+                    action = message.get("action")
+                    symbols = [str(s).upper() for s in message.get("symbols", [])]
+                except (ValueError, AttributeError, TypeError):
+                    continue
+                if action == "subscribe":
+                    self.subscribe(client, symbols)
+                elif action == "unsubscribe":
+                    self.unsubscribe(client, symbols)
+        except WebSocketDisconnect:
+            pass
+        finally:
+            sender.cancel()
+            self.unsubscribe(client, list(client.symbols))
+
+    async def _send_loop(self, client: _Client) -> None:
+        interval = 1.0 / self.max_updates_per_second
+        while True:
+            await client.wakeup.wait()
+            client.wakeup.clear()
+            batch, client.pending = client.pending, {}
+            if batch:
+                try:
+                    await client.websocket.send_json({"type": "prices", "prices": batch})
+                except Exception:
+                    # Connection is gone; serve() cleans up the subscriptions
+                    return
+            await asyncio.sleep(interval)
+
+    def _source(self, symbol: str) -> PriceSource:
+        return self.crypto_source if is_crypto(symbol) else self.stock_source
+
+def build_price_hub(fetch_stock_quotes: Optional[Callable[[List[str]], Awaitable[Dict[str, Any]]]] = None) -> PriceHub:
+    """
+    Hub configured from the environment; PRICE_FEED=fake uses FakePriceSource for everything.
+    `fetch_stock_quotes` is the batched quote call the Yahoo poller uses (the app passes the
+    shared DataFetcher's cached `fetch_stocks`).
+    """
+    max_updates = float(os.getenv("PRICE_HUB_MAX_UPDATES", "4"))
+    if os.getenv("PRICE_FEED") == "fake":
+        fake = FakePriceSource()
+        return PriceHub(fake, fake, max_updates)
+
+    if fetch_stock_quotes is None:
+        from .stock_fetcher import StockFetcher
+        from .quote_cache import quote_cache
+
+        stock_fetcher = StockFetcher()
+
+        async def fetch_stock_quotes(symbols: List[str]) -> Dict[str, Any]:
+            return await quote_cache.get_many("stock_quote", symbols, stock_fetcher.fetch_stocks)
+
+    poller = YahooPoller(fetch_stock_quotes, interval=float(os.getenv("YAHOO_POLL_SECONDS", "15")))
+    return PriceHub(BinanceStreamSource(), poller, max_updates)
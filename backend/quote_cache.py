@@ -0,0 +1,293 @@
+import asyncio
+import logging
+import os
+import sys
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from .executors import run_in
+from .metrics import cache_lookup
+from .shared_cache import SharedCache
+
+logger = logging.getLogger(__name__)
+
+# (symbol, kind, period)
+CacheKey = Tuple[str, str, str]
+
+# Seconds a value counts as fresh, per data kind
+DEFAULT_TTLS = {
+    "stock_quote": 15.0,
+    "crypto_quote": 5.0,
+    "overview": 30.0,
+    "chart": 300.0,
+    "news": 300.0,
+}
+
+# Seconds after expiry during which the old value is still served while a refresh runs
+DEFAULT_STALE_GRACE = {
+    "stock_quote": 45.0,
+    "crypto_quote": 15.0,
+    "overview": 90.0,
+    "chart": 900.0,
+    "news": 600.0,
+}
+
+class _Entry:
+    __slots__ = ("value", "fresh_until", "stale_until", "size")
+
+    def __init__(self, value: Any, fresh_until: float, stale_until: float, size: int):
+        self.value = value
+        self.fresh_until = fresh_until
+        self.stale_until = stale_until
+        self.size = size
+
+def _approx_size(value: Any) -> int:
+    """Rough deep size estimate in bytes, good enough for enforcing the memory cap."""
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(_approx_size(k) + _approx_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(_approx_size(v) for v in value)
+    return sys.getsizeof(value)
+
+class QuoteCache:
+    """
+    In-process cache for upstream market data, keyed by (symbol, kind, period).
+    Concurrent misses for the same key share one upstream request, and expired
+    values are served for a short grace period while a background refresh runs.
+    With a `shared` cache (multi-worker deployments) misses and refreshes go to
+    it first, and only the worker holding a key's fetch lease calls the upstream.
+    """
+
+    def __init__(
+        self,
+        ttls: Optional[Dict[str, float]] = None,
+        stale_grace: Optional[Dict[str, float]] = None,
+        max_bytes: int = 64 * 1024 * 1024,
+        default_ttl: float = 30.0,
+        shared: Optional[SharedCache] = None,
+        shared_poll: float = 0.05,
+    ):
+        self.ttls = {**DEFAULT_TTLS, **(ttls or {})}
+        self.stale_grace = {**DEFAULT_STALE_GRACE, **(stale_grace or {})}
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.shared = shared
+        self.shared_poll = shared_poll
+        self._entries: "OrderedDict[CacheKey, _Entry]" = OrderedDict()
+        self._inflight: Dict[CacheKey, asyncio.Future] = {}
+        self._tasks: set = set()
+        self._bytes = 0
+        self.counters = {
+            "hits": 0, "stale_hits": 0, "misses": 0, "coalesced": 0,
+            "refreshes": 0, "evictions": 0, "errors": 0,
+        }
+
+    async def get(
+        self, kind: str, symbol: str, fetch: Callable[[], Awaitable[Any]], period: str = ""
+    ) -> Any:
+        """
+        Returns the cached value for one key, calling `fetch` on a miss.
+        `fetch` returns None when the upstream failed; that is not cached.
+        """
+        async def fetch_one(_symbols: List[str]) -> Dict[str, Any]:
+            return {symbol: await fetch()}
+
+        data = await self.get_many(kind, [symbol], fetch_one, period)
+        return data.get(symbol)
+
+    async def get_many(
+        self,
+        kind: str,
+        symbols: List[str],
+        fetch_many: Callable[[List[str]], Awaitable[Dict[str, Any]]],
+        period: str = "",
+    ) -> Dict[str, Any]:
+        """
+        Returns cached values for all symbols. Missing symbols are fetched
+        together with one `fetch_many` call; symbols the upstream does not
+        return (or returns as None) are left out of the result and not cached.
+        Every other value is cached, empty ones included.
+        """
+        result: Dict[str, Any] = {}
+        missing: List[str] = []
+        stale: List[str] = []
+        waiting: Dict[str, asyncio.Future] = {}
+        stale_hits = 0
+        now = time.monotonic()
+
+        for symbol in dict.fromkeys(symbols):
+            key = (symbol, kind, period)
+            entry = self._entries.get(key)
+            if entry is not None and now < entry.fresh_until:
+                self.counters["hits"] += 1
+                self._entries.move_to_end(key)
+                result[symbol] = entry.value
+            elif entry is not None and now < entry.stale_until:
+                self.counters["stale_hits"] += 1
+                stale_hits += 1
+                self._entries.move_to_end(key)
+                result[symbol] = entry.value
+                if key not in self._inflight:
+                    stale.append(symbol)
+            elif key in self._inflight:
+                self.counters["coalesced"] += 1
+                waiting[symbol] = self._inflight[key]
+            else:
+                self.counters["misses"] += 1
+                missing.append(symbol)
+
+        # Per-kind lookups for /metrics; `counters` above stay the process-wide totals of /cache-stats
+        cache = f"quote_{kind}"
+        cache_lookup(cache, "hit", len(result) - stale_hits)
+        cache_lookup(cache, "stale", stale_hits)
+        cache_lookup(cache, "coalesced", len(waiting))
+        cache_lookup(cache, "miss", len(missing))
+        if stale:
+            self.counters["refreshes"] += 1
+            self._start_fetch(kind, period, stale, fetch_many)
+        if missing:
+            waiting.update(self._start_fetch(kind, period, missing, fetch_many))
+
+        for symbol, future in waiting.items():
+            # shield: a client disconnecting must not cancel the fetch for everyone else
+            value = await asyncio.shield(future)
+            if value is not None:
+                result[symbol] = value
+        return result
+
+    def _start_fetch(
+        self,
+        kind: str,
+        period: str,
+        symbols: List[str],
+        fetch_many: Callable[[List[str]], Awaitable[Dict[str, Any]]],
+    ) -> Dict[str, asyncio.Future]:
+        loop = asyncio.get_running_loop()
+        futures = {symbol: loop.create_future() for symbol in symbols}
+        for symbol, future in futures.items():
+            # Mark exceptions as retrieved so background refreshes without waiters stay quiet
+            future.add_done_callback(lambda f: f.cancelled() or f.exception())
+            self._inflight[(symbol, kind, period)] = future
+
+        async def runner():
+            try:
+                data, remaining = await self._fetch(kind, period, symbols, fetch_many)
+            except Exception as e:
+                self.counters["errors"] += 1
+                logger.warning("cache fetch failed", extra={"kind": kind, "symbols": len(symbols), "error": str(e)})
+                for future in futures.values():
+                    if not future.done():
+                        future.set_exception(e)
+                return
+            finally:
+                for symbol, future in futures.items():
+                    key = (symbol, kind, period)
+                    if self._inflight.get(key) is future:
+                        del self._inflight[key]
+
+            for symbol, future in futures.items():
+                value = data.get(symbol)
+                if value is not None:
+                    self.set(kind, symbol, value, period, ttl=remaining.get(symbol))
+                if not future.done():
+                    future.set_result(value)
+
+        task = loop.create_task(runner())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return futures
+
+    async def _fetch(
+        self,
+        kind: str,
+        period: str,
+        symbols: List[str],
+        fetch_many: Callable[[List[str]], Awaitable[Dict[str, Any]]],
+    ) -> Tuple[Dict[str, Any], Dict[str, float]]:
+        """
+        Values for `symbols` plus, for those taken from the shared cache, the
+        seconds they stay fresh. Without a shared cache this is `fetch_many`.
+        """
+        if self.shared is None:
+            return await fetch_many(symbols), {}
+        cache = f"shared_{kind}"
+        found = await run_in("db", self.shared.get_fresh, kind, symbols, period)
+        cache_lookup(cache, "hit", len(found))
+        data = {symbol: value for symbol, (value, _) in found.items()}
+        remaining = {symbol: fresh_for for symbol, (_, fresh_for) in found.items()}
+        missing = [s for s in symbols if s not in found]
+        if not missing:
+            return data, remaining
+
+        owner, claimed = await run_in("db", self.shared.claim, kind, missing, period)
+        cache_lookup(cache, "miss", len(claimed))
+        cache_lookup(cache, "coalesced", len(missing) - len(claimed))
+        if claimed:
+            try:
+                fetched = await fetch_many(claimed)
+                # None marks "upstream has nothing", so waiting workers stop waiting for it
+                await run_in("db", self.shared.set_many, kind, {s: fetched.get(s) for s in claimed}, period,
+                             self.ttls.get(kind, self.default_ttl))
+                data.update(fetched)
+            finally:
+                await run_in("db", self.shared.release, kind, claimed, owner, period)
+
+        # Keys another worker is fetching: wait for its result, fetch ourselves if its lease lapses
+        waiting = [s for s in missing if s not in set(claimed)]
+        while waiting:
+            await asyncio.sleep(self.shared_poll)
+            found = await run_in("db", self.shared.get_fresh, kind, waiting, period)
+            for symbol, (value, fresh_for) in found.items():
+                data[symbol] = value
+                remaining[symbol] = fresh_for
+            waiting = [s for s in waiting if s not in found]
+            if waiting:
+                leased = await run_in("db", self.shared.leased, kind, waiting, period)
+                orphaned = [s for s in waiting if s not in leased]
+                if orphaned:
+                    data.update(await fetch_many(orphaned))
+                    waiting = [s for s in waiting if s in leased]
+        return data, remaining
+
+    def set(self, kind: str, symbol: str, value: Any, period: str = "", ttl: Optional[float] = None) -> None:
+        """
+        Stores a value and evicts least recently used entries above the memory
+        cap. `ttl` overrides the kind's TTL (values from the shared cache keep
+        their remaining lifetime).
+        """
+        key = (symbol, kind, period)
+        now = time.monotonic()
+        ttl = self.ttls.get(kind, self.default_ttl) if ttl is None else min(ttl, self.ttls.get(kind, self.default_ttl))
+        entry = _Entry(value, now + ttl, now + ttl + self.stale_grace.get(kind, 0.0), _approx_size(value))
+
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._bytes -= old.size
+        self._entries[key] = entry
+        self._bytes += entry.size
+
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted.size
+            self.counters["evictions"] += 1
+
+    def invalidate(self, kind: Optional[str] = None, symbol: Optional[str] = None) -> None:
+        """Drops all entries matching the given kind and/or symbol."""
+        for key in [k for k in self._entries if (symbol is None or k[0] == symbol) and (kind is None or k[1] == kind)]:
+            self._bytes -= self._entries.pop(key).size
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.counters["hits"] + self.counters["stale_hits"] + self.counters["misses"] + self.counters["coalesced"]
+        served = self.counters["hits"] + self.counters["stale_hits"] + self.counters["coalesced"]
+        return {
+            **self.counters,
+            "hit_ratio": round(served / lookups, 4) if lookups else 0.0,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "inflight": len(self._inflight),
+        }
+
+# Process-wide cache shared by all routers and fetchers; `Services` attaches the shared (cross-worker) cache
+quote_cache = QuoteCache(max_bytes=int(os.getenv("QUOTE_CACHE_MAX_MB", "64")) * 1024 * 1024)
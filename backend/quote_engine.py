@@ -0,0 +1,51 @@
+import asyncio
+from concurrent.futures import Executor
+from typing import Any, Callable, Dict, List, Optional
+
+from .executors import bind_context, executors
+
+class QuoteEngine:
+    """
+    Runs batched quote requests off the event loop.
+    Symbol lists are split into batches (one upstream call each) and at most
+    `max_in_flight` upstream calls run at the same time. Calls go to the
+    shared pool of class `kind` (see executors.py) unless a dedicated
+    `executor` is given.
+    """
+
+    def __init__(
+        self, max_in_flight: int = 4, batch_size: int = 200, executor: Optional[Executor] = None, kind: str = "market_data"
+    ):
+        self.max_in_flight = max_in_flight
+        self.batch_size = batch_size
+        self.executor = executor
+        self.kind = kind
+        self._semaphore = asyncio.Semaphore(max_in_flight)
+
+    async def run(self, func: Callable[..., Any], *args) -> Any:
+        """Runs a blocking upstream call in a worker thread, bounded by the in-flight limit."""
+        async with self._semaphore:
+            executor = self.executor or executors.pool(self.kind)
+            return await asyncio.get_running_loop().run_in_executor(executor, bind_context(func), *args)
+
+    def batches(self, symbols: List[str]) -> List[List[str]]:
+        """Deduplicates symbols (keeping order) and splits them into upstream batches."""
+        unique = list(dict.fromkeys(symbols))
+        return [unique[i:i + self.batch_size] for i in range(0, len(unique), self.batch_size)]
+
+    async def fetch_batched(
+        self, symbols: List[str], fetch_batch: Callable[[List[str]], Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """Fetches all batches concurrently and merges the per-symbol results."""
+        if not symbols:
+            return {}
+        parts = await asyncio.gather(*(self.run(fetch_batch, batch) for batch in self.batches(symbols)))
+        data: Dict[str, Any] = {}
+        for part in parts:
+            data.update(part)
+        return data
+
+# Process-wide engine so the in-flight limit holds across all fetchers
+default_engine = QuoteEngine()
+# Scan and backtest downloads run on their own pool so they never delay interactive quotes
+bulk_engine = QuoteEngine(kind="bulk")
@@ -0,0 +1,115 @@
+import asyncio
+import logging
+import threading
+import time
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Optional, Tuple
+
+import yfinance as yf
+
+from .executors import run_in
+from .metrics import cache_lookup, upstream_call
+from .shared_cache import SharedCache
+
+logger = logging.getLogger(__name__)
+
+# (symbol, row or None, error message or None)
+Outcome = Tuple[str, Optional[Dict[str, Any]], Optional[str]]
+
+class ResearchExecutor:
+    """
+    Runs per-symbol research work on an executor class (executors.py, default
+    "research") with a concurrency limit and a per-symbol timeout. Failing
+    symbols are reported as error entries instead of being dropped, and `info`
+    lookups are shared (TTL cached, one upstream call per symbol even under
+    concurrent use).
+    """
+
+    def __init__(self, pool: str = "research", max_concurrency: int = 16, timeout: float = 20.0,
+                 info_ttl: float = 900.0, info_cache_size: int = 2000, shared: Optional[SharedCache] = None):
+        self.pool = pool
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.info_ttl = info_ttl
+        self.info_cache_size = info_cache_size
+        self.shared = shared
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._info: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+        self._info_locks: Dict[str, threading.Lock] = {}
+        self._guard = threading.Lock()
+
+    async def run(
+        self, symbols: List[str], func: Callable[[str], Dict[str, Any]]
+    ) -> Tuple[List[Dict[str, Any]], List[Dict[str, str]]]:
+        """Runs `func(symbol)` for every symbol; returns (rows, errors) in input order."""
+        outcomes = await asyncio.gather(*(self.run_one(s, func) for s in dict.fromkeys(symbols)))
+        rows = [row for _, row, error in outcomes if error is None]
+        errors = [{"symbol": symbol, "error": error} for symbol, _, error in outcomes if error is not None]
+        return rows, errors
+
+    async def stream(self, symbols: Iterable[str], func: Callable[[str], Dict[str, Any]]) -> AsyncIterator[Outcome]:
+        """
+        Yields outcomes in completion order. At most `max_concurrency` symbols
+        are in flight, so memory stays flat regardless of the list size.
+        """
+        pending = set()
+        try:
+            for symbol in dict.fromkeys(symbols):
+                pending.add(asyncio.ensure_future(self.run_one(symbol, func)))
+                if len(pending) >= self.max_concurrency:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        yield task.result()
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    yield task.result()
+        finally:
+            # Client went away: stop scheduling the remaining symbols
+            for task in pending:
+                task.cancel()
+
+    async def run_one(self, symbol: str, func: Callable[[str], Dict[str, Any]]) -> Outcome:
+        async with self._semaphore:
+            try:
+                row = await asyncio.wait_for(run_in(self.pool, func, symbol), self.timeout)
+                return symbol, row, None
+            except asyncio.TimeoutError:
+                return symbol, None, f"Timeout nach {self.timeout:.0f}s"
+            except Exception as e:
+                logger.warning("research symbol failed", extra={"symbol": symbol, "error": str(e)})
+                return symbol, None, str(e) or type(e).__name__
+
+    def info(self, symbol: str) -> Dict[str, Any]:
+        """`yf.Ticker(symbol).info`, cached for `info_ttl` seconds and deduplicated across threads."""
+        cached = self._info.get(symbol)
+        if cached and cached[0] > time.monotonic():
+            cache_lookup("research_info", "hit")
+            return cached[1]
+        with self._guard:
+            lock = self._info_locks.setdefault(symbol, threading.Lock())
+        with lock:
+            cached = self._info.get(symbol)
+            if cached and cached[0] > time.monotonic():
+                cache_lookup("research_info", "coalesced")
+                return cached[1]
+            cache_lookup("research_info", "miss")
+            shared = self.shared.get_fresh("info", [symbol]) if self.shared else {}
+            if symbol in shared:
+                info, ttl = shared[symbol]
+            else:
+                with upstream_call("yfinance", "info", symbol) as call:
+                    info = yf.Ticker(symbol).info or {}
+                    if not info:
+                        call.outcome = "empty"
+                ttl = self.info_ttl
+                if self.shared:
+                    self.shared.set_many("info", {symbol: info}, ttl=ttl)
+            with self._guard:
+                self._info[symbol] = (time.monotonic() + ttl, info)
+                while len(self._info) > self.info_cache_size:
+                    self._info.pop(next(iter(self._info)))
+            return info
+
+# Process-wide executor so the concurrency limit and info cache are shared by all research runs
+# (and the info cache across workers once `Services` attaches the shared cache file)
+default_executor = ResearchExecutor()
@@ -2,6 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlmodel import Session, select
 from ..database import get_session
+from ..executors import run_in
 from ..models import User
 from ..auth import (
     get_password_hash, 
@@ -17,22 +18,31 @@ from ..security_2fa import (
 
 router = APIRouter(tags=["Authentication"])
 
+def _find_user(session: Session, username: str):
+    return session.exec(select(User).where(User.username == username)).first()
+
+def _save(session: Session, obj):
+    session.add(obj)
+    session.commit()
+
+# Password hashing is deliberately slow (bcrypt), so it runs on the "cpu" pool and
+# the lookups on the "db" pool; the event loop keeps serving other requests meanwhile.
+
 @router.post("/signup")
 async def signup(username: str, password: str, session: Session = Depends(get_session)):
-    user = session.exec(select(User).where(User.username == username)).first()
+    user = await run_in("db", _find_user, session, username)
     if user:
         raise HTTPException(status_code=400, detail="Username already registered")
     
-    hashed_password = get_password_hash(password)
+    hashed_password = await run_in("cpu", get_password_hash, password)
     new_user = User(username=username, hashed_password=hashed_password)
-    session.add(new_user)
-    session.commit()
+    await run_in("db", _save, session, new_user)
     return {"message": "User created successfully"}
 
 @router.post("/token")
 async def login(form_data: OAuth2PasswordRequestForm = Depends(), session: Session = Depends(get_session)):
-    user = session.exec(select(User).where(User.username == form_data.username)).first()
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    user = await run_in("db", _find_user, session, form_data.username)
+    if not user or not await run_in("cpu", verify_password, form_data.password, user.hashed_password):
         raise HTTPException(status_code=401, detail="Incorrect username or password")
     
     if user.two_fa_enabled:
@@ -42,7 +52,7 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends(), session: Sessi
     return {"access_token": access_token, "token_type": "bearer"}
 
 @router.post("/2fa/setup")
-async def setup_2fa(username: str = Depends(get_current_user_username), session: Session = Depends(get_session)):
+def setup_2fa(username: str = Depends(get_current_user_username), session: Session = Depends(get_session)):
     user = session.exec(select(User).where(User.username == username)).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
@@ -55,7 +65,7 @@ async def setup_2fa(username: str = Depends(get_current_user_username), session:
     return {"secret": secret, "uri": uri}
 
 @router.post("/2fa/verify")
-async def verify_2fa(username: str, code: str, session: Session = Depends(get_session)):
+def verify_2fa(username: str, code: str, session: Session = Depends(get_session)):
     user = session.exec(select(User).where(User.username == username)).first()
     if not user or not user.two_fa_secret:
         raise HTTPException(status_code=400, detail="2FA not setup")
@@ -0,0 +1,9 @@
+from fastapi import APIRouter, WebSocket
+
+router = APIRouter(tags=["Live Prices"])
+
+@router.websocket("/ws/prices")
+async def prices_socket(websocket: WebSocket):
+    """Live price push. Send {"action": "subscribe", "symbols": [...]} to receive updates."""
+    await websocket.accept()
+    await websocket.app.state.price_hub.serve(websocket)
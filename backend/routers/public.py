@@ -1,15 +1,31 @@
-from fastapi import APIRouter
-from ..data_fetcher import DataFetcher
+import logging
+
+import numpy as np
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import JSONResponse, Response
+from ..quote_cache import quote_cache
+from ..executors import run_in
+from ..metrics import CONTENT_TYPE, registry, upstream_call
+from ..market_search import MarketSearch
+from ..services import get_market_search
+from ..bar_store import bar_store, frame_to_columns
+from ..chart_serializer import serialize_rows, serialize_columnar, serialize_binary, BINARY_MEDIA_TYPE
 
 router = APIRouter(tags=["Public Data"])
 
+CHART_FORMATS = {"rows": serialize_rows, "columnar": serialize_columnar, "binary": serialize_binary}
+
+logger = logging.getLogger(__name__)
+
 @router.get("/market-overview")
 async def market_overview():
     """Returns current data for major indices and popular stocks. No auth required."""
-    import asyncio
-    return await asyncio.to_thread(_fetch_market_overview)
+    overview = await quote_cache.get("overview", "market", lambda: run_in("market_data", _fetch_market_overview))
+    # Upstream failures are not cached; the next request tries again
+    return overview if overview is not None else {"indices": [], "popular": []}
 
 def _fetch_market_overview():
+    """Indices and popular stocks, or None when the download failed."""
     import yfinance as yf
     
     names = {
@@ -23,55 +39,81 @@ def _fetch_market_overview():
     stock_syms = ["AAPL", "MSFT", "NVDA", "TSLA", "AMZN", "GOOGL"]
     all_syms = index_syms + stock_syms
     
-    result = {"indices": [], "popular": []}
     try:
-        # download is synchronous, so we run it in a thread (called via asyncio.to_thread above)
-        data = yf.download(all_syms, period="2d", group_by="ticker", threads=True, progress=False)
-        for sym in all_syms:
-            try:
-                closes = data[sym]["Close"].dropna()
-                if len(closes) >= 2:
-                    prev, curr = float(closes.iloc[-2]), float(closes.iloc[-1])
-                    change = ((curr - prev) / prev) * 100
-                    entry = {
-                        "symbol": sym, "name": names.get(sym, sym),
-                        "price": round(curr, 2), "change_pct": round(change, 2),
-                        "currency": currencies.get(sym, "USD")
-                    }
-                    if sym in index_syms:
-                        result["indices"].append(entry)
-                    else:
-                        result["popular"].append(entry)
-            except Exception as e:
-                print(f"Market parse error {sym}: {e}")
+        # download is synchronous, so it runs on the market_data pool (see market_overview above)
+        with upstream_call("yfinance", "download", all_syms) as call:
+            data = yf.download(all_syms, period="2d", group_by="ticker", threads=True, progress=False)
+            if data.empty:
+                call.outcome = "empty"
     except Exception as e:
-        print(f"Market download error: {e}")
+        logger.warning("market overview download failed", extra={"error": str(e)})
+        return None
+    if data.empty:
+        return None
+
+    result = {"indices": [], "popular": []}
+    for sym in all_syms:
+        try:
+            closes = data[sym]["Close"].dropna()
+            if len(closes) >= 2:
+                prev, curr = float(closes.iloc[-2]), float(closes.iloc[-1])
+                change = ((curr - prev) / prev) * 100
+                entry = {
+                    "symbol": sym, "name": names.get(sym, sym),
+                    "price": round(curr, 2), "change_pct": round(change, 2),
+                    "currency": currencies.get(sym, "USD")
+                }
+                if sym in index_syms:
+                    result["indices"].append(entry)
+                else:
+                    result["popular"].append(entry)
+        except Exception as e:
+            logger.warning("market overview parse failed", extra={"symbol": sym, "error": str(e)})
     
     return result
 
 @router.get("/search-public")
-def search_public(query: str):
+def search_public(query: str, market_search: MarketSearch = Depends(get_market_search)):
     """Public search endpoint - no auth required."""
-    fetcher = DataFetcher()
-    return fetcher.search(query)
+    return market_search.search(query)
+
+@router.get("/cache-stats")
+def cache_stats():
+    """Hit/miss/coalesce counters of the shared quote cache, for TTL tuning."""
+    return quote_cache.stats()
+
+@router.get("/metrics")
+def metrics():
+    """Request latency, upstream calls, cache lookups and DB query counts in the Prometheus text format."""
+    return Response(content=registry.render(), media_type=CONTENT_TYPE)
 
 @router.get("/chart-data")
-async def chart_data(symbol: str, period: str = "3mo"):
-    """Returns OHLC candlestick data for TradingView charts. No auth required."""
-    import asyncio
-    return await asyncio.to_thread(_fetch_chart_data, symbol, period)
+async def chart_data(symbol: str, period: str = "3mo", format: str = "rows"):
+    """
+    Returns OHLC candlestick data for TradingView charts. No auth required.
+    `format`: 'rows' (default, list of bars), 'columnar' ({time: [], open: [], ...})
+    or 'binary' (packed float buffer, see chart_serializer).
+    """
+    if format not in CHART_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unknown format '{format}'")
+    bars = await quote_cache.get(
+        "chart", symbol, lambda: run_in("market_data", _fetch_chart_data, symbol, period), period=period
+    )
+    if bars is None:
+        bars = frame_to_columns(None)
+    if format == "binary":
+        return Response(content=CHART_FORMATS[format](bars), media_type=BINARY_MEDIA_TYPE)
+    # JSONResponse directly: skips FastAPI's per-item jsonable_encoder pass
+    return JSONResponse(CHART_FORMATS[format](bars))
 
 def _fetch_chart_data(symbol: str, period: str):
+    """Loads the bars for a chart as numpy columns (time, open, high, low, close, volume)."""
     import yfinance as yf
-    t = yf.Ticker(symbol)
-    hist = t.history(period=period)
-    data = []
-    for idx, row in hist.iterrows():
-        data.append({
-            "time": idx.strftime("%Y-%m-%d"),
-            "open": round(float(row["Open"]), 2),
-            "high": round(float(row["High"]), 2),
-            "low": round(float(row["Low"]), 2),
-            "close": round(float(row["Close"]), 2),
-        })
-    return data
+    if bar_store.supports(period):
+        # Daily periods are served from the local bar store (only the missing tail hits Yahoo)
+        bars = bar_store.read_period(symbol, period)
+    else:
+        with upstream_call("yfinance", "history", symbol):
+            bars = frame_to_columns(yf.Ticker(symbol).history(period=period))
+    # Copy out of the memory map so cached entries own (and account for) their data
+    return {name: np.array(col) for name, col in bars.items()}
@@ -1,70 +1,191 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import Session
-from typing import List, Dict, Any
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from sqlmodel import Session, select
+from typing import List, Dict, Any, AsyncIterator, Optional
 from ..database import get_session
-from ..models import Ticker, Trade, User
+from ..models import ScanSnapshot, Ticker, Trade, User, UserContext
 from ..data_fetcher import DataFetcher
+from ..backtest import DIRECTIONS, evaluate, load_matrix, run_grid
+from ..bar_store import bar_store
 from ..strategy import Strategy
-from ..news_api import NewsAPI
+from ..portfolio import Portfolio, fetch_marks
 from ..gemini_nlp import GeminiNLP
-from ..auth import get_active_username, validate_master_totp
+from ..idea_analyst import IdeaAnalyst
+from ..scan_scheduler import ScanScheduler, ScanUnavailable, select_candidates
+from ..services import get_data_fetcher, get_nlp, get_idea_analyst, get_scan_scheduler
+from ..auth import current_user, get_active_username, validate_master_totp
+from ..executors import run_in
 import datetime
+import json
 
 router = APIRouter(tags=["Trading & NLP"], dependencies=[Depends(validate_master_totp)])
 
+async def _latest_snapshot(scanner: ScanScheduler, refresh: bool = False) -> ScanSnapshot:
+    try:
+        return await scanner.latest(refresh=refresh)
+    except ScanUnavailable as e:
+        raise HTTPException(status_code=503, detail=f"Scan unavailable: {e}")
+
 @router.post("/scan")
-async def scan_market(username: str = Depends(get_active_username), session: Session = Depends(get_session)):
-    fetcher = DataFetcher()
-    news = NewsAPI()
-    data = await fetcher.fetch_all_data()
-    strategy = Strategy(session)
-    candidates = strategy.find_overreactions(data)
-    
-    # Enrich with news traffic light
-    result = []
-    for cand in candidates:
-        light = news.get_traffic_light(cand.symbol)
-        result.append({
-            "ticker": cand,
-            "traffic_light": light
-        })
-    return result
+async def scan_market(
+    response: Response,
+    refresh: bool = False,
+    current: UserContext = Depends(current_user),
+    scanner: ScanScheduler = Depends(get_scan_scheduler),
+):
+    """
+    Candidates of the latest background scan snapshot that pass the user's scan
+    thresholds (`refresh=true` forces a new scan first). The snapshot time is in
+    the X-Scan-Snapshot-At header.
+    """
+    snapshot = await _latest_snapshot(scanner, refresh)
+    response.headers["X-Scan-Snapshot-At"] = snapshot.created_at.isoformat() + "Z"
+    return select_candidates(snapshot.candidates, current.scan_thresholds)
 
-@router.post("/command")
-async def process_nlp_command(text: str, username: str = Depends(get_active_username), session: Session = Depends(get_session)):
-    user = session.exec(select(User).where(User.username == username)).first()
-    
-    # Rate Limiting Logic
+def _sse_response(title: str, events: AsyncIterator[Dict[str, Any]]) -> StreamingResponse:
+    """Encodes IdeaAnalyst stream events as Server-Sent Events (header first, then rows)."""
+    async def encode():
+        async for event in events:
+            name = event.pop("event")
+            if name == "header":
+                event["title"] = title
+            yield f"event: {name}\ndata: {json.dumps(event, default=str)}\n\n"
+
+    return StreamingResponse(
+        encode(),
+        media_type="text/event-stream",
+        # Disable proxy buffering so rows reach the browser as they are computed
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.get("/research/stream")
+async def research_stream(
+    hypothesis: str,
+    symbols: str,
+    title: str = "Research",
+    username: str = Depends(get_active_username),
+    analyst: IdeaAnalyst = Depends(get_idea_analyst),
+):
+    """Streams a research run as SSE; `symbols` is a comma separated list."""
+    symbol_list = [s.strip().upper() for s in symbols.split(",") if s.strip()]
+    return _sse_response(title, analyst.analyze_stream(hypothesis, symbol_list))
+
+MAX_BACKTEST_SYMBOLS = 1000
+
+def _number_list(value: str, cast):
+    try:
+        return [cast(v) for v in value.split(",") if v.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid list: {value}")
+
+@router.get("/backtest")
+async def backtest(
+    symbols: str,
+    period: str = "5y",
+    threshold: float = Query(5.0, gt=0),
+    hold_days: int = Query(0, ge=0, le=60),
+    direction: str = "fade",
+    thresholds: Optional[str] = None,
+    hold_periods: Optional[str] = None,
+    username: str = Depends(get_active_username),
+    analyst: IdeaAnalyst = Depends(get_idea_analyst),
+):
+    """
+    Backtests the overnight-overreaction rule over daily bars of `symbols`
+    (comma separated): entry at the open on a gap >= `threshold` %, exit at
+    the close after `hold_days` sessions, 0.20% round-trip fees. Returns
+    trades, hit rate, average return, total return, max drawdown and the
+    equity curve. With `thresholds` and/or `hold_periods` (comma lists) the
+    grid is evaluated across processes instead and returned best first.
+    """
+    if not bar_store.supports(period):
+        raise HTTPException(status_code=400, detail=f"Unsupported period: {period}")
+    if direction not in DIRECTIONS:
+        raise HTTPException(status_code=400, detail=f"direction must be one of {', '.join(DIRECTIONS)}")
+    symbol_list = list(dict.fromkeys(s.strip().upper() for s in symbols.split(",") if s.strip()))
+    if not symbol_list or len(symbol_list) > MAX_BACKTEST_SYMBOLS:
+        raise HTTPException(status_code=400, detail=f"1 to {MAX_BACKTEST_SYMBOLS} symbols required")
+
+    matrix, errors = await load_matrix(symbol_list, period, analyst.executor)
+    response = {"period": period, "symbols": len(matrix.symbols), "days": len(matrix.dates), "errors": errors}
+    if thresholds or hold_periods:
+        grid_thresholds = _number_list(thresholds, float) if thresholds else [threshold]
+        grid_holds = _number_list(hold_periods, int) if hold_periods else [hold_days]
+        if any(t <= 0 for t in grid_thresholds) or any(not 0 <= h <= 60 for h in grid_holds):
+            raise HTTPException(status_code=400, detail="Thresholds must be > 0, holding periods 0-60 days")
+        if len(grid_thresholds) * len(grid_holds) > 400:
+            raise HTTPException(status_code=400, detail="At most 400 grid cells")
+        response["grid"] = await run_in("cpu", run_grid, matrix, grid_thresholds, grid_holds, direction)
+    else:
+        response["result"] = await run_in("cpu", evaluate, matrix, threshold, hold_days, direction)
+    return response
+
+def _check_quota(session: Session, user_id: int) -> User:
+    user = session.get(User, user_id)
     today = datetime.date.today().isoformat()
     if user.last_call_date != today:
         user.api_calls_today = 0
         user.last_call_date = today
-    
+
     if user.api_calls_today >= user.daily_api_limit:
         raise HTTPException(status_code=429, detail="Daily NLP limit reached")
-    
-    nlp = GeminiNLP()
-    action = nlp.process_command(text, api_key=user.gemini_api_key)
-    
-    if "error" in action:
-        return action
-        
+    return user
+
+def _count_call(session: Session, user: User):
     user.api_calls_today += 1
     session.add(user)
     session.commit()
+
+async def _marks(session: Session, fetcher: DataFetcher, symbol: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+    """Cached quotes for the open positions (one batched lookup per asset class)."""
+    return await fetch_marks(fetcher, await run_in("db", Portfolio(session).open_symbols, symbol))
+
+def _portfolio_status(session: Session, quotes: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    portfolio = Portfolio(session)
+    return {"action": "status", "summary": portfolio.summary(quotes), "positions": portfolio.positions(quotes=quotes)}
+
+@router.post("/command")
+async def process_nlp_command(
+    text: str,
+    stream: bool = False,
+    current: UserContext = Depends(current_user),
+    session: Session = Depends(get_session),
+    fetcher: DataFetcher = Depends(get_data_fetcher),
+    scanner: ScanScheduler = Depends(get_scan_scheduler),
+    nlp: GeminiNLP = Depends(get_nlp),
+    analyst: IdeaAnalyst = Depends(get_idea_analyst),
+):
+    # Rule-parsed and cached commands never reach the model, so they don't count against the limit
+    action = nlp.resolve_local(text)
+    if action is None:
+        # Rate Limiting Logic (the only place that needs the full user row)
+        user = await run_in("db", _check_quota, session, current.id)
+
+        action = await nlp.process_command(text, api_key=user.gemini_api_key)
+
+        if "error" in action:
+            return action
+
+        await run_in("db", _count_call, session, user)
         
     if action["action"] == "scan":
-        return await scan_market(username, session)
+        thresholds, filters = current.scan_thresholds, action.get("filters") or {}
+        if filters.get("threshold") is not None:
+            # "Gewinner über 7%": the command's threshold replaces the user's move thresholds
+            threshold = abs(float(filters["threshold"]))
+            thresholds = thresholds.model_copy(update={"gap_pct": threshold, "change_pct": threshold})
+        return select_candidates((await _latest_snapshot(scanner)).candidates, thresholds, filters.get("type"))
     elif action["action"] == "trade":
         strategy = Strategy(session)
-        fetcher = DataFetcher()
         ticker_data = await fetcher.fetch_stocks([action["symbol"]])
         if not ticker_data:
              ticker_data = await fetcher.fetch_crypto([action["symbol"]])
              
         if action["symbol"] in ticker_data:
             price = ticker_data[action["symbol"]]["price"]
-            trade = strategy.execute_paper_trade(
+            trade = await run_in(
+                "db",
+                strategy.execute_paper_trade,
                 action["symbol"], 
                 action["quantity"], 
                 price, 
@@ -73,18 +194,23 @@ async def process_nlp_command(text: str, username: str = Depends(get_active_user
             return {"message": "Trade executed", "trade": trade}
         return {"error": "Symbol not found"}
     elif action["action"] == "status":
-        from .auth import router as auth_router # Local import to avoid circular if needed, but standard is using get_trades
-        # Actually main.py had a direct call to get_trades. 
-        # For simplicity, we can just query the trades here or import the trades logic.
-        return session.query(Trade).all()
+        return await run_in("db", _portfolio_status, session, await _marks(session, fetcher))
     elif action["action"] == "filter":
         criteria = action.get("criteria", {})
-        fetcher = DataFetcher()
         filtered = await fetcher.filter_stocks(criteria)
+        if not filtered and not await fetcher.fundamentals_ready():
+            # The first background refresh hasn't stored anything yet: say so instead of "no matches"
+            return {
+                "action": "filter", "results": [], "status": "warming_up",
+                "message": "Fundamentaldaten werden noch geladen, bitte in ein paar Minuten erneut versuchen.",
+            }
         return {"action": "filter", "results": filtered}
     elif action["action"] == "research":
-        from ..idea_analyst import IdeaAnalyst
-        analyst = IdeaAnalyst()
+        if stream:
+            return _sse_response(
+                action.get("title", "Research"),
+                analyst.analyze_stream(action.get("hypothesis"), action.get("suggested_symbols", []))
+            )
         results = await analyst.analyze(
             action.get("hypothesis"), 
             action.get("suggested_symbols", [])
@@ -101,6 +227,82 @@ async def process_nlp_command(text: str, username: str = Depends(get_active_user
 def get_tickers(username: str = Depends(get_active_username), session: Session = Depends(get_session)):
     return session.query(Ticker).all()
 
-@router.get("/trades", response_model=List[Trade])
-def get_trades(username: str = Depends(get_active_username), session: Session = Depends(get_session)):
-    return session.query(Trade).all()
+@router.get("/trades")
+def get_trades(
+    status: Optional[str] = Query(None, pattern="^(open|closed)$"),
+    symbol: Optional[str] = None,
+    since: Optional[datetime.datetime] = None,
+    until: Optional[datetime.datetime] = None,
+    cursor: Optional[int] = None,
+    limit: int = Query(100, ge=1, le=500),
+    username: str = Depends(get_active_username),
+    session: Session = Depends(get_session),
+):
+    """
+    Trades newest first, filtered by status, symbol and entry time
+    (`since` <= entry_time < `until`). Paginated by id: pass `next_cursor`
+    as `cursor` for the next page.
+    """
+    statement = select(Trade)
+    if status:
+        statement = statement.where(Trade.status == status)
+    if symbol:
+        statement = statement.where(Trade.symbol == symbol.strip().upper())
+    if since:
+        statement = statement.where(Trade.entry_time >= since)
+    if until:
+        statement = statement.where(Trade.entry_time < until)
+    if cursor:
+        statement = statement.where(Trade.id < cursor)
+    trades = session.exec(statement.order_by(Trade.id.desc()).limit(limit + 1)).all()
+    return {
+        "trades": trades[:limit],
+        "next_cursor": trades[limit - 1].id if len(trades) > limit else None,
+    }
+
+@router.get("/trades/summary")
+async def get_trades_summary(
+    username: str = Depends(get_active_username),
+    session: Session = Depends(get_session),
+    fetcher: DataFetcher = Depends(get_data_fetcher),
+):
+    """Portfolio totals: open/closed counts, win rate, exposure, realized and unrealized P&L (net of fees)."""
+    quotes = await _marks(session, fetcher)
+    return await run_in("db", Portfolio(session).summary, quotes)
+
+@router.get("/portfolio")
+async def get_portfolio(
+    symbol: Optional[str] = None,
+    username: str = Depends(get_active_username),
+    session: Session = Depends(get_session),
+    fetcher: DataFetcher = Depends(get_data_fetcher),
+):
+    """Open positions per symbol and side, marked to the cached quotes."""
+    symbol = symbol.strip().upper() if symbol else None
+    quotes = await _marks(session, fetcher, symbol)
+    return await run_in("db", Portfolio(session).positions, symbol, quotes)
+
+@router.post("/trades/{trade_id}/close")
+async def close_trade(
+    trade_id: int,
+    exit_price: Optional[float] = Query(None, gt=0),
+    username: str = Depends(get_active_username),
+    session: Session = Depends(get_session),
+    fetcher: DataFetcher = Depends(get_data_fetcher),
+):
+    """Closes an open paper trade at `exit_price`, or at the current quote if omitted."""
+    trade = await run_in("db", session.get, Trade, trade_id)
+    if not trade:
+        raise HTTPException(status_code=404, detail="Trade not found")
+    if trade.status != "open":
+        raise HTTPException(status_code=409, detail="Trade already closed")
+    if exit_price is None:
+        quotes = await fetcher.fetch_stocks([trade.symbol]) or await fetcher.fetch_crypto([trade.symbol])
+        if trade.symbol not in quotes:
+            raise HTTPException(status_code=502, detail="No quote available")
+        exit_price = quotes[trade.symbol]["price"]
+    try:
+        trade = await run_in("db", Portfolio(session).close_trade, trade, exit_price)
+    except ValueError:
+        raise HTTPException(status_code=409, detail="Trade already closed")
+    return {"message": "Trade closed", "trade": trade}
@@ -1,20 +1,24 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlmodel import Session, select
 from typing import Optional
 from ..database import get_session
-from ..models import User
-from ..auth import get_active_username, validate_master_totp
+from ..models import User, UserContext
+from ..auth import current_user, invalidate_user, validate_master_totp
 
 router = APIRouter(prefix="/user", tags=["User Settings"], dependencies=[Depends(validate_master_totp)])
 
 @router.post("/settings")
-async def update_settings(
+def update_settings(
     gemini_api_key: Optional[str] = None, 
     daily_limit: Optional[int] = None,
-    username: str = Depends(get_active_username), 
+    scan_gap_pct: Optional[float] = Query(None, ge=0),
+    scan_change_pct: Optional[float] = Query(None, ge=0),
+    scan_min_volume_ratio: Optional[float] = Query(None, ge=0),
+    scan_min_gap_z: Optional[float] = Query(None, ge=0),
+    current: UserContext = Depends(current_user), 
     session: Session = Depends(get_session)
 ):
-    user = session.exec(select(User).where(User.username == username)).first()
+    user = session.get(User, current.id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
@@ -22,16 +26,29 @@ async def update_settings(
         user.gemini_api_key = gemini_api_key
     if daily_limit is not None:
         user.daily_api_limit = daily_limit
+    if scan_gap_pct is not None:
+        user.scan_gap_pct = scan_gap_pct
+    if scan_change_pct is not None:
+        user.scan_change_pct = scan_change_pct
+    if scan_min_volume_ratio is not None:
+        user.scan_min_volume_ratio = scan_min_volume_ratio
+    if scan_min_gap_z is not None:
+        user.scan_min_gap_z = scan_min_gap_z
         
     session.add(user)
     session.commit()
+    invalidate_user(user.username)
     return {"message": "Settings updated"}
 
 @router.get("/settings")
-async def get_settings(username: str = Depends(get_active_username), session: Session = Depends(get_session)):
-    user = session.exec(select(User).where(User.username == username)).first()
+def get_settings(current: UserContext = Depends(current_user), session: Session = Depends(get_session)):
+    user = session.get(User, current.id)
     return {
         "gemini_api_key": user.gemini_api_key,
         "daily_api_limit": user.daily_api_limit,
-        "api_calls_today": user.api_calls_today
+        "api_calls_today": user.api_calls_today,
+        "scan_gap_pct": user.scan_gap_pct,
+        "scan_change_pct": user.scan_change_pct,
+        "scan_min_volume_ratio": user.scan_min_volume_ratio,
+        "scan_min_gap_z": user.scan_min_gap_z,
     }
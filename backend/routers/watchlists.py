@@ -1,20 +1,168 @@
-from fastapi import APIRouter, Depends, HTTPException
+import hashlib
+import json
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Header, Query, UploadFile, File
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response
+from sqlalchemy import delete
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import selectinload
 from sqlmodel import Session, select
-from typing import List, Optional
+from typing import List, Optional, Dict, Any
 from ..database import get_session
-from ..models import Watchlist, WatchlistTickerLink, Ticker, User
-from ..auth import get_active_username, validate_master_totp
+from ..data_fetcher import DataFetcher
+from ..executors import run_in
+from ..models import Watchlist, WatchlistTickerLink, Ticker, UserContext, Fundamentals, SymbolBatch
+from ..auth import current_user, validate_master_totp
+from ..market_search import MarketSearch
+from ..portfolio import fetch_marks
+from ..services import get_data_fetcher, get_market_search
+from ..universe import is_crypto, is_ticker, parse_symbols
 
 router = APIRouter(prefix="/watchlists", tags=["Watchlists"], dependencies=[Depends(validate_master_totp)])
 
+MAX_BATCH_SYMBOLS = 5000
+
+def _own_watchlist(session: Session, watchlist_id: int, user: UserContext) -> Watchlist:
+    watchlist = session.get(Watchlist, watchlist_id)
+    if not watchlist or watchlist.user_id != user.id:
+        raise HTTPException(status_code=404, detail="Watchlist not found")
+    return watchlist
+
+def _normalize(symbols: List[str]) -> List[str]:
+    normalized = list(dict.fromkeys(s.strip().upper() for s in symbols if s and s.strip()))
+    if len(normalized) > MAX_BATCH_SYMBOLS:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BATCH_SYMBOLS} symbols per request")
+    return normalized
+
+def _unknown_symbols(session: Session, symbols: List[str], market_search: MarketSearch) -> List[str]:
+    """
+    Symbols that are neither a tradable Binance pair (cached index) nor listed
+    on Yahoo (cached search). Symbols of the fundamentals universe skip the lookup.
+    """
+    try:
+        stocks = [s for s in symbols if not (is_crypto(s) and market_search.is_known_crypto(s))]
+        if not stocks:
+            return []
+        known = set(session.exec(select(Fundamentals.symbol).where(Fundamentals.symbol.in_(stocks))).all())
+        known |= market_search.known_stocks(s for s in stocks if s not in known)
+    except Exception:
+        raise HTTPException(status_code=503, detail="Symbol validation unavailable, retry or pass validate_symbols=false")
+    return [s for s in stocks if s not in known]
+
+def _add_symbols(session: Session, watchlist_id: int, symbols: List[str], names: Dict[str, str]) -> Dict[str, Any]:
+    """
+    Links all symbols to the watchlist in one transaction: missing Ticker rows
+    are inserted with one INSERT ... ON CONFLICT DO NOTHING, ids are resolved
+    with one IN query and the links are inserted the same way.
+    """
+    if not symbols:
+        return {"added": 0, "created": 0}
+    now = datetime.utcnow()
+    existing = set(session.exec(select(Ticker.symbol).where(Ticker.symbol.in_(symbols))).all())
+    missing = [s for s in symbols if s not in existing]
+    if missing:
+        # Prices stay 0 until a scan writes them; /full reports such rows as unpriced (null)
+        session.execute(
+            sqlite_insert(Ticker).on_conflict_do_nothing(index_elements=["symbol"]),
+            [{"symbol": s, "name": names.get(s), "last_price": 0.0, "change_pct": 0.0, "updated_at": now} for s in missing],
+        )
+    ids = session.exec(select(Ticker.id).where(Ticker.symbol.in_(symbols))).all()
+    linked = set(session.exec(
+        select(WatchlistTickerLink.ticker_id).where(WatchlistTickerLink.watchlist_id == watchlist_id)
+    ).all())
+    new_links = [{"watchlist_id": watchlist_id, "ticker_id": ticker_id} for ticker_id in ids if ticker_id not in linked]
+    if new_links:
+        session.execute(sqlite_insert(WatchlistTickerLink).on_conflict_do_nothing(), new_links)
+    session.commit()
+    return {"added": len(new_links), "created": len(missing)}
+
+def _add_batch(
+    session: Session,
+    watchlist_id: int,
+    symbols: List[str],
+    validate_symbols: bool,
+    market_search: MarketSearch,
+    malformed: Optional[List[str]] = None,
+) -> Dict[str, Any]:
+    """Adds the symbols; malformed ones and (with `validate_symbols`) unlisted ones come back under `invalid`."""
+    invalid = list(malformed or []) + [s for s in symbols if not is_ticker(s)]
+    candidates = [s for s in symbols if is_ticker(s)]
+    if validate_symbols:
+        invalid += _unknown_symbols(session, candidates, market_search)
+    rejected = set(invalid)
+    valid = [s for s in candidates if s not in rejected]
+    return {**_add_symbols(session, watchlist_id, valid, {}), "invalid": invalid}
+
 @router.get("", response_model=List[Watchlist])
-async def list_watchlists(username: str = Depends(get_active_username), session: Session = Depends(get_session)):
-    user = session.exec(select(User).where(User.username == username)).first()
-    return user.watchlists
+def list_watchlists(user: UserContext = Depends(current_user), session: Session = Depends(get_session)):
+    return session.exec(select(Watchlist).where(Watchlist.user_id == user.id)).all()
+
+def _watchlist_page(session: Session, user_id: int, cursor: Optional[int], limit: int):
+    statement = (
+        select(Watchlist)
+        .where(Watchlist.user_id == user_id)
+        .where(Watchlist.id > (cursor or 0))
+        .order_by(Watchlist.id)
+        .limit(limit + 1)
+        .options(selectinload(Watchlist.tickers))
+    )
+    watchlists = session.exec(statement).all()
+    next_cursor = watchlists[limit - 1].id if len(watchlists) > limit else None
+    return watchlists[:limit], next_cursor
+
+def _priced(ticker: Ticker, quotes: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """Ticker with its cached quote; without one the last scan price, or null if it was never priced."""
+    quote = quotes.get(ticker.symbol)
+    if quote:
+        return {**ticker.model_dump(), "last_price": quote["price"], "change_pct": quote.get("change")}
+    if not ticker.last_price:
+        # Rows created by a watchlist add hold 0.0 until a scan prices them
+        return {**ticker.model_dump(), "last_price": None, "change_pct": None}
+    return ticker.model_dump()
+
+@router.get("/full")
+async def list_watchlists_full(
+    cursor: Optional[int] = None,
+    limit: int = Query(50, ge=1, le=200),
+    if_none_match: Optional[str] = Header(None),
+    user: UserContext = Depends(current_user),
+    session: Session = Depends(get_session),
+    fetcher: DataFetcher = Depends(get_data_fetcher),
+):
+    """
+    All of the user's watchlists with their tickers, in two queries (lists +
+    selectinload of the tickers) regardless of the number of lists. Prices come
+    from the shared quote cache (one batched stock and one crypto lookup for
+    the page), falling back to the last scan price; tickers never priced have
+    `last_price: null`. Paginated by watchlist id: pass `next_cursor` as
+    `cursor` for the next page. Responses carry an ETag; a matching
+    If-None-Match returns 304.
+    """
+    watchlists, next_cursor = await run_in("db", _watchlist_page, session, user.id, cursor, limit)
+    quotes = await fetch_marks(fetcher, sorted({t.symbol for watchlist in watchlists for t in watchlist.tickers}))
+
+    payload = jsonable_encoder({
+        "watchlists": [
+            {
+                "id": watchlist.id,
+                "name": watchlist.name,
+                "tickers": [_priced(t, quotes) for t in sorted(watchlist.tickers, key=lambda t: t.symbol)],
+            }
+            for watchlist in watchlists
+        ],
+        "next_cursor": next_cursor,
+    })
+    body = json.dumps(payload, separators=(",", ":")).encode()
+    etag = f'W/"{hashlib.sha1(body).hexdigest()}"'
+    # no-cache: the browser revalidates with If-None-Match every time and reuses its copy on 304
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if if_none_match and etag in (tag.strip() for tag in if_none_match.split(",")):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
 
 @router.post("", response_model=Watchlist)
-async def create_watchlist(name: str, username: str = Depends(get_active_username), session: Session = Depends(get_session)):
-    user = session.exec(select(User).where(User.username == username)).first()
+def create_watchlist(name: str, user: UserContext = Depends(current_user), session: Session = Depends(get_session)):
     new_watchlist = Watchlist(name=name, user_id=user.id)
     session.add(new_watchlist)
     session.commit()
@@ -22,8 +170,7 @@ async def create_watchlist(name: str, username: str = Depends(get_active_usernam
     return new_watchlist
 
 @router.delete("/{watchlist_id}")
-async def delete_watchlist(watchlist_id: int, username: str = Depends(get_active_username), session: Session = Depends(get_session)):
-    user = session.exec(select(User).where(User.username == username)).first()
+def delete_watchlist(watchlist_id: int, user: UserContext = Depends(current_user), session: Session = Depends(get_session)):
     watchlist = session.get(Watchlist, watchlist_id)
     if not watchlist or watchlist.user_id != user.id:
         raise HTTPException(status_code=404, detail="Watchlist not found")
@@ -32,41 +179,73 @@ async def delete_watchlist(watchlist_id: int, username: str = Depends(get_active
     return {"message": "Watchlist deleted"}
 
 @router.post("/{watchlist_id}/tickers")
-async def add_ticker_to_watchlist(
+def add_ticker_to_watchlist(
     watchlist_id: int, 
     symbol: str, 
     name: Optional[str] = None, 
     ticker_type: str = "stock",
-    username: str = Depends(get_active_username), 
+    user: UserContext = Depends(current_user), 
     session: Session = Depends(get_session)
 ):
-    user = session.exec(select(User).where(User.username == username)).first()
-    watchlist = session.get(Watchlist, watchlist_id)
-    if not watchlist or watchlist.user_id != user.id:
-        raise HTTPException(status_code=404, detail="Watchlist not found")
-    
-    ticker = session.exec(select(Ticker).where(Ticker.symbol == symbol)).first()
-    if not ticker:
-        ticker = Ticker(symbol=symbol, name=name, type=ticker_type)
-        session.add(ticker)
-        session.commit()
-        session.refresh(ticker)
-    
-    link = session.exec(select(WatchlistTickerLink).where(
-        WatchlistTickerLink.watchlist_id == watchlist_id,
-        WatchlistTickerLink.ticker_id == ticker.id
-    )).first()
-    
-    if not link:
-        watchlist.tickers.append(ticker)
-        session.add(watchlist)
-        session.commit()
-        
+    _own_watchlist(session, watchlist_id, user)
+    symbols = _normalize([symbol])
+    _add_symbols(session, watchlist_id, symbols, {symbols[0]: name} if name and symbols else {})
     return {"message": "Ticker added to watchlist"}
 
+@router.post("/{watchlist_id}/tickers/batch")
+def add_tickers_batch(
+    watchlist_id: int,
+    batch: SymbolBatch,
+    user: UserContext = Depends(current_user),
+    session: Session = Depends(get_session),
+    market_search: MarketSearch = Depends(get_market_search),
+):
+    """Adds many symbols at once; returns counts and, with `validate_symbols`, the rejected symbols."""
+    _own_watchlist(session, watchlist_id, user)
+    return _add_batch(session, watchlist_id, _normalize(batch.symbols), batch.validate_symbols, market_search)
+
+@router.post("/{watchlist_id}/tickers/import")
+async def import_tickers(
+    watchlist_id: int,
+    file: UploadFile = File(...),
+    validate_symbols: bool = True,
+    user: UserContext = Depends(current_user),
+    session: Session = Depends(get_session),
+    market_search: MarketSearch = Depends(get_market_search),
+):
+    """Imports a symbol list or broker CSV export (column 'Symbol' or 'Ticker'; a table without one is a 400)."""
+    await run_in("db", _own_watchlist, session, watchlist_id, user)
+    content = (await file.read()).decode("utf-8-sig", errors="replace")
+    malformed: List[str] = []
+    try:
+        symbols = _normalize(parse_symbols(content, malformed))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    # The inserts and the validation lookups (crypto index, Yahoo search) are blocking
+    return await run_in("db", _add_batch, session, watchlist_id, symbols, validate_symbols, market_search, malformed)
+
+@router.post("/{watchlist_id}/tickers/remove")
+def remove_tickers_batch(
+    watchlist_id: int,
+    batch: SymbolBatch,
+    user: UserContext = Depends(current_user),
+    session: Session = Depends(get_session),
+):
+    """Unlinks many symbols from the watchlist with one DELETE."""
+    _own_watchlist(session, watchlist_id, user)
+    symbols = _normalize(batch.symbols)
+    if not symbols:
+        return {"removed": 0}
+    result = session.execute(
+        delete(WatchlistTickerLink)
+        .where(WatchlistTickerLink.watchlist_id == watchlist_id)
+        .where(WatchlistTickerLink.ticker_id.in_(select(Ticker.id).where(Ticker.symbol.in_(symbols))))
+    )
+    session.commit()
+    return {"removed": result.rowcount}
+
 @router.get("/{watchlist_id}/tickers", response_model=List[Ticker])
-async def get_watchlist_tickers(watchlist_id: int, username: str = Depends(get_active_username), session: Session = Depends(get_session)):
-    user = session.exec(select(User).where(User.username == username)).first()
+def get_watchlist_tickers(watchlist_id: int, user: UserContext = Depends(current_user), session: Session = Depends(get_session)):
     watchlist = session.get(Watchlist, watchlist_id)
     if not watchlist or watchlist.user_id != user.id:
         raise HTTPException(status_code=404, detail="Watchlist not found")
@@ -0,0 +1,187 @@
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, time as dt_time, timedelta
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import delete
+from sqlmodel import Session, select
+
+from .database import engine
+from .executors import run_in
+from .data_fetcher import DataFetcher
+from .metrics import job_context
+from .gap_matrix import GapMatrix, compute_gap_metrics, concat_metrics, overreaction_mask, quote_metrics
+from .models import ScanSnapshot, ScanThresholds
+from .news_api import NewsAPI, MARKET_TZ
+from .strategy import Strategy
+from .universe import load_universe
+
+# Pre-market opens 04:00 New York, the regular session closes 16:00
+SCAN_WINDOW = (dt_time(4, 0), dt_time(16, 0))
+DEFAULT_CRYPTO = ["BTCUSDT", "ETHUSDT", "BNBUSDT"]
+# Snapshots keep every symbol that gapped or moved at least this much; each
+# user's own thresholds are applied on top when the snapshot is served
+STORE_MIN_MOVE_PCT = float(os.getenv("SCAN_STORE_MIN_MOVE_PCT", "3"))
+METRIC_KEYS = ("gap_pct", "change_pct", "volume_ratio", "atr_pct", "gap_z")
+
+logger = logging.getLogger(__name__)
+
+class ScanUnavailable(RuntimeError):
+    """No snapshot can be served: the scan failed and none was stored before."""
+
+class ScanScheduler:
+    """
+    Runs the overnight-overreaction scan over the whole universe in the
+    background (every `interval_minutes` on weekdays between pre-market open
+    and the close) and stores each result as a ScanSnapshot. /scan serves the
+    latest snapshot, so its latency no longer depends on Yahoo or Binance.
+    """
+
+    def __init__(
+        self,
+        fetcher: DataFetcher,
+        news: NewsAPI,
+        stocks: List[str],
+        cryptos: Optional[List[str]] = None,
+        interval_minutes: float = 10.0,
+        retention_days: int = 30,
+    ):
+        self.fetcher = fetcher
+        self.news = news
+        self.stocks = stocks
+        self.cryptos = DEFAULT_CRYPTO if cryptos is None else cryptos
+        self.interval_minutes = interval_minutes
+        self.retention_days = retention_days
+        self.store_thresholds = ScanThresholds(gap_pct=STORE_MIN_MOVE_PCT, change_pct=STORE_MIN_MOVE_PCT)
+        self._lock = asyncio.Lock()
+
+    async def run_forever(self):
+        while True:
+            if in_scan_window():
+                try:
+                    with job_context("scan_scheduler"):
+                        await self.run_scan()
+                except Exception:
+                    logger.exception("scheduled scan failed")
+            await asyncio.sleep(self.interval_minutes * 60)
+
+    async def latest(self, refresh: bool = False) -> ScanSnapshot:
+        """Newest snapshot; scans first if forced or if none exists yet. Raises ScanUnavailable."""
+        if not refresh:
+            snapshot = await run_in("db", self._load_latest)
+            if snapshot is not None:
+                return snapshot
+        return await self.run_scan()
+
+    async def run_scan(self) -> ScanSnapshot:
+        """Scans and stores a snapshot; raises ScanUnavailable if the scan fails."""
+        if self._lock.locked():
+            # A scan is already running: wait for it instead of starting a second one
+            async with self._lock:
+                pass
+            snapshot = await run_in("db", self._load_latest)
+            if snapshot is not None:
+                return snapshot
+            # That scan failed before anything was stored: scan ourselves
+
+        async with self._lock:
+            try:
+                return await self._scan()
+            except Exception as e:
+                raise ScanUnavailable(str(e)) from e
+
+    async def _scan(self) -> ScanSnapshot:
+        started = time.perf_counter()
+        stock_bars, crypto_data = await asyncio.gather(
+            self.fetcher.fetch_daily_bars(self.stocks), self.fetcher.fetch_crypto(self.cryptos)
+        )
+        candidates = await run_in("bulk", self._detect, stock_bars, crypto_data)
+        lights = await self.news.get_traffic_lights([c["ticker"]["symbol"] for c in candidates])
+        for candidate in candidates:
+            candidate["traffic_light"] = lights[candidate["ticker"]["symbol"]]
+        snapshot = ScanSnapshot(
+            universe_size=len(self.stocks) + len(self.cryptos),
+            quotes=len(stock_bars) + len(crypto_data),
+            duration_ms=round((time.perf_counter() - started) * 1000, 1),
+            candidates=candidates,
+        )
+        logger.info("scan finished", extra={
+            "universe": snapshot.universe_size, "quotes": snapshot.quotes,
+            "candidates": len(candidates), "duration_ms": snapshot.duration_ms,
+        })
+        return await run_in("db", self._store, snapshot)
+
+    def _detect(self, stock_bars: Dict[str, pd.DataFrame], crypto_data: Dict[str, Any]) -> List[dict]:
+        """Gap matrix over all stocks plus the crypto quotes, one vectorized pass, movers stored as Tickers."""
+        metrics = concat_metrics(
+            compute_gap_metrics(GapMatrix.from_frames(stock_bars)), quote_metrics(crypto_data)
+        )
+        with Session(engine) as session:
+            movers = Strategy(session).find_overreactions(metrics, self.store_thresholds)
+            return [
+                {
+                    "ticker": {
+                        "symbol": t.symbol,
+                        "last_price": t.last_price,
+                        "change_pct": t.change_pct,
+                        "updated_at": t.updated_at.isoformat(),
+                    },
+                    "metrics": {key: row[key] for key in METRIC_KEYS},
+                }
+                for t, row in movers
+            ]
+
+    def _store(self, snapshot: ScanSnapshot) -> ScanSnapshot:
+        with Session(engine) as session:
+            session.add(snapshot)
+            cutoff = datetime.utcnow() - timedelta(days=self.retention_days)
+            session.execute(delete(ScanSnapshot).where(ScanSnapshot.created_at < cutoff))
+            session.commit()
+            session.refresh(snapshot)
+            return snapshot
+
+    def _load_latest(self) -> Optional[ScanSnapshot]:
+        with Session(engine) as session:
+            return session.exec(select(ScanSnapshot).order_by(ScanSnapshot.created_at.desc()).limit(1)).first()
+
+def select_candidates(
+    candidates: List[Dict[str, Any]], thresholds: ScanThresholds, direction: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """
+    The snapshot candidates that pass a user's thresholds; `direction`
+    "gainers"/"losers" keeps only up/down moves. Snapshots written before the
+    gap metrics existed only carry change_pct.
+    """
+    if not candidates:
+        return []
+    rows = [c.get("metrics") or {"change_pct": c["ticker"]["change_pct"]} for c in candidates]
+    metrics = {
+        key: np.array([np.nan if row.get(key) is None else row[key] for row in rows], dtype=np.float64)
+        for key in METRIC_KEYS
+    }
+    mask = overreaction_mask(metrics, thresholds)
+    if direction in ("gainers", "losers"):
+        # The larger of gap and change decides the direction
+        move = np.where(np.abs(np.nan_to_num(metrics["gap_pct"])) > np.abs(np.nan_to_num(metrics["change_pct"])),
+                        metrics["gap_pct"], metrics["change_pct"])
+        mask &= move > 0 if direction == "gainers" else move < 0
+    return [c for c, keep in zip(candidates, mask) if keep]
+
+def in_scan_window(now: Optional[datetime] = None) -> bool:
+    local = (now or datetime.now(MARKET_TZ)).astimezone(MARKET_TZ)
+    return local.weekday() < 5 and SCAN_WINDOW[0] <= local.time() < SCAN_WINDOW[1]
+
+def build_scan_scheduler(fetcher: DataFetcher, news: NewsAPI) -> ScanScheduler:
+    """Scheduler over the scanner universe (SCANNER_UNIVERSE_FILE) plus SCAN_CRYPTO_SYMBOLS."""
+    cryptos = os.getenv("SCAN_CRYPTO_SYMBOLS")
+    return ScanScheduler(
+        fetcher,
+        news,
+        load_universe(),
+        cryptos=[s.strip().upper() for s in cryptos.split(",") if s.strip()] if cryptos else None,
+        interval_minutes=float(os.getenv("SCAN_INTERVAL_MINUTES", "10")),
+    )
@@ -1,4 +1,5 @@
 import pyotp
+from functools import lru_cache
 from typing import Optional
 
 def generate_totp_secret() -> str:
@@ -8,8 +9,8 @@ def get_totp_uri(username: str, secret: str, issuer_name: str = "TradingDashboar
     return pyotp.totp.TOTP(secret).provisioning_uri(name=username, issuer_name=issuer_name)
 
 def verify_totp_code(secret: str, code: str) -> bool:
-    totp = pyotp.totp.TOTP(secret)
-    return totp.verify(code)
-    
+    return get_totp_instance(secret).verify(code)
+
+@lru_cache(maxsize=1024)
 def get_totp_instance(secret: str):
     return pyotp.totp.TOTP(secret)
@@ -0,0 +1,82 @@
+import os
+from typing import Optional
+
+import requests
+from binance.client import Client
+from fastapi import Request
+from requests.adapters import HTTPAdapter
+
+from .data_fetcher import DataFetcher
+from .news_api import NewsAPI
+from .gemini_nlp import GeminiNLP
+from .idea_analyst import IdeaAnalyst
+from .market_search import MarketSearch
+from .quote_cache import quote_cache
+from .research_executor import default_executor
+from .scan_scheduler import ScanScheduler, build_scan_scheduler
+from .shared_cache import build_shared_cache
+
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "32"))
+
+def pooled_session(session: Optional[requests.Session] = None, pool_size: int = HTTP_POOL_SIZE) -> requests.Session:
+    """Keep-alive session whose connection pool is large enough for the worker threads."""
+    session = session or requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+class Services:
+    """
+    Process-wide registry of fetchers and API clients. Built once in the app
+    lifespan and handed to routes through the `get_*` dependencies below, so
+    requests reuse warm objects and open connections instead of constructing
+    a Binance client (ping + new TLS session) per call.
+    """
+
+    def __init__(self, binance_api_key: str = "", binance_api_secret: str = ""):
+        # Cross-worker cache file behind the process-wide quote and research `info` caches (None: off)
+        self.shared_cache = build_shared_cache()
+        quote_cache.shared = self.shared_cache
+        default_executor.shared = self.shared_cache
+
+        # ping=False: connections are opened lazily and then kept alive by the pool
+        self.binance_client = Client(binance_api_key, binance_api_secret, ping=False)
+        pooled_session(self.binance_client.session)
+        self.http = pooled_session()
+
+        self.market_search = MarketSearch(self.binance_client, session=self.http)
+        self.data_fetcher = DataFetcher(binance_client=self.binance_client, market_search=self.market_search)
+        self.news = NewsAPI()
+        self.nlp = GeminiNLP()
+        self.idea_analyst = IdeaAnalyst()
+        self.scan_scheduler = build_scan_scheduler(self.data_fetcher, self.news)
+
+    async def aclose(self):
+        """Closes the pooled HTTP connections and detaches the shared cache; called once on shutdown."""
+        await self.nlp.aclose()
+        self.http.close()
+        self.binance_client.close_connection()
+        quote_cache.shared = None
+        default_executor.shared = None
+
+def get_services(request: Request) -> Services:
+    return request.app.state.services
+
+def get_data_fetcher(request: Request) -> DataFetcher:
+    return request.app.state.services.data_fetcher
+
+def get_market_search(request: Request) -> MarketSearch:
+    return request.app.state.services.market_search
+
+def get_news_api(request: Request) -> NewsAPI:
+    return request.app.state.services.news
+
+def get_nlp(request: Request) -> GeminiNLP:
+    return request.app.state.services.nlp
+
+def get_idea_analyst(request: Request) -> IdeaAnalyst:
+    return request.app.state.services.idea_analyst
+
+def get_scan_scheduler(request: Request) -> ScanScheduler:
+    return request.app.state.services.scan_scheduler
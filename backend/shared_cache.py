@@ -0,0 +1,176 @@
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from .database import sqlite_file_name
+
+# SQLite limits bound parameters per statement; IN lists are chunked below this
+_MAX_IN = 500
+# SHARED_CACHE_FILE values that turn the shared cache off
+_DISABLED = ("", "off", "none", "0")
+
+logger = logging.getLogger(__name__)
+
+def _chunks(symbols: List[str]) -> Iterable[List[str]]:
+    for i in range(0, len(symbols), _MAX_IN):
+        yield symbols[i:i + _MAX_IN]
+
+class SharedCache:
+    """
+    Cross-process cache in a local SQLite file, so the worker processes of one
+    deployment share upstream results (L2 behind each worker's QuoteCache).
+    Values are pickled with an absolute expiry time; a `None` value records
+    that the upstream had nothing for a symbol. Fetch leases let one worker
+    fetch a key while the others wait for its result instead of calling the
+    upstream themselves. The file is a cache only: losing it costs refetches.
+    Values are unpickled, so the file must only be writable by this user:
+    it is created with mode 0600 and its directory must not be writable by
+    anyone else (PermissionError otherwise).
+    """
+
+    def __init__(self, path: str, lease_seconds: float = 30.0, purge_every: int = 500):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.purge_every = purge_every
+        _create_private(path)
+        self._local = threading.local()
+        self._writes = 0
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache (kind TEXT, symbol TEXT, period TEXT, value BLOB, fresh_until REAL, "
+            "PRIMARY KEY (kind, symbol, period)) WITHOUT ROWID"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS lease (kind TEXT, symbol TEXT, period TEXT, owner TEXT, until REAL, "
+            "PRIMARY KEY (kind, symbol, period)) WITHOUT ROWID"
+        )
+
+    def _conn(self) -> sqlite3.Connection:
+        # One connection per thread; autocommit, explicit BEGIN where statements must be atomic
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            self._local.conn = conn
+        return conn
+
+    def get_fresh(self, kind: str, symbols: List[str], period: str = "") -> Dict[str, Tuple[Any, float]]:
+        """{symbol: (value, seconds it stays fresh)} for the symbols with an unexpired entry."""
+        now = time.time()
+        found = {}
+        for chunk in _chunks(symbols):
+            rows = self._conn().execute(
+                f"SELECT symbol, value, fresh_until FROM cache WHERE kind = ? AND period = ? AND fresh_until > ? "
+                f"AND symbol IN ({','.join('?' * len(chunk))})",
+                (kind, period, now, *chunk),
+            ).fetchall()
+            for symbol, value, fresh_until in rows:
+                found[symbol] = (pickle.loads(value), fresh_until - now)
+        return found
+
+    def set_many(self, kind: str, values: Dict[str, Any], period: str = "", ttl: float = 30.0):
+        if not values:
+            return
+        fresh_until = time.time() + ttl
+        conn = self._conn()
+        conn.executemany(
+            "INSERT INTO cache (kind, symbol, period, value, fresh_until) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT (kind, symbol, period) DO UPDATE SET value = excluded.value, fresh_until = excluded.fresh_until",
+            [(kind, symbol, period, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), fresh_until) for symbol, value in values.items()],
+        )
+        self._writes += 1
+        if self._writes % self.purge_every == 0:
+            self.purge()
+
+    def claim(self, kind: str, symbols: List[str], period: str = "") -> Tuple[str, List[str]]:
+        """
+        Takes the fetch lease for every symbol nobody else is fetching right now.
+        Returns (owner token, claimed symbols); release with `release`.
+        """
+        owner = uuid.uuid4().hex
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "INSERT INTO lease (kind, symbol, period, owner, until) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (kind, symbol, period) DO UPDATE SET owner = excluded.owner, until = excluded.until "
+                "WHERE lease.until <= ?",
+                [(kind, symbol, period, owner, now + self.lease_seconds, now) for symbol in symbols],
+            )
+            claimed = []
+            for chunk in _chunks(symbols):
+                claimed += [row[0] for row in conn.execute(
+                    f"SELECT symbol FROM lease WHERE kind = ? AND period = ? AND owner = ? "
+                    f"AND symbol IN ({','.join('?' * len(chunk))})",
+                    (kind, period, owner, *chunk),
+                )]
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return owner, claimed
+
+    def release(self, kind: str, symbols: List[str], owner: str, period: str = ""):
+        self._conn().executemany(
+            "DELETE FROM lease WHERE kind = ? AND symbol = ? AND period = ? AND owner = ?",
+            [(kind, symbol, period, owner) for symbol in symbols],
+        )
+
+    def leased(self, kind: str, symbols: List[str], period: str = "") -> Set[str]:
+        """Symbols another worker is currently fetching."""
+        now = time.time()
+        leased = set()
+        for chunk in _chunks(symbols):
+            leased.update(row[0] for row in self._conn().execute(
+                f"SELECT symbol FROM lease WHERE kind = ? AND period = ? AND until > ? "
+                f"AND symbol IN ({','.join('?' * len(chunk))})",
+                (kind, period, now, *chunk),
+            ))
+        return leased
+
+    def purge(self):
+        """Drops expired entries and leases."""
+        now = time.time()
+        conn = self._conn()
+        conn.execute("DELETE FROM cache WHERE fresh_until <= ?", (now,))
+        conn.execute("DELETE FROM lease WHERE until <= ?", (now,))
+
+def _create_private(path: str):
+    """
+    Creates the cache file with mode 0600. SQLite's -wal/-shm files go next to
+    it, so the directory is checked too: it has to belong to this user and
+    must not be group/world writable (a shared /dev/shm needs a subdirectory).
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    os.close(os.open(path, os.O_RDWR | os.O_CREAT, 0o600))
+    if not hasattr(os, "getuid"):  # no POSIX ownership to check
+        return
+    for checked, writable_by_others in ((directory, 0o022), (path, 0o077)):
+        info = os.stat(checked)
+        if info.st_uid != os.getuid() or info.st_mode & writable_by_others:
+            raise PermissionError(f"{checked} must belong to this user and not be writable by others")
+
+def build_shared_cache() -> Optional[SharedCache]:
+    """
+    Shared cache on SHARED_CACHE_FILE (default: next to the database, like the
+    leader lock, so all workers of a deployment find it). "off" disables it;
+    so does an unusable file (logged), each process then caches alone.
+    Built by `Services` in the app lifespan, never at import: scripts, tests
+    and spawned backtest workers import the backend without opening the file.
+    """
+    path = os.getenv("SHARED_CACHE_FILE", f"{sqlite_file_name}.cache")
+    if path.strip().lower() in _DISABLED:
+        return None
+    try:
+        return SharedCache(path, lease_seconds=float(os.getenv("SHARED_CACHE_LEASE_SECONDS", "30")))
+    except (OSError, sqlite3.Error) as e:
+        logger.error("shared cache disabled", extra={"path": path, "error": str(e)})
+        return None
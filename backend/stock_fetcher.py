@@ -1,18 +1,70 @@
+import logging
 import yfinance as yf
-from typing import Dict, Any
+import pandas as pd
+from typing import Dict, Any, List, Optional
+from .metrics import upstream_call
+from .quote_engine import QuoteEngine, default_engine, bulk_engine
+
+logger = logging.getLogger(__name__)
 
 class StockFetcher:
     """Handles live price and historical change data for stocks using Yahoo Finance."""
-    
+
+    def __init__(self, engine: Optional[QuoteEngine] = None, bulk: Optional[QuoteEngine] = None):
+        self.engine = engine or default_engine
+        self.bulk = bulk or bulk_engine
+
     async def fetch_stocks(self, symbols: list) -> Dict[str, Any]:
+        """Fetches quotes for all symbols with one `yf.download` per batch."""
+        return await self.engine.fetch_batched(list(symbols), self._fetch_batch)
+
+    async def fetch_daily_bars(self, symbols: list, period: str = "2mo") -> Dict[str, pd.DataFrame]:
+        """Daily OHLCV frames per symbol (enough history for ATR/volume averages), batched like the quotes."""
+        return await self.bulk.fetch_batched(
+            list(symbols), lambda batch: self._fetch_bars_batch(batch, period)
+        )
+
+    def _fetch_bars_batch(self, symbols: List[str], period: str) -> Dict[str, pd.DataFrame]:
         data = {}
+        try:
+            with upstream_call("yfinance", "download", symbols) as call:
+                frame = yf.download(symbols, period=period, group_by="ticker", threads=True, progress=False)
+                if frame.empty:
+                    call.outcome = "empty"
+        except Exception as e:
+            logger.warning("daily bars batch failed", extra={"symbols": len(symbols), "error": str(e)})
+            return data
+
+        for symbol in symbols:
+            try:
+                bars = frame[symbol] if isinstance(frame.columns, pd.MultiIndex) else frame
+                bars = bars[["Open", "High", "Low", "Close", "Volume"]].dropna(how="all")
+                if len(bars) >= 2:
+                    data[symbol] = bars
+            except Exception as e:
+                logger.warning("daily bars parse failed", extra={"symbol": symbol, "error": str(e)})
+        return data
+
+    def _fetch_batch(self, symbols: List[str]) -> Dict[str, Any]:
+        data = {}
+        try:
+            with upstream_call("yfinance", "download", symbols) as call:
+                frame = yf.download(symbols, period="2d", group_by="ticker", threads=True, progress=False)
+                if frame.empty:
+                    call.outcome = "empty"
+        except Exception as e:
+            logger.warning("stock quote batch failed", extra={"symbols": len(symbols), "error": str(e)})
+            return data
+
         for symbol in symbols:
             try:
-                ticker = yf.Ticker(symbol)
-                hist = ticker.history(period="2d")
-                if len(hist) >= 2:
-                    prev_close = hist['Close'].iloc[-2]
-                    curr_price = hist['Close'].iloc[-1]
+                if isinstance(frame.columns, pd.MultiIndex):
+                    closes = frame[symbol]["Close"].dropna()
+                else:
+                    closes = frame["Close"].dropna()
+                if len(closes) >= 2:
+                    prev_close = float(closes.iloc[-2])
+                    curr_price = float(closes.iloc[-1])
                     change_pct = ((curr_price - prev_close) / prev_close) * 100
                     data[symbol] = {
                         "price": curr_price,
@@ -20,5 +72,5 @@ class StockFetcher:
                         "type": "stock"
                     }
             except Exception as e:
-                print(f"Error fetching stock {symbol}: {e}")
+                logger.warning("stock quote parse failed", extra={"symbol": symbol, "error": str(e)})
         return data
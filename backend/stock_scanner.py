@@ -1,16 +1,29 @@
-import yfinance as yf
-import asyncio
 from typing import Dict, Any, List
+from sqlmodel import Session, select
+from .database import engine
+from .executors import run_in
+from .models import Fundamentals
 
 class StockScanner:
-    """Handles fundamental filtering and scanning based on yfinance data."""
-    
+    """
+    Handles fundamental filtering and scanning based on yfinance data.
+    Filters run as indexed SQL over the Fundamentals snapshot table, which
+    FundamentalsRefresher keeps up to date in the background.
+    """
+
     async def filter_stocks(self, criteria: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Filters stocks based on dynamic fundamental criteria."""
-        return await asyncio.to_thread(self._filter_stocks_sync, criteria)
+        return await run_in("db", self._filter_stocks_sync, criteria)
+
+    async def has_snapshot(self) -> bool:
+        """False until the refresher stored its first fundamentals (right after the first start)."""
+        return await run_in("db", self._has_snapshot_sync)
+
+    def _has_snapshot_sync(self) -> bool:
+        with Session(engine) as session:
+            return session.exec(select(Fundamentals.symbol).limit(1)).first() is not None
 
     def _filter_stocks_sync(self, criteria: Dict[str, Any]) -> List[Dict[str, Any]]:
-        results = []
         sector = criteria.get("sector")
         pe_max = criteria.get("trailing_pe_max")
         mc_min = criteria.get("market_cap_min")
@@ -18,36 +31,31 @@ class StockScanner:
         dy_min = criteria.get("dividend_yield_min")
         pb_max = criteria.get("price_to_book_max")
         pm_min = criteria.get("profit_margins_min")
-        
-        universe = [
-            "AAPL", "MSFT", "GOOGL", "AMZN", "META", "TSLA", "NVDA", "INTC", "AMD",
-            "JPM", "V", "MA", "UNH", "HD", "PG", "DIS", "PYPL", "NFLX", "ADBE"
+        limit = criteria.get("limit", 100)
+
+        statement = select(Fundamentals)
+        # NULL columns never match a bound, same as the former "missing value fails" checks
+        if sector: statement = statement.where(Fundamentals.sector == sector)
+        if pe_max: statement = statement.where(Fundamentals.trailing_pe <= pe_max)
+        if mc_min: statement = statement.where(Fundamentals.market_cap >= mc_min)
+        if mc_max: statement = statement.where(Fundamentals.market_cap <= mc_max)
+        if dy_min: statement = statement.where(Fundamentals.dividend_yield >= dy_min)
+        if pb_max: statement = statement.where(Fundamentals.price_to_book <= pb_max)
+        if pm_min: statement = statement.where(Fundamentals.profit_margins >= pm_min)
+        statement = statement.order_by(Fundamentals.market_cap.desc()).limit(limit)
+
+        with Session(engine) as session:
+            rows = session.exec(statement).all()
+
+        return [
+            {
+                "symbol": row.symbol,
+                "name": row.name,
+                "sector": row.sector,
+                "price": row.price,
+                "market_cap": row.market_cap,
+                "pe": row.trailing_pe,
+                "div_yield": row.dividend_yield * 100 if row.dividend_yield else 0
+            }
+            for row in rows
         ]
-        
-        for symbol in universe:
-            try:
-                t = yf.Ticker(symbol)
-                info = t.info
-                match = True
-                
-                if sector and info.get("sector") != sector: match = False
-                if pe_max and (info.get("trailingPE") or 9999) > pe_max: match = False
-                if mc_min and (info.get("marketCap") or 0) < mc_min: match = False
-                if mc_max and (info.get("marketCap") or float('inf')) > mc_max: match = False
-                if dy_min and (info.get("dividendYield") or 0) < dy_min: match = False
-                if pb_max and (info.get("priceToBook") or 9999) > pb_max: match = False
-                if pm_min and (info.get("profitMargins") or 0) < pm_min: match = False
-                
-                if match:
-                    results.append({
-                        "symbol": symbol,
-                        "name": info.get("longName"),
-                        "sector": info.get("sector"),
-                        "price": info.get("currentPrice"),
-                        "market_cap": info.get("marketCap"),
-                        "pe": info.get("trailingPE"),
-                        "div_yield": info.get("dividendYield", 0) * 100 if info.get("dividendYield") else 0
-                    })
-            except Exception as e:
-                print(f"Filter error {symbol}: {e}")
-        return results
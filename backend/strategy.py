@@ -1,39 +1,64 @@
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlmodel import Session, select
-from .models import Ticker, Trade
+from .models import Ticker, Trade, ScanThresholds
+from .gap_matrix import overreaction_mask, metrics_rows
+from .portfolio import Portfolio
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Tuple
+import numpy as np
+
+FEE_RATE = 0.002 # 0.20% round trip
 
 class Strategy:
     def __init__(self, session: Session):
         self.session = session
-        self.threshold = 5.0 # +/- 5%
-        self.fee_rate = 0.002 # 0.20% round trip
+        self.thresholds = ScanThresholds() # +/- 5% gap or change
+        self.fee_rate = FEE_RATE
 
-    def find_overreactions(self, data: Dict[str, Any]):
-        candidates = []
-        for symbol, info in data.items():
-            if abs(info['change']) >= self.threshold:
-                ticker = self.update_or_create_ticker(symbol, info)
-                candidates.append(ticker)
+    def find_overreactions(
+        self, metrics: Dict[str, np.ndarray], thresholds: Optional[ScanThresholds] = None
+    ) -> List[Tuple[Ticker, Dict[str, Any]]]:
+        """
+        Applies the thresholds to the gap-matrix metrics of the whole universe
+        in one vectorized mask (see gap_matrix.compute_gap_metrics), stores the
+        movers as Tickers and returns (ticker, metrics row) pairs.
+        """
+        mask = overreaction_mask(metrics, thresholds or self.thresholds) & np.isfinite(metrics["price"])
+        rows = metrics_rows(metrics, mask)
+        tickers = self.upsert_tickers(
+            {row["symbol"]: {"price": row["price"], "change": row["change_pct"] or 0.0} for row in rows}
+        )
         self.session.commit()
-        return candidates
+        return list(zip(tickers, rows))
 
-    def update_or_create_ticker(self, symbol: str, info: Dict[str, Any]):
-        statement = select(Ticker).where(Ticker.symbol == symbol)
-        ticker = self.session.exec(statement).first()
-        
-        if ticker:
-            ticker.last_price = info['price']
-            ticker.change_pct = info['change']
-            ticker.updated_at = datetime.utcnow()
-        else:
-            ticker = Ticker(
-                symbol=symbol,
-                last_price=info['price'],
-                change_pct=info['change']
-            )
-            self.session.add(ticker)
-        return ticker
+    def upsert_tickers(self, data: Dict[str, Any]) -> List[Ticker]:
+        """
+        Writes price/change for all symbols with one INSERT ... ON CONFLICT(symbol)
+        DO UPDATE ... RETURNING (executemany, batched by SQLAlchemy), instead of a
+        SELECT plus insert/update per symbol. Returns the Ticker rows in input order.
+        """
+        if not data:
+            return []
+        now = datetime.utcnow()
+        rows = [
+            {"symbol": symbol, "last_price": info['price'], "change_pct": info['change'], "updated_at": now}
+            for symbol, info in data.items()
+        ]
+        statement = sqlite_insert(Ticker)
+        statement = statement.on_conflict_do_update(
+            index_elements=[Ticker.symbol],
+            set_={
+                "last_price": statement.excluded.last_price,
+                "change_pct": statement.excluded.change_pct,
+                "updated_at": statement.excluded.updated_at,
+            },
+        ).returning(Ticker)
+        # populate_existing: tickers already in this session get the new values too
+        tickers = self.session.scalars(
+            statement.execution_options(populate_existing=True), rows
+        ).all()
+        by_symbol = {ticker.symbol: ticker for ticker in tickers}
+        return [by_symbol[symbol] for symbol in data]
 
     def execute_paper_trade(self, symbol: str, quantity: float, price: float, side: str):
         # Fees are 0.20% round trip, but usually split 0.1% entry 0.1% exit
@@ -49,5 +74,7 @@ class Strategy:
             status="open"
         )
         self.session.add(trade)
+        Portfolio(self.session).record_open(trade)
         self.session.commit()
+        self.session.refresh(trade)
         return trade
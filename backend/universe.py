@@ -0,0 +1,102 @@
+import csv
+import logging
+import os
+import re
+from typing import List, Optional
+
+# Fallback universe when no SCANNER_UNIVERSE_FILE is configured
+DEFAULT_UNIVERSE = [
+    "AAPL", "MSFT", "GOOGL", "AMZN", "META", "TSLA", "NVDA", "INTC", "AMD",
+    "JPM", "V", "MA", "UNH", "HD", "PG", "DIS", "PYPL", "NFLX", "ADBE"
+]
+
+SYMBOL_COLUMNS = ("symbol", "ticker")
+# Yahoo/Binance notation: letters, digits and . - = (BRK-B, SAP.DE, EURUSD=X), optional ^ for indices, at least one letter
+TICKER_PATTERN = re.compile(r"\^?(?=[A-Z0-9.=-]*[A-Z])[A-Z0-9][A-Z0-9.=-]{0,19}")
+# US class shares (BRK.B); Yahoo writes them with a dash. Longer suffixes are exchanges (SAP.DE)
+_CLASS_SHARE = re.compile(r"[A-Z]+\.[A-Z]")
+# Single-letter Yahoo exchange suffixes that must keep their dot: London, Frankfurt, TSX Venture, Tokyo
+_EXCHANGE_SUFFIXES = ("L", "F", "V", "T")
+# Separators of free-form symbol lists ("AAPL, MSFT; TSLA NVDA")
+_LIST_SEPARATORS = re.compile(r"[,;\s]+")
+
+# Quote assets that mark a symbol as a Binance pair (BTCUSDT, ETHBTC, ...)
+CRYPTO_QUOTES = ("USDT", "USDC", "FDUSD", "BUSD", "BTC", "ETH", "BNB", "EUR", "TRY")
+
+logger = logging.getLogger(__name__)
+
+def is_crypto(symbol: str) -> bool:
+    return symbol.isalnum() and any(symbol.endswith(q) and len(symbol) > len(q) + 1 for q in CRYPTO_QUOTES)
+
+def is_ticker(symbol: str) -> bool:
+    """True if `symbol` (upper case) is shaped like a ticker; says nothing about whether it is listed."""
+    return TICKER_PATTERN.fullmatch(symbol) is not None
+
+def yahoo_symbol(symbol: str) -> str:
+    """Upper-cased symbol with class shares in Yahoo notation (BRK.B -> BRK-B, SAP.DE and VOD.L unchanged)."""
+    symbol = symbol.strip().strip('"').upper()
+    if _CLASS_SHARE.fullmatch(symbol) and symbol[-1] not in _EXCHANGE_SUFFIXES:
+        return symbol.replace(".", "-")
+    return symbol
+
+def parse_symbols(text: str, rejected: Optional[List[str]] = None) -> List[str]:
+    """
+    Symbols from either a CSV with a 'Symbol'/'Ticker' column (comma,
+    semicolon or tab separated), as in index constituent and broker exports,
+    or a free-form list separated by commas, semicolons, spaces or newlines
+    ('#' starts a comment). Class shares are mapped to Yahoo notation
+    (BRK.B -> BRK-B), exchange suffixes are kept (SAP.DE, VOD.L); duplicates
+    are dropped. Entries that are not shaped like a ticker are skipped and
+    appended to `rejected` if given. A table without a symbol column raises
+    ValueError rather than importing its header and cells as symbols.
+    """
+    lines = text.splitlines()
+    header = lines[0] if lines else ""
+    delimiter = next((d for d in (",", ";", "\t") if d in header), None)
+    columns = [c.strip().strip('"').lower() for c in header.split(delimiter)] if delimiter else []
+    column = next((c for c in SYMBOL_COLUMNS if c in columns), None)
+    if column:
+        reader = csv.reader(lines[1:], delimiter=delimiter)
+        index = columns.index(column)
+        raw = [row[index] for row in reader if len(row) > index]
+    else:
+        if _is_table(lines, delimiter, len(columns)):
+            raise ValueError(f"No 'Symbol' or 'Ticker' column in the header ({header.strip()})")
+        raw = [token for line in lines for token in _LIST_SEPARATORS.split(line.split("#", 1)[0])]
+        raw = [token.strip('"') for token in raw if token]
+        # One-column CSV exports still start with a "Symbol"/"Ticker" header
+        if raw and raw[0].lower() in SYMBOL_COLUMNS:
+            raw = raw[1:]
+
+    symbols = list(dict.fromkeys(yahoo_symbol(s) for s in raw))
+    if rejected is not None:
+        rejected.extend(s for s in symbols if s and not is_ticker(s))
+    return [s for s in symbols if s and is_ticker(s)]
+
+def _is_table(lines: List[str], delimiter: Optional[str], width: int) -> bool:
+    """
+    True for a CSV export: every row has the header's number of fields and the
+    rows hold values no ticker looks like (names with spaces, quantities).
+    A symbol list split over lines ("AAPL,MSFT" / "TSLA,NVDA") is not a table.
+    """
+    if delimiter is None or width < 2:
+        return False
+    rows = [row for row in csv.reader(lines[1:], delimiter=delimiter) if any(field.strip() for field in row)]
+    if not rows or any(len(row) != width for row in rows):
+        return False
+    return any(not is_ticker(yahoo_symbol(field)) for row in rows for field in row if field.strip())
+
+def load_universe(path: Optional[str] = None) -> List[str]:
+    """
+    Loads a stock universe from a file in one of the formats `parse_symbols`
+    accepts, e.g. the usual S&P 500 / Russell 1000 constituent exports.
+    """
+    path = path or os.getenv("SCANNER_UNIVERSE_FILE")
+    if not path:
+        return list(DEFAULT_UNIVERSE)
+    try:
+        with open(path, newline="") as f:
+            return parse_symbols(f.read())
+    except (OSError, ValueError) as e:
+        logger.error("universe file unreadable, using the default universe", extra={"path": path, "error": str(e)})
+        return list(DEFAULT_UNIVERSE)
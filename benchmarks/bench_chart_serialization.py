@@ -0,0 +1,65 @@
+"""
+Per-bar cost of the /chart-data payload: legacy iterrows loop vs. vectorized serializers.
+
+Run from the repository root:
+    python -m benchmarks.bench_chart_serialization
+"""
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+from backend.bar_store import frame_to_columns
+from backend.chart_serializer import serialize_rows, serialize_columnar, serialize_binary
+
+SIZES = [250, 2500, 25000]
+REPEAT = 5
+
+def make_history(n: int) -> pd.DataFrame:
+    rng = np.random.default_rng(42)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    index = pd.date_range("1990-01-01", periods=n, freq="B", tz="America/New_York")
+    return pd.DataFrame({
+        "Open": close * 0.999, "High": close * 1.01, "Low": close * 0.99,
+        "Close": close, "Volume": rng.integers(1e5, 1e7, n).astype(float),
+    }, index=index)
+
+def legacy(hist: pd.DataFrame) -> str:
+    data = []
+    for idx, row in hist.iterrows():
+        data.append({
+            "time": idx.strftime("%Y-%m-%d"),
+            "open": round(float(row["Open"]), 2),
+            "high": round(float(row["High"]), 2),
+            "low": round(float(row["Low"]), 2),
+            "close": round(float(row["Close"]), 2),
+        })
+    return json.dumps(data)
+
+def best_of(func, arg) -> float:
+    timings = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        func(arg)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def main():
+    print(f"{'bars':>7} {'variant':<10} {'total ms':>10} {'us/bar':>8} {'bytes':>10}")
+    for n in SIZES:
+        hist = make_history(n)
+        bars = frame_to_columns(hist)
+        variants = {
+            "iterrows": (legacy, hist),
+            "rows": (lambda b: json.dumps(serialize_rows(b)), bars),
+            "columnar": (lambda b: json.dumps(serialize_columnar(b)), bars),
+            "binary": (serialize_binary, bars),
+        }
+        for name, (func, arg) in variants.items():
+            seconds = best_of(func, arg)
+            size = len(func(arg))
+            print(f"{n:>7} {name:<10} {seconds * 1e3:>10.2f} {seconds / n * 1e6:>8.2f} {size:>10}")
+
+if __name__ == "__main__":
+    main()
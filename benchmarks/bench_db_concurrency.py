@@ -0,0 +1,111 @@
+"""
+Mixed read/write throughput on SQLite: default engine vs. the production
+engine from backend.database (WAL, busy_timeout, pragmas, pooled connections).
+
+Readers load a user's watchlists with their tickers (the watchlist panel),
+writers upsert Ticker rows and commit (what /scan does). Each configuration
+runs against a fresh temporary database file.
+
+Run from the repository root:
+    python -m benchmarks.bench_db_concurrency [--seconds 3] [--readers 8] [--writers 2]
+"""
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy.exc import OperationalError
+from sqlmodel import Session, SQLModel, select
+
+from backend.database import build_engine, ensure_indexes
+from backend.models import User, Watchlist, WatchlistTickerLink, Ticker
+
+SYMBOLS = [f"SYM{i}" for i in range(500)]
+
+def seed(engine):
+    SQLModel.metadata.create_all(engine)
+    ensure_indexes(engine)
+    with Session(engine) as session:
+        tickers = [Ticker(symbol=s, last_price=100.0, change_pct=0.0) for s in SYMBOLS]
+        session.add_all(tickers)
+        for u in range(20):
+            user = User(username=f"user{u}", hashed_password="x")
+            session.add(user)
+            session.flush()
+            for w in range(3):
+                watchlist = Watchlist(name=f"list{w}", user_id=user.id)
+                watchlist.tickers = random.Random(u * 10 + w).sample(tickers, 25)
+                session.add(watchlist)
+        session.commit()
+
+def reader(engine, stop, counts):
+    rng = random.Random()
+    while not stop.is_set():
+        try:
+            with Session(engine) as session:
+                statement = (
+                    select(Watchlist, Ticker)
+                    .join(User, User.id == Watchlist.user_id)
+                    .join(WatchlistTickerLink, WatchlistTickerLink.watchlist_id == Watchlist.id)
+                    .join(Ticker, Ticker.id == WatchlistTickerLink.ticker_id)
+                    .where(User.username == f"user{rng.randrange(20)}")
+                )
+                session.exec(statement).all()
+            counts["reads"] += 1
+        except OperationalError:
+            counts["errors"] += 1
+
+def writer(engine, stop, counts):
+    rng = random.Random()
+    while not stop.is_set():
+        try:
+            with Session(engine) as session:
+                for symbol in rng.sample(SYMBOLS, 20):
+                    ticker = session.exec(select(Ticker).where(Ticker.symbol == symbol)).first()
+                    ticker.last_price = rng.uniform(50, 150)
+                    ticker.updated_at = datetime.utcnow()
+                    session.add(ticker)
+                session.commit()
+            counts["writes"] += 1
+        except OperationalError:
+            counts["errors"] += 1
+
+def run(production: bool, seconds: float, readers: int, writers: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = build_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}", production=production)
+        seed(engine)
+        # One counter dict per thread, summed at the end
+        per_thread = [{"reads": 0, "writes": 0, "errors": 0} for _ in range(readers + writers)]
+        stop = threading.Event()
+        threads = [threading.Thread(target=reader, args=(engine, stop, per_thread[i])) for i in range(readers)]
+        threads += [
+            threading.Thread(target=writer, args=(engine, stop, per_thread[readers + i])) for i in range(writers)
+        ]
+        for thread in threads:
+            thread.start()
+        time.sleep(seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        engine.dispose()
+    counts = {k: sum(c[k] for c in per_thread) for k in per_thread[0]}
+    return {k: v / seconds if k != "errors" else v for k, v in counts.items()}
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=2)
+    args = parser.parse_args()
+
+    print(f"{args.readers} readers, {args.writers} writers, {args.seconds:.0f}s each")
+    print(f"{'engine':<12}{'reads/s':>10}{'writes/s':>10}{'lock errors':>13}")
+    for name, production in (("default", False), ("production", True)):
+        result = run(production, args.seconds, args.readers, args.writers)
+        print(f"{name:<12}{result['reads']:>10.0f}{result['writes']:>10.0f}{result['errors']:>13}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,305 @@
+"""
+End-to-end endpoint benchmark on replayed upstreams: throughput and
+p50/p90/p99 latency of the main routes at increasing concurrency and
+universe sizes, written as JSON so versions can be compared.
+
+Every Yahoo/Binance/Gemini call is served from a fixture set (see
+benchmarks/fixtures.py) after an injected latency, so runs are repeatable
+and offline. Without a recorded set in benchmarks/fixtures a seeded
+synthetic one is generated. Each universe size runs the real app in-process
+(lifespan included) in a fresh subprocess with its own temporary database
+and bar store; background schedulers are paused, the scanner universe and
+the fundamentals table are filled during setup (without latency), and each
+cell starts with a few unmeasured warm-up requests.
+
+Run from the repository root:
+    python -m benchmarks.bench_endpoints [--universe 500,2000] [--concurrency 1,8,32]
+        [--requests 100] [--latency-ms 100] [--jitter-ms 0] [--scenarios scan,chart,...]
+        [--fixtures DIR] [--output FILE] [--compare BASELINE.json] [--tolerance 0.15]
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from multiprocessing import get_context
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from benchmarks.fixtures import BENCH_COMMANDS, BENCH_QUERIES, DEFAULT_DIR, load, synthesize
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+WATCHLIST_SIZE = 50
+
+# name -> (method, path); the request details per iteration are built in `_request`
+SCENARIOS = {
+    "scan": ("POST", "/scan"),
+    "scan_refresh": ("POST", "/scan?refresh=true"),
+    "market_overview": ("GET", "/market-overview"),
+    "chart": ("GET", "/chart-data"),
+    "search": ("GET", "/search-public"),
+    "command_filter": ("POST", "/command"),
+    "command_research": ("POST", "/command"),
+    "watchlists_full": ("GET", "/watchlists/full"),
+    "watchlist_write": ("POST", "/watchlists/{id}/tickers/batch"),
+}
+# Full scans and research runs are much slower; they get this share of --requests
+HEAVY = {"scan_refresh": 0.05, "command_research": 0.25}
+
+def _request(scenario: str, i: int, ctx: Dict[str, Any]) -> Tuple[str, str, Dict[str, Any]]:
+    """(method, url, httpx kwargs) of the i-th request of a scenario."""
+    method, path = SCENARIOS[scenario]
+    universe = ctx["universe"]
+    if scenario == "chart":
+        return method, path, {"params": {"symbol": universe[i % len(universe)], "period": "3mo"}}
+    if scenario == "search":
+        return method, path, {"params": {"query": BENCH_QUERIES[i % len(BENCH_QUERIES)]}}
+    if scenario == "command_filter":
+        return method, path, {"params": {"text": BENCH_COMMANDS["filter"]}}
+    if scenario == "command_research":
+        return method, path, {"params": {"text": BENCH_COMMANDS["research"]}}
+    if scenario == "watchlist_write":
+        # Alternately adds and removes two symbols, so the list size stays constant
+        symbols = universe[WATCHLIST_SIZE + (i // 2) % 100: WATCHLIST_SIZE + (i // 2) % 100 + 2]
+        url = f"/watchlists/{ctx['watchlist_id']}/tickers/" + ("batch" if i % 2 == 0 else "remove")
+        return method, url, {"json": {"symbols": symbols}}
+    return method, path, {}
+
+def _summary(latencies: List[float], wall: float, statuses: Dict[int, int]) -> Dict[str, Any]:
+    values = np.asarray(latencies) if latencies else np.asarray([np.nan])
+    ok = sum(n for status, n in statuses.items() if status < 400)
+    return {
+        "requests": len(latencies),
+        "errors": len(latencies) - ok,
+        "status_codes": {str(k): v for k, v in sorted(statuses.items())},
+        "throughput_rps": round(ok / wall, 2) if wall > 0 else None,
+        "mean_ms": round(float(np.mean(values)), 2),
+        "p50_ms": round(float(np.percentile(values, 50)), 2),
+        "p90_ms": round(float(np.percentile(values, 90)), 2),
+        "p99_ms": round(float(np.percentile(values, 99)), 2),
+        "max_ms": round(float(np.max(values)), 2),
+    }
+
+async def _run_cell(client, scenario: str, ctx: Dict[str, Any], requests: int, concurrency: int, offset: int):
+    """`requests` requests from `concurrency` workers; returns (latencies ms, wall seconds, status counts)."""
+    latencies: List[float] = []
+    statuses: Dict[int, int] = {}
+    counter = iter(range(requests))
+
+    async def worker():
+        for i in counter:
+            method, url, kwargs = _request(scenario, offset + i, ctx)
+            started = time.perf_counter()
+            try:
+                status = (await client.request(method, url, **kwargs)).status_code
+            except Exception:
+                status = 599
+            latencies.append((time.perf_counter() - started) * 1000)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, time.perf_counter() - started, statuses
+
+async def _setup(app, client, universe: List[str]) -> Dict[str, Any]:
+    """Scanner universe, fundamentals, guest quota and a watchlist; runs before latency is switched on."""
+    from sqlmodel import Session, select
+    from backend.database import engine
+    from backend.fundamentals_refresher import FundamentalsRefresher
+    from backend.models import User
+
+    app.state.services.scan_scheduler.stocks = universe
+    await FundamentalsRefresher(universe, max_in_flight=16).refresh()
+
+    (await client.get("/watchlists")).raise_for_status()  # creates the guest user
+    with Session(engine) as session:
+        guest = session.exec(select(User).where(User.username == "guest")).one()
+        guest.daily_api_limit = 10**9
+        session.add(guest)
+        session.commit()
+
+    watchlist = (await client.post("/watchlists", params={"name": "bench"})).json()
+    response = await client.post(f"/watchlists/{watchlist['id']}/tickers/batch", json={"symbols": universe[:WATCHLIST_SIZE]})
+    response.raise_for_status()
+    (await client.post("/scan", params={"refresh": "true"})).raise_for_status()
+    return {"universe": universe, "watchlist_id": watchlist["id"]}
+
+async def _run_universe(args: Dict[str, Any], size: int) -> List[Dict[str, Any]]:
+    import httpx
+    from benchmarks.fixtures import Replay
+
+    fixtures = load(args["fixtures"])
+    replay = Replay(fixtures, jitter_ms=args["jitter_ms"], seed=args["seed"])
+    replay.install()
+
+    import backend.scan_scheduler
+    from backend.auth import create_access_token
+    from backend.main import app
+    from backend.quote_cache import quote_cache
+
+    # Scans only run when a scenario asks for one
+    backend.scan_scheduler.in_scan_window = lambda *a, **k: False
+    recorded = sorted(fixtures["bars"])
+    universe = (recorded + [f"BENCH{i:05d}" for i in range(size)])[:size]
+
+    rows = []
+    async with app.router.lifespan_context(app):
+        replay.attach(app.state.services)
+        transport = httpx.ASGITransport(app=app)
+        headers = {"Authorization": f"Bearer {create_access_token({'sub': 'guest'})}"}
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", headers=headers, timeout=600) as client:
+            ctx = await _setup(app, client, universe)
+            replay.latency_ms = args["latency_ms"]
+            offset = 0
+            for scenario in args["scenarios"]:
+                requests = max(int(args["requests"] * HEAVY.get(scenario, 1.0)), 2)
+                for concurrency in args["concurrency"]:
+                    await _run_cell(client, scenario, ctx, min(args["warmup"], requests), min(concurrency, requests), offset)
+                    offset += args["warmup"]
+                    calls_before = sum(replay.calls.values())
+                    latencies, wall, statuses = await _run_cell(client, scenario, ctx, requests, concurrency, offset)
+                    offset += requests
+                    row = {
+                        "universe": size,
+                        "scenario": scenario,
+                        "concurrency": concurrency,
+                        **_summary(latencies, wall, statuses),
+                        "upstream_calls": sum(replay.calls.values()) - calls_before,
+                    }
+                    rows.append(row)
+                    print(_format_row(row), flush=True)
+            cache = quote_cache.stats()
+    print(f"  quote cache hit ratio {cache['hit_ratio']:.2f}", flush=True)
+    return rows
+
+def run_universe(args: Dict[str, Any], size: int) -> List[Dict[str, Any]]:
+    """Entry point of the per-universe subprocess (environment set before the app is imported)."""
+    tmp = tempfile.mkdtemp(prefix=f"bench-{size}-")
+    universe_file = os.path.join(tmp, "universe.txt")
+    open(universe_file, "w").close()
+    os.environ.update({
+        "DB_FILE": os.path.join(tmp, "bench.db"),
+        "BAR_STORE_DIR": os.path.join(tmp, "bar_store"),
+        "SCANNER_UNIVERSE_FILE": universe_file,  # empty: the lifespan's fundamentals refresh has nothing to do
+        "PRICE_FEED": "fake",
+        "FUNDAMENTALS_REFRESH_HOURS": "100000",
+        "LOG_LEVEL": os.getenv("LOG_LEVEL", "ERROR"),
+    })
+    return asyncio.run(_run_universe(args, size))
+
+def _format_row(row: Dict[str, Any]) -> str:
+    return (f"{row['universe']:>7} {row['scenario']:<18}{row['concurrency']:>4}{row['requests']:>6}{row['errors']:>5}"
+            f"{row['throughput_rps'] or 0:>10.1f}{row['p50_ms']:>10.1f}{row['p99_ms']:>10.1f}{row['upstream_calls']:>8}")
+
+def _git(*args: str) -> Optional[str]:
+    try:
+        return subprocess.run(["git", *args], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Prints p99/throughput changes per cell; returns the cells that regressed beyond `tolerance`."""
+    key: Callable[[Dict[str, Any]], tuple] = lambda r: (r["universe"], r["scenario"], r["concurrency"])
+    base = {key(r): r for r in baseline["results"]}
+    regressions = []
+    print(f"\nvs. {baseline['meta'].get('git_commit') or '?'} ({baseline['meta'].get('created_at')})")
+    print(f"{'universe':>8} {'scenario':<18}{'conc':>5}{'p99 ms':>18}{'rps':>18}")
+    for row in current["results"]:
+        old = base.get(key(row))
+        if old is None:
+            continue
+        p99 = (row["p99_ms"] - old["p99_ms"]) / old["p99_ms"] if old["p99_ms"] else 0.0
+        rps = ((row["throughput_rps"] or 0) - (old["throughput_rps"] or 0)) / old["throughput_rps"] if old["throughput_rps"] else 0.0
+        regressed = p99 > tolerance or rps < -tolerance
+        if regressed:
+            regressions.append(f"{row['scenario']} (universe {row['universe']}, concurrency {row['concurrency']})")
+        print(f"{row['universe']:>8} {row['scenario']:<18}{row['concurrency']:>5}"
+              f"{row['p99_ms']:>10.1f} {p99:>+6.0%}{row['throughput_rps'] or 0:>10.1f} {rps:>+6.0%}"
+              f"{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--universe", default="500,2000", help="comma-separated universe sizes")
+    parser.add_argument("--concurrency", default="1,8,32", help="comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=100, help="measured requests per cell")
+    parser.add_argument("--warmup", type=int, default=5, help="unmeasured requests before each cell")
+    parser.add_argument("--latency-ms", type=float, default=100.0, help="injected latency per upstream call")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="uniform extra latency per upstream call")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--fixtures", default=DEFAULT_DIR, help="fixture directory (synthetic set if missing)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="result file (default benchmarks/results/endpoints-<time>-<commit>.json)")
+    parser.add_argument("--compare", help="baseline result file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="relative p99/throughput change counted as regression")
+    args = parser.parse_args()
+
+    scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    fixture_dir = args.fixtures
+    if not os.path.exists(os.path.join(fixture_dir, "bars.json")):
+        from benchmarks.fixtures import save
+        fixture_dir = tempfile.mkdtemp(prefix="bench-fixtures-")
+        save(fixture_dir, synthesize(seed=args.seed))
+        print(f"No recorded fixtures in {args.fixtures}; using a synthetic set (seed {args.seed})")
+    manifest = load(fixture_dir).get("manifest", {})
+
+    settings = {
+        "fixtures": fixture_dir,
+        "latency_ms": args.latency_ms,
+        "jitter_ms": args.jitter_ms,
+        "seed": args.seed,
+        "requests": args.requests,
+        "warmup": args.warmup,
+        "concurrency": [int(c) for c in args.concurrency.split(",")],
+        "scenarios": scenarios,
+    }
+    print(f"{'universe':>7} {'scenario':<18}{'conc':>4}{'reqs':>6}{'err':>5}{'rps':>10}{'p50 ms':>10}{'p99 ms':>10}{'calls':>8}")
+    results = []
+    for size in [int(u) for u in args.universe.split(",")]:
+        # Fresh process per universe size: the app's engine, caches and bar store are module singletons
+        with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+            results.extend(pool.submit(run_universe, settings, size).result())
+
+    commit = _git("rev-parse", "--short", "HEAD")
+    report = {
+        "meta": {
+            "benchmark": "endpoints",
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "git_commit": commit,
+            "git_dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "fixtures": manifest,
+            "settings": {k: v for k, v in settings.items() if k != "fixtures"},
+        },
+        "results": results,
+    }
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"endpoints-{datetime.now().strftime('%Y%m%d-%H%M%S')}-{commit or 'nogit'}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} regression(s): " + "; ".join(regressions))
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
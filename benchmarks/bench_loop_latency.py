@@ -0,0 +1,129 @@
+"""
+Event-loop responsiveness under a background scan: p50/p99 latency of
+GET /market-overview while idle and while POST /scan?refresh=true runs over
+a large universe.
+
+Upstreams are simulated with blocking calls of a fixed latency (yf.download,
+Binance 24h ticker, Yahoo news), so the numbers measure how the app
+schedules blocking work, not the network. Runs the real app in-process
+(lifespan included) against a temporary database; no server needed.
+
+Run from the repository root:
+    python -m benchmarks.bench_loop_latency [--symbols 2000] [--upstream-ms 300] [--requests 200] [--uncached]
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+def install_fake_upstreams(upstream_ms: float):
+    """Replaces the network calls with blocking sleeps returning synthetic data."""
+    import yfinance as yf
+    from binance.client import Client
+    from backend.news_api import NewsAPI
+
+    delay = upstream_ms / 1000
+    index = pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=42)
+    rng = np.random.default_rng(0)
+
+    def download(symbols, period="2d", group_by="ticker", threads=True, progress=False, **kwargs):
+        time.sleep(delay)
+        symbols = [symbols] if isinstance(symbols, str) else list(symbols)
+        rows = len(index) if period != "2d" else 2
+        frames = {}
+        for symbol in symbols:
+            close = 100 * np.cumprod(1 + rng.normal(0, 0.02, rows))
+            open_ = close * (1 + rng.normal(0, 0.02, rows))
+            frames[symbol] = pd.DataFrame(
+                {"Open": open_, "High": np.maximum(open_, close), "Low": np.minimum(open_, close),
+                 "Close": close, "Volume": rng.integers(1e5, 1e6, rows).astype(float)},
+                index=index[-rows:],
+            )
+        return pd.concat(frames, axis=1)
+
+    def get_ticker(self, **params):
+        time.sleep(delay)
+        return [{"symbol": "BTCUSDT", "lastPrice": "60000", "priceChangePercent": "-6.1"}]
+
+    def market_news(self, symbol, limit=5):
+        time.sleep(delay)
+        return []
+
+    yf.download = download
+    Client.get_ticker = get_ticker
+    NewsAPI.get_market_news = market_news
+
+def percentile(values, q):
+    return float(np.percentile(values, q)) if values else float("nan")
+
+async def measure(client, count: int, stop: asyncio.Event = None, uncached: bool = False):
+    from backend.quote_cache import quote_cache
+    latencies = []
+    for _ in range(count):
+        if stop is not None and stop.is_set():
+            break
+        if uncached:
+            # Every request goes upstream (through the market_data pool) instead of the cache
+            quote_cache.invalidate("overview")
+        started = time.perf_counter()
+        response = await client.get("/market-overview")
+        response.raise_for_status()
+        latencies.append((time.perf_counter() - started) * 1000)
+        await asyncio.sleep(0.005)
+    return latencies
+
+async def run(args):
+    import httpx
+    from backend.auth import create_access_token
+    from backend.main import app
+
+    async with app.router.lifespan_context(app):
+        scanner = app.state.services.scan_scheduler
+        scanner.stocks = [f"SYM{i}" for i in range(args.symbols)]
+        transport = httpx.ASGITransport(app=app)
+        headers = {"Authorization": f"Bearer {create_access_token({'sub': 'guest'})}"}
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", headers=headers, timeout=600) as client:
+            await client.get("/market-overview")  # warm the overview cache
+            idle = await measure(client, args.requests, uncached=args.uncached)
+
+            stop = asyncio.Event()
+            async def scan():
+                started = time.perf_counter()
+                response = await client.post("/scan", params={"refresh": "true"})
+                stop.set()
+                return response, time.perf_counter() - started
+            scan_task = asyncio.create_task(scan())
+            await asyncio.sleep(0.05)
+            busy = await measure(client, args.requests * 100, stop, uncached=args.uncached)
+            response, scan_seconds = await scan_task
+
+    print(f"{args.symbols} symbols, {args.upstream_ms:.0f} ms simulated upstream latency"
+          f"{', overview uncached' if args.uncached else ''}")
+    print(f"scan: {response.status_code} in {scan_seconds:.1f}s")
+    print(f"{'/market-overview':<20}{'n':>6}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for name, values in (("idle", idle), ("during scan", busy)):
+        print(f"{name:<20}{len(values):>6}{percentile(values, 50):>10.1f}{percentile(values, 99):>10.1f}{max(values):>10.1f}")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--symbols", type=int, default=2000)
+    parser.add_argument("--upstream-ms", type=float, default=300)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--uncached", action="store_true", help="invalidate the overview cache before each request")
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    os.environ.setdefault("DB_FILE", os.path.join(tmp, "bench.db"))
+    os.environ.setdefault("PRICE_FEED", "fake")
+    os.environ.setdefault("SCANNER_UNIVERSE_FILE", os.path.join(tmp, "universe.txt"))
+    os.environ.setdefault("FUNDAMENTALS_REFRESH_HOURS", "1000")
+    open(os.environ["SCANNER_UNIVERSE_FILE"], "w").close()
+    install_fake_upstreams(args.upstream_ms)
+    asyncio.run(run(args))
+
+if __name__ == "__main__":
+    main()
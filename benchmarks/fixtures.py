@@ -0,0 +1,487 @@
+"""
+Recorded upstream responses for the benchmarks, and their replay.
+
+A fixture directory holds one JSON file per upstream endpoint (see FILES).
+`Replay.install()` patches yfinance (download, Ticker.history/info/news/
+actions), the Binance client (get_ticker, get_exchange_info), the Gemini
+client and the Yahoo search session so the app serves every upstream call
+from the fixtures, after an injected latency (blocking sleep, like the real
+clients). Symbols without a recording are mapped onto a recorded one by a
+stable hash, so any universe size can be replayed from a few recorded symbols.
+Bar dates (and news times) are shifted by whole weeks so the newest bar falls
+in the current week.
+
+Record from the live APIs (GEMINI_API_KEY for the command replies):
+    python -m benchmarks.fixtures record --symbols AAPL,MSFT,JNJ,... [--out benchmarks/fixtures]
+Or generate a seeded synthetic set (no network):
+    python -m benchmarks.fixtures synthesize [--symbols 60] [--out DIR]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import threading
+import time
+import zlib
+from collections import Counter
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+FILES = {
+    "manifest": "manifest.json",            # source (recorded/synthetic), created_at, symbols, period
+    "bars": "bars.json",                    # symbol -> {time (epoch s), open, high, low, close, volume}
+    "actions": "actions.json",              # symbol -> {time, dividends, splits}
+    "info": "info.json",                    # symbol -> yfinance info dict
+    "news": "news.json",                    # symbol -> yfinance news items
+    "binance_ticker": "binance_ticker.json",              # get_ticker() (all pairs)
+    "binance_exchange_info": "binance_exchange_info.json",  # get_exchange_info(), symbols trimmed to used fields
+    "yahoo_search": "yahoo_search.json",    # lowercased query -> search response
+    "gemini": "gemini.json",                # command text -> model reply text
+}
+
+# Commands the endpoint benchmark sends to /command (Gemini replies are recorded for these)
+BENCH_COMMANDS = {
+    "filter": "Filtere Tech Aktien mit KGV unter 25 und Dividende über 2%",
+    "research": "Ich möchte testen ob Dividenden-Aktien weniger Schwankungen haben",
+}
+# Replies used when no Gemini key is available (the examples of the capability manual)
+EXPECTED_ACTIONS = {
+    BENCH_COMMANDS["filter"]: {
+        "action": "filter", "criteria": {"sector": "Technology", "trailing_pe_max": 25, "dividend_yield_min": 0.02},
+    },
+    BENCH_COMMANDS["research"]: {
+        "action": "research", "title": "Dividende vs Volatilität",
+        "suggested_symbols": ["JNJ", "PG", "KO", "PEP", "XOM"], "hypothesis": "high_div_low_vol",
+    },
+}
+BENCH_QUERIES = ["apple", "micro", "tesla", "nvidia", "btc", "eth", "bank", "energy"]
+BAR_FIELDS = ("open", "high", "low", "close", "volume")
+_FRAME_COLUMNS = {"open": "Open", "high": "High", "low": "Low", "close": "Close", "volume": "Volume"}
+_PERIOD_OFFSETS = {"d": "days", "wk": "weeks", "mo": "months", "y": "years"}
+
+def load(directory: str) -> Dict[str, Any]:
+    fixtures = {}
+    for key, name in FILES.items():
+        path = os.path.join(directory, name)
+        if os.path.exists(path):
+            with open(path) as f:
+                fixtures[key] = json.load(f)
+    if "bars" not in fixtures:
+        raise FileNotFoundError(f"No fixtures in {directory} (bars.json missing)")
+    return fixtures
+
+def save(directory: str, fixtures: Dict[str, Any]):
+    os.makedirs(directory, exist_ok=True)
+    for key, name in FILES.items():
+        if key in fixtures:
+            with open(os.path.join(directory, name), "w") as f:
+                json.dump(fixtures[key], f, separators=(",", ":"), default=str)
+
+def _period_start(last: pd.Timestamp, period: str) -> Optional[pd.Timestamp]:
+    if period in (None, "max"):
+        return None
+    if period == "ytd":
+        return last.replace(month=1, day=1)
+    for suffix, unit in _PERIOD_OFFSETS.items():
+        if period.endswith(suffix) and period[: -len(suffix)].isdigit():
+            count = int(period[: -len(suffix)])
+            if unit == "days":
+                # yfinance counts trading days for "Nd"
+                return last - pd.tseries.offsets.BDay(max(count - 1, 0))
+            return last - pd.DateOffset(**{unit: count})
+    return None
+
+class Replay:
+    """
+    Serves the upstream calls of the app from a fixture set.
+    `latency_ms` (+ uniform `jitter_ms`) is slept before every call and can be
+    changed while running; `calls` counts replayed calls per endpoint.
+    """
+
+    def __init__(self, fixtures: Dict[str, Any], latency_ms: float = 0.0, jitter_ms: float = 0.0, seed: int = 0):
+        self.fixtures = fixtures
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.calls: Counter = Counter()
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._recorded = sorted(fixtures["bars"])
+        self._shift = self._week_shift()
+        self._frames: Dict[str, pd.DataFrame] = {}
+
+    # --- Helpers ---
+
+    def _week_shift(self) -> pd.Timedelta:
+        """Whole weeks that move the newest recorded bar into the current week (keeps weekdays)."""
+        last = max(max(bars["time"]) for bars in self.fixtures["bars"].values() if bars["time"])
+        days = (pd.Timestamp.now().normalize() - pd.Timestamp(last, unit="s")).days
+        return pd.Timedelta(weeks=max(days // 7, 0))
+
+    def source(self, symbol: str) -> str:
+        """Recorded symbol whose data `symbol` is served with (itself if recorded)."""
+        if symbol in self.fixtures["bars"]:
+            return symbol
+        return self._recorded[zlib.crc32(symbol.encode()) % len(self._recorded)]
+
+    def _delay(self, endpoint: str) -> float:
+        """Counts the call and returns its injected latency in seconds."""
+        with self._lock:
+            self.calls[endpoint] += 1
+            jitter = self._rng.uniform(0, self.jitter_ms) if self.jitter_ms else 0.0
+        return (self.latency_ms + jitter) / 1000
+
+    def _call(self, endpoint: str):
+        delay = self._delay(endpoint)
+        if delay:
+            time.sleep(delay)
+
+    def _frame(self, symbol: str) -> pd.DataFrame:
+        source = self.source(symbol)
+        frame = self._frames.get(source)
+        if frame is None:
+            bars = self.fixtures["bars"][source]
+            index = pd.to_datetime(np.asarray(bars["time"], dtype=np.int64), unit="s") + self._shift
+            frame = pd.DataFrame({_FRAME_COLUMNS[f]: np.asarray(bars[f], dtype=np.float64) for f in BAR_FIELDS}, index=index)
+            frame.index.name = "Date"
+            self._frames[source] = frame
+        return frame
+
+    def bars(self, symbol: str, period: Optional[str] = None, start=None) -> pd.DataFrame:
+        frame = self._frame(symbol)
+        if start is not None:
+            return frame[frame.index >= pd.Timestamp(start)]
+        first = _period_start(frame.index[-1], period) if len(frame) else None
+        return frame if first is None else frame[frame.index >= first]
+
+    # --- yfinance ---
+
+    def download(self, tickers, period: Optional[str] = "1mo", start=None, group_by: str = "column", **kwargs) -> pd.DataFrame:
+        self._call("yfinance.download")
+        if isinstance(tickers, str):
+            symbols = tickers.replace(",", " ").split()
+        else:
+            symbols = list(tickers)
+        frames = {symbol: self.bars(symbol, period, start) for symbol in symbols}
+        if len(symbols) == 1 and isinstance(tickers, str):
+            return frames[symbols[0]].copy()
+        frame = pd.concat(frames, axis=1)
+        return frame if group_by == "ticker" else frame.swaplevel(axis=1)
+
+    def ticker(self, symbol: str) -> "ReplayTicker":
+        return ReplayTicker(self, symbol)
+
+    def info(self, symbol: str) -> Dict[str, Any]:
+        self._call("yfinance.info")
+        info = dict(self.fixtures.get("info", {}).get(self.source(symbol), {}))
+        if info and symbol != self.source(symbol):
+            info["symbol"] = symbol
+            info["longName"] = f"{info.get('longName', symbol)} ({symbol})"
+        if info and "currentPrice" in info:
+            info["currentPrice"] = float(self._frame(symbol)["Close"].iloc[-1])
+        return info
+
+    def news(self, symbol: str) -> List[Dict[str, Any]]:
+        self._call("yfinance.news")
+        shift = self._shift.total_seconds()
+        items = []
+        for item in self.fixtures.get("news", {}).get(self.source(symbol), []):
+            item = dict(item)
+            if item.get("providerPublishTime"):
+                item["providerPublishTime"] = int(item["providerPublishTime"] + shift)
+            items.append(item)
+        return items
+
+    def actions(self, symbol: str) -> pd.DataFrame:
+        self._call("yfinance.actions")
+        actions = self.fixtures.get("actions", {}).get(self.source(symbol))
+        if not actions or not actions["time"]:
+            return pd.DataFrame(columns=["Dividends", "Stock Splits"])
+        index = pd.to_datetime(np.asarray(actions["time"], dtype=np.int64), unit="s") + self._shift
+        return pd.DataFrame({"Dividends": actions["dividends"], "Stock Splits": actions["splits"]}, index=index)
+
+    # --- Binance ---
+
+    def binance_ticker(self, symbol: Optional[str] = None):
+        self._call("binance.get_ticker")
+        tickers = self.fixtures.get("binance_ticker", [])
+        if symbol:
+            return next((t for t in tickers if t.get("symbol") == symbol), {})
+        return tickers
+
+    def binance_exchange_info(self) -> Dict[str, Any]:
+        self._call("binance.get_exchange_info")
+        return self.fixtures.get("binance_exchange_info", {"symbols": []})
+
+    # --- Yahoo search ---
+
+    def search(self, query: str) -> Dict[str, Any]:
+        self._call("yahoo.search")
+        recorded = self.fixtures.get("yahoo_search", {}).get(query.strip().lower())
+        if recorded is not None:
+            return recorded
+        # Unrecorded query: prefix matches on symbol or name among the recorded symbols
+        needle = query.strip().lower()
+        infos = self.fixtures.get("info", {})
+        quotes = [
+            {"symbol": s, "shortname": infos.get(s, {}).get("longName", s)}
+            for s in self._recorded
+            if s.lower().startswith(needle) or str(infos.get(s, {}).get("longName", "")).lower().startswith(needle)
+        ]
+        return {"quotes": quotes[:5]}
+
+    def session(self) -> "ReplaySession":
+        return ReplaySession(self)
+
+    # --- Gemini ---
+
+    async def generate_content(self, model: str, contents: str, config=None):
+        delay = self._delay("gemini.generate_content")
+        if delay:
+            await asyncio.sleep(delay)
+        text = contents.split('"', 1)[1].rsplit('"', 1)[0] if contents.count('"') >= 2 else contents
+        reply = self.fixtures.get("gemini", {}).get(text)
+        if reply is None:
+            reply = json.dumps(EXPECTED_ACTIONS.get(text, {"action": "unknown"}))
+        return SimpleNamespace(text=reply)
+
+    # --- Installation ---
+
+    def install(self):
+        """Patches the upstream clients process-wide. Call before the app handles requests."""
+        import yfinance as yf
+        from binance.client import Client
+        from backend.gemini_nlp import GeminiNLP
+
+        replay = self
+        yf.download = self.download
+        yf.Ticker = self.ticker
+        Client.get_ticker = lambda client, **params: replay.binance_ticker(params.get("symbol"))
+        Client.get_exchange_info = lambda client: replay.binance_exchange_info()
+        gemini = SimpleNamespace(aio=SimpleNamespace(models=SimpleNamespace(generate_content=self.generate_content)))
+        GeminiNLP._client = lambda nlp, api_key: gemini
+        os.environ.setdefault("GEMINI_API_KEY", "replay")
+
+    def attach(self, services):
+        """Points the app's shared MarketSearch at the replayed Yahoo search (after the lifespan built it)."""
+        services.market_search.session = self.session()
+
+class ReplayTicker:
+    def __init__(self, replay: Replay, symbol: str):
+        self._replay = replay
+        self.ticker = symbol
+
+    def history(self, period: Optional[str] = "1mo", interval: str = "1d", start=None, **kwargs) -> pd.DataFrame:
+        self._replay._call("yfinance.history")
+        frame = self._replay.bars(self.ticker, None if start is not None else period, start).copy()
+        frame["Dividends"] = 0.0
+        frame["Stock Splits"] = 0.0
+        return frame
+
+    @property
+    def info(self) -> Dict[str, Any]:
+        return self._replay.info(self.ticker)
+
+    @property
+    def news(self) -> List[Dict[str, Any]]:
+        return self._replay.news(self.ticker)
+
+    @property
+    def actions(self) -> pd.DataFrame:
+        return self._replay.actions(self.ticker)
+
+class _Response:
+    def __init__(self, payload: Dict[str, Any]):
+        self._payload = payload
+        self.status_code = 200
+
+    def raise_for_status(self):
+        pass
+
+    def json(self) -> Dict[str, Any]:
+        return self._payload
+
+class ReplaySession:
+    """Stands in for the requests session MarketSearch uses for Yahoo search."""
+
+    def __init__(self, replay: Replay):
+        self._replay = replay
+
+    def get(self, url: str, params: Optional[Dict[str, Any]] = None, **kwargs) -> _Response:
+        return _Response(self._replay.search((params or {}).get("q", "")))
+
+    def close(self):
+        pass
+
+# --- Recording ---
+
+def _columns(frame: pd.DataFrame) -> Dict[str, list]:
+    from backend.bar_store import frame_to_columns
+    cols = frame_to_columns(frame)
+    return {name: col.tolist() for name, col in cols.items()}
+
+def record(symbols: List[str], period: str = "2y") -> Dict[str, Any]:
+    """Fetches every fixture from the live APIs."""
+    import yfinance as yf
+    from binance.client import Client
+
+    fixtures: Dict[str, Any] = {"bars": {}, "actions": {}, "info": {}, "news": {}, "yahoo_search": {}, "gemini": {}}
+    for symbol in symbols:
+        ticker = yf.Ticker(symbol)
+        bars = ticker.history(period=period, interval="1d")
+        if bars.empty:
+            print(f"skipped {symbol}: no bars")
+            continue
+        fixtures["bars"][symbol] = _columns(bars)
+        actions = ticker.actions
+        if actions is not None and not actions.empty:
+            index = actions.index.tz_localize(None) if actions.index.tz is not None else actions.index
+            fixtures["actions"][symbol] = {
+                "time": index.values.astype("datetime64[s]").astype(np.int64).tolist(),
+                "dividends": actions.get("Dividends", pd.Series(0.0, index=actions.index)).tolist(),
+                "splits": actions.get("Stock Splits", pd.Series(0.0, index=actions.index)).tolist(),
+            }
+        fixtures["info"][symbol] = ticker.info or {}
+        fixtures["news"][symbol] = ticker.news or []
+        print(f"recorded {symbol}")
+
+    client = Client("", "", ping=False)
+    fixtures["binance_ticker"] = client.get_ticker()
+    info = client.get_exchange_info()
+    fixtures["binance_exchange_info"] = {"symbols": [
+        {key: s.get(key) for key in ("symbol", "baseAsset", "quoteAsset", "status")} for s in info["symbols"]
+    ]}
+    client.close_connection()
+
+    import requests
+    for query in BENCH_QUERIES:
+        res = requests.get(
+            "https://query2.finance.yahoo.com/v1/finance/search",
+            params={"q": query, "quotesCount": 5, "newsCount": 0},
+            headers={"User-Agent": "Mozilla/5.0"},
+            timeout=10,
+        )
+        res.raise_for_status()
+        fixtures["yahoo_search"][query] = {"quotes": res.json().get("quotes", [])}
+
+    if os.getenv("GEMINI_API_KEY"):
+        from backend.gemini_nlp import GeminiNLP
+
+        async def ask_all():
+            nlp = GeminiNLP()
+            try:
+                return {text: await nlp.process_command(text) for text in BENCH_COMMANDS.values()}
+            finally:
+                await nlp.aclose()
+        for text, action in asyncio.run(ask_all()).items():
+            if "error" not in action:
+                fixtures["gemini"][text] = json.dumps(action, ensure_ascii=False)
+    fixtures["manifest"] = {
+        "source": "recorded",
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "symbols": len(fixtures["bars"]),
+        "period": period,
+    }
+    return fixtures
+
+# --- Synthetic set ---
+
+SECTORS = ["Technology", "Healthcare", "Financial Services", "Energy", "Consumer Defensive", "Industrials"]
+NAMED = {
+    "AAPL": "Apple Inc.", "MSFT": "Microsoft Corporation", "NVDA": "NVIDIA Corporation", "TSLA": "Tesla, Inc.",
+    "AMZN": "Amazon.com, Inc.", "GOOGL": "Alphabet Inc.", "META": "Meta Platforms, Inc.", "JNJ": "Johnson & Johnson",
+    "PG": "Procter & Gamble", "KO": "Coca-Cola Company", "PEP": "PepsiCo, Inc.", "XOM": "Exxon Mobil Corporation",
+    "JPM": "JPMorgan Chase & Co.", "BAC": "Bank of America", "AMD": "Advanced Micro Devices", "INTC": "Intel Corporation",
+}
+CRYPTO_PAIRS = ["BTCUSDT", "ETHUSDT", "BNBUSDT", "SOLUSDT", "XRPUSDT", "ADAUSDT", "DOGEUSDT", "BTCEUR", "ETHBTC"]
+
+def synthesize(symbols: int = 60, days: int = 520, seed: int = 0) -> Dict[str, Any]:
+    """Seeded stand-in with the same layout as a recording (random-walk bars with occasional gaps)."""
+    rng = np.random.default_rng(seed)
+    names = list(NAMED) + [f"SYN{i:03d}" for i in range(max(symbols - len(NAMED), 0))]
+    names = names[:symbols]
+    index = pd.bdate_range(end=pd.Timestamp("2026-01-02"), periods=days)
+    times = index.values.astype("datetime64[s]").astype(np.int64).tolist()
+    newest = index[-1].timestamp()
+    fixtures: Dict[str, Any] = {"bars": {}, "actions": {}, "info": {}, "news": {}, "yahoo_search": {}, "gemini": {}}
+    for i, symbol in enumerate(names):
+        close = rng.uniform(10, 500) * np.cumprod(1 + rng.normal(0.0003, 0.018, days))
+        gaps = rng.normal(0, 0.01, days) + np.where(rng.random(days) < 0.02, rng.normal(0, 0.07, days), 0.0)
+        open_ = np.r_[close[0], close[:-1]] * (1 + gaps)
+        fixtures["bars"][symbol] = {
+            "time": times,
+            "open": open_.round(4).tolist(),
+            "high": (np.maximum(open_, close) * (1 + rng.uniform(0, 0.01, days))).round(4).tolist(),
+            "low": (np.minimum(open_, close) * (1 - rng.uniform(0, 0.01, days))).round(4).tolist(),
+            "close": close.round(4).tolist(),
+            "volume": rng.integers(100_000, 20_000_000, days).astype(float).tolist(),
+        }
+        dividend = float(rng.choice([0.0, rng.uniform(0.1, 1.0)]))
+        div_days = list(range(days - 1, 0, -63))[::-1] if dividend else []
+        fixtures["actions"][symbol] = {
+            "time": [times[d] for d in div_days], "dividends": [dividend] * len(div_days), "splits": [0.0] * len(div_days),
+        }
+        fixtures["info"][symbol] = {
+            "symbol": symbol,
+            "longName": NAMED.get(symbol, f"Synthetic {symbol}"),
+            "sector": SECTORS[i % len(SECTORS)],
+            "currentPrice": float(close[-1]),
+            "marketCap": float(rng.uniform(1e9, 2e12)),
+            "trailingPE": float(rng.uniform(5, 60)),
+            "dividendYield": round(dividend * 4 / float(close[-1]), 4) if dividend else None,
+            "priceToBook": float(rng.uniform(0.5, 20)),
+            "profitMargins": float(rng.uniform(-0.1, 0.4)),
+        }
+        fixtures["news"][symbol] = [
+            {"title": f"{symbol} news {n}", "publisher": "Synthetic Wire",
+             "providerPublishTime": int(newest - rng.uniform(0, 6) * 86400)}
+            for n in range(int(rng.integers(0, 4)))
+        ]
+    fixtures["binance_ticker"] = [
+        {"symbol": pair, "lastPrice": f"{rng.uniform(0.1, 60000):.4f}", "priceChangePercent": f"{rng.normal(0, 4):.3f}"}
+        for pair in CRYPTO_PAIRS
+    ]
+    fixtures["binance_exchange_info"] = {"symbols": [
+        {"symbol": pair, "baseAsset": pair[:-4] if pair.endswith(("USDT", "BUSD")) else pair[:-3],
+         "quoteAsset": pair[-4:] if pair.endswith(("USDT", "BUSD")) else pair[-3:], "status": "TRADING"}
+        for pair in CRYPTO_PAIRS
+    ]}
+    fixtures["gemini"] = {text: json.dumps(action, ensure_ascii=False) for text, action in EXPECTED_ACTIONS.items()}
+    fixtures["manifest"] = {
+        "source": "synthetic",
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "symbols": len(names),
+        "days": days,
+        "seed": seed,
+    }
+    return fixtures
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+    rec = sub.add_parser("record", help="record fixtures from the live APIs")
+    rec.add_argument("--symbols", required=True, help="comma-separated stock symbols")
+    rec.add_argument("--period", default="2y")
+    rec.add_argument("--out", default=DEFAULT_DIR)
+    syn = sub.add_parser("synthesize", help="write a seeded synthetic fixture set")
+    syn.add_argument("--symbols", type=int, default=60)
+    syn.add_argument("--days", type=int, default=520)
+    syn.add_argument("--seed", type=int, default=0)
+    syn.add_argument("--out", default=DEFAULT_DIR)
+    args = parser.parse_args()
+
+    if args.command == "record":
+        fixtures = record([s.strip().upper() for s in args.symbols.split(",") if s.strip()], args.period)
+    else:
+        fixtures = synthesize(args.symbols, args.days, args.seed)
+    save(args.out, fixtures)
+    print(f"{fixtures['manifest']['symbols']} symbols written to {args.out}")
+
+if __name__ == "__main__":
+    main()
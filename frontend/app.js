@@ -7,6 +7,7 @@ let candlestickSeries;
 let jwtToken = localStorage.getItem('jwt');
 let totpCode = localStorage.getItem('totp_code');
 let activeWatchlistId = null;
+let watchlistData = {}; // watchlist id -> tickers
 let searchTimeout = null;
 let selectedSearchIndex = -1;
 let isSignupMode = false;
@@ -18,6 +19,7 @@ document.addEventListener('DOMContentLoaded', () => {
     loadMarketOverview();
     updateUserUI();
     IdeaManager.init();
+    PriceFeed.connect();
     if (jwtToken) {
         fetchWatchlists();
     }
@@ -118,9 +120,12 @@ function renderPopularStocks(stocks) {
 
 async function loadChartForSymbol(symbol) {
     try {
-        const res = await fetch(`${API_URL}/chart-data?symbol=${encodeURIComponent(symbol)}`);
+        const res = await fetch(`${API_URL}/chart-data?symbol=${encodeURIComponent(symbol)}&format=columnar`);
         if (res.ok) {
-            const data = await res.json();
+            const cols = await res.json();
+            const data = cols.time.map((time, i) => ({
+                time, open: cols.open[i], high: cols.high[i], low: cols.low[i], close: cols.close[i]
+            }));
             candlestickSeries.setData(data);
             chart.timeScale().fitContent();
         }
@@ -145,6 +150,9 @@ function setupEventListeners() {
 
     document.getElementById('watchlistSelect').onchange = (e) => selectWatchlist(e.target.value);
     document.getElementById('addWatchlistBtn').onclick = addWatchlist;
+    const importFile = document.getElementById('importWatchlistFile');
+    document.getElementById('importWatchlistBtn').onclick = () => importFile.click();
+    importFile.onchange = (e) => importWatchlistFile(e.target);
 
     // Auth
     if (document.getElementById('login-btn')) {
@@ -180,9 +188,7 @@ async function handleSearch(query) {
 
     searchTimeout = setTimeout(async () => {
         try {
-            const useAuth = jwtToken || totpCode;
-            const endpoint = useAuth ? `${API_URL}/search` : `${API_URL}/search-public`;
-            const res = await fetch(`${endpoint}?query=${encodeURIComponent(query)}`, { headers: getHeaders() });
+            const res = await fetch(`${API_URL}/search-public?query=${encodeURIComponent(query)}`, { headers: getHeaders() });
             if (res.status === 401) return handleAuthError();
             const results = await res.json();
 
@@ -491,21 +497,35 @@ async function addTickerToWatchlist(symbol, name, type) {
     fetchDashboardData();
 }
 
+// Loads all watchlists with their tickers from /watchlists/full (following the cursor).
+// The endpoint sends ETags, so unchanged pages come back as 304 from the browser cache.
+async function loadWatchlistsFull() {
+    const lists = [];
+    let cursor = null;
+    do {
+        const query = cursor ? `?cursor=${cursor}` : '';
+        const res = await fetch(`${API_URL}/watchlists/full${query}`, { headers: getHeaders() });
+        if (res.status === 401) return null;
+        const page = await res.json();
+        lists.push(...page.watchlists);
+        cursor = page.next_cursor;
+    } while (cursor);
+    watchlistData = Object.fromEntries(lists.map(l => [l.id, l.tickers]));
+    return lists;
+}
+
 async function fetchWatchlists() {
     try {
-        const res = await fetch(`${API_URL}/watchlists`, {
-            headers: getHeaders()
-        });
-        if (res.status === 401) {
+        const lists = await loadWatchlistsFull();
+        if (lists === null) {
             if (handleAuthError()) fetchWatchlists();
             return;
         }
-        const lists = await res.json();
         const select = document.getElementById('watchlistSelect');
         select.innerHTML = lists.map(l => `<option value="${l.id}">${l.name}</option>`).join('');
         if (lists.length > 0) {
             activeWatchlistId = lists[0].id;
-            fetchDashboardData();
+            updateWatchlist(watchlistData[activeWatchlistId]);
         } else {
             addWatchlist("Main");
         }
@@ -522,26 +542,92 @@ async function addWatchlist(nameArg) {
     fetchWatchlists();
 }
 
+// Uploads a symbol list / broker CSV into the active watchlist in one request
+async function importWatchlistFile(input) {
+    const file = input.files[0];
+    input.value = '';
+    if (!file || !activeWatchlistId) return;
+    const form = new FormData();
+    form.append('file', file);
+    const headers = getHeaders();
+    delete headers['Content-Type'];
+    const res = await fetch(`${API_URL}/watchlists/${activeWatchlistId}/tickers/import`, {
+        method: 'POST',
+        headers,
+        body: form
+    });
+    if (res.status === 401) return handleAuthError();
+    const result = await res.json();
+    if (!res.ok) return alert('Import fehlgeschlagen: ' + (result.detail || res.status));
+    let message = `${result.added} Symbole hinzugefügt.`;
+    if (result.invalid && result.invalid.length) message += `\nUnbekannt: ${result.invalid.join(', ')}`;
+    alert(message);
+    fetchDashboardData();
+}
+
 function selectWatchlist(id) {
     activeWatchlistId = id;
-    fetchDashboardData();
+    // Tickers of every list are already loaded
+    updateWatchlist(watchlistData[id]);
 }
 
 
 
+// --- Live Prices (WebSocket push) ---
+const PriceFeed = {
+    socket: null,
+    symbols: new Set(),
+
+    connect() {
+        if (location.protocol === 'file:') return;
+        const proto = location.protocol === 'https:' ? 'wss' : 'ws';
+        this.socket = new WebSocket(`${proto}://${location.host}/ws/prices`);
+        this.socket.onopen = () => this.send('subscribe', [...this.symbols]);
+        this.socket.onmessage = (e) => this.apply(JSON.parse(e.data).prices || {});
+        this.socket.onclose = () => setTimeout(() => this.connect(), 5000);
+    },
+
+    // Replaces the watched symbol set, (un)subscribing only the difference
+    watch(symbols) {
+        const next = new Set(symbols);
+        const removed = [...this.symbols].filter(s => !next.has(s));
+        const added = [...next].filter(s => !this.symbols.has(s));
+        this.symbols = next;
+        this.send('unsubscribe', removed);
+        this.send('subscribe', added);
+    },
+
+    send(action, symbols) {
+        if (symbols.length && this.socket && this.socket.readyState === WebSocket.OPEN) {
+            this.socket.send(JSON.stringify({ action, symbols }));
+        }
+    },
+
+    apply(prices) {
+        Object.entries(prices).forEach(([symbol, q]) => {
+            document.querySelectorAll(`.list-item[data-symbol="${symbol}"]`).forEach(el => {
+                const price = el.querySelector('.price');
+                const change = el.querySelector('.change');
+                if (price) price.innerText = q.price.toFixed(2);
+                if (change) {
+                    change.innerText = `${q.change.toFixed(2)}%`;
+                    change.className = `change ${q.change >= 0 ? 'positive' : 'negative'}`;
+                }
+            });
+        });
+    }
+};
+
 // --- Dashboard Data ---
 async function fetchDashboardData() {
     if (!activeWatchlistId) return;
     try {
-        const res = await fetch(`${API_URL}/watchlists/${activeWatchlistId}/tickers`, {
-            headers: getHeaders()
-        });
-        if (res.status === 401) {
+        const lists = await loadWatchlistsFull();
+        if (lists === null) {
             handleAuthError();
             return;
         }
-        const tickers = await res.json();
-        updateWatchlist(tickers);
+        updateWatchlist(watchlistData[activeWatchlistId]);
     } catch (e) { console.error('Dashboard data error:', e); }
 }
 
@@ -561,6 +647,35 @@ const IdeaManager = {
         this.tabs.push(tab);
         this.renderTabs();
         this.selectTab(id);
+        return tab;
+    },
+
+    // Consumes a research SSE stream: header opens the tab, rows are appended as they arrive
+    async streamTab(res) {
+        const reader = res.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        let tab = null;
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+            let sep;
+            while ((sep = buffer.indexOf('\n\n')) >= 0) {
+                const lines = buffer.slice(0, sep).split('\n');
+                buffer = buffer.slice(sep + 2);
+                const event = (lines.find(l => l.startsWith('event: ')) || '').slice(7);
+                const data = JSON.parse((lines.find(l => l.startsWith('data: ')) || 'data: {}').slice(6));
+                if (event === 'header') {
+                    tab = this.addTab(data.title, { summary: data.summary, columns: data.columns, data: [], errors: [] });
+                } else if (tab && event === 'row') {
+                    tab.results.data.push(data.data);
+                } else if (tab && event === 'error') {
+                    tab.results.errors.push({ symbol: data.symbol, error: data.error });
+                }
+                if (tab && tab.id === this.activeTabId) this.renderContent();
+            }
+        }
     },
 
     removeTab(id, e) {
@@ -628,6 +743,14 @@ const IdeaManager = {
         }
 
         this.contentContainer.innerHTML = html;
+
+        if (results.errors && results.errors.length > 0) {
+            // textContent: symbols and upstream error texts are not trusted markup
+            const errors = document.createElement('p');
+            errors.className = 'empty-state';
+            errors.textContent = `Nicht analysiert: ${results.errors.map(e => `${e.symbol} (${e.error})`).join(', ')}`;
+            this.contentContainer.appendChild(errors);
+        }
     }
 };
 
@@ -637,7 +760,7 @@ async function executeCommand() {
     if (!cmd) return;
 
     try {
-        const res = await fetch(`${API_URL}/command?text=${encodeURIComponent(cmd)}`, {
+        const res = await fetch(`${API_URL}/command?text=${encodeURIComponent(cmd)}&stream=true`, {
             method: 'POST',
             headers: getHeaders()
         });
@@ -647,12 +770,22 @@ async function executeCommand() {
             return;
         }
 
+        if ((res.headers.get('Content-Type') || '').startsWith('text/event-stream')) {
+            input.value = '';
+            await IdeaManager.streamTab(res);
+            return;
+        }
+
         const data = await res.json();
 
         if (data.action === 'research') {
             IdeaManager.addTab(data.title, data.results);
+        } else if (data.action === 'filter' && data.status === 'warming_up') {
+            alert(data.message);
         } else if (data.action === 'filter' && data.results) {
             renderFilterResults(data.results);
+        } else if (data.action === 'status') {
+            renderPortfolio(data);
         } else if (Array.isArray(data)) {
             updateCandidates(data);
         } else if (data.message) {
@@ -677,11 +810,12 @@ function updateWatchlist(tickers) {
         container.innerHTML = '<p class="empty-state">Suche eine Aktie und füge sie hinzu.</p>';
         return;
     }
+    PriceFeed.watch(tickers.map(t => t.symbol));
     container.innerHTML = tickers.map(t => `
-        <div class="list-item" onclick="loadChartForSymbol('${t.symbol}')">
+        <div class="list-item" data-symbol="${t.symbol}" onclick="loadChartForSymbol('${t.symbol}')">
             <span class="symbol">${t.symbol}</span>
-            <span class="price">${(t.last_price || 0).toFixed(2)}</span>
-            <span class="change ${(t.change_pct || 0) >= 0 ? 'positive' : 'negative'}">${(t.change_pct || 0).toFixed(2)}%</span>
+            <span class="price">${t.last_price != null ? t.last_price.toFixed(2) : '–'}</span>
+            <span class="change ${(t.change_pct || 0) >= 0 ? 'positive' : 'negative'}">${t.change_pct != null ? t.change_pct.toFixed(2) + '%' : ''}</span>
         </div>
     `).join('');
 }
@@ -706,6 +840,31 @@ function renderFilterResults(results) {
     `).join('');
 }
 
+function renderPortfolio({ summary, positions }) {
+    const container = document.getElementById('candidates-list');
+    const fmt = v => v == null ? 'N/A' : v.toFixed(2);
+    const header = `
+        <div class="list-item">
+            <span class="symbol">P&L</span>
+            <span class="change ${summary.total_pnl >= 0 ? 'positive' : 'negative'}">${fmt(summary.total_pnl)}</span>
+            <span class="stock-name">${summary.open_trades} offen / ${summary.closed_trades} geschlossen</span>
+        </div>`;
+    if (!positions.length) {
+        container.innerHTML = header + '<p class="empty-state">Keine offenen Positionen.</p>';
+        return;
+    }
+    container.innerHTML = header + positions.map(p => `
+        <div class="list-item" onclick="loadChartForSymbol('${p.symbol}')">
+            <div>
+                <span class="symbol">${p.symbol}</span>
+                <span class="stock-name">${p.side === 'buy' ? 'Long' : 'Short'} ${p.quantity}</span>
+            </div>
+            <span class="price">${fmt(p.mark_price)}</span>
+            <span class="change ${(p.unrealized_pnl || 0) >= 0 ? 'positive' : 'negative'}">${fmt(p.unrealized_pnl)}</span>
+        </div>
+    `).join('');
+}
+
 function updateCandidates(list) {
     const container = document.getElementById('candidates-list');
     container.innerHTML = list.map(item => `
@@ -714,7 +873,8 @@ function updateCandidates(list) {
                 <span class="light ${item.traffic_light}"></span>
                 <span class="symbol">${item.ticker.symbol}</span>
             </div>
-            <span class="change negative">${item.ticker.change_pct.toFixed(2)}%</span>
+            <span class="change ${item.ticker.change_pct >= 0 ? 'positive' : 'negative'}">${item.ticker.change_pct.toFixed(2)}%</span>
+            ${item.metrics && item.metrics.gap_pct != null ? `<span class="change" title="Gap / ATR: ${item.metrics.gap_z != null ? item.metrics.gap_z.toFixed(1) : '-'}">Gap ${item.metrics.gap_pct.toFixed(2)}%</span>` : ''}
             <button class="trade-btn" onclick="trade('${item.ticker.symbol}')">Trade</button>
         </div>
     `).join('');
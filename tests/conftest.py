@@ -0,0 +1,58 @@
+import os
+import tempfile
+
+# The app reads DB_FILE at import time: point it at a throwaway database before anything imports backend
+_db_dir = tempfile.mkdtemp(prefix="findash-tests-")
+os.environ["DB_FILE"] = os.path.join(_db_dir, "test.db")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import delete
+from sqlmodel import Session
+
+from backend import models
+from backend.database import create_db_and_tables, engine
+
+@pytest.fixture(scope="session")
+def db():
+    create_db_and_tables()
+    return engine
+
+@pytest.fixture
+def session(db):
+    with Session(db) as session:
+        yield session
+    with Session(db) as cleanup:
+        for table in (models.Trade, models.PositionAggregate, models.WatchlistTickerLink, models.Watchlist, models.Ticker):
+            cleanup.execute(delete(table))
+        cleanup.commit()
+
+class FakeFetcher:
+    """DataFetcher stand-in serving fixed quotes; records each batched call."""
+
+    def __init__(self, quotes):
+        self.quotes = quotes
+        self.calls = []
+
+    async def fetch_stocks(self, symbols):
+        self.calls.append(("stocks", list(symbols)))
+        return {s: self.quotes[s] for s in symbols if s in self.quotes}
+
+    async def fetch_crypto(self, symbols):
+        self.calls.append(("crypto", list(symbols)))
+        return {s: self.quotes[s] for s in symbols if s in self.quotes}
+
+@pytest.fixture
+def client():
+    from backend.auth import get_active_username
+    from backend.main import app
+    from backend.services import get_data_fetcher, get_market_search
+
+    fetcher = FakeFetcher({"AAPL": {"price": 120.0, "change": 1.0}, "BTCUSDT": {"price": 50000.0, "change": 0.5}})
+    app.dependency_overrides[get_data_fetcher] = lambda: fetcher
+    app.dependency_overrides[get_market_search] = lambda: None
+    app.dependency_overrides[get_active_username] = lambda: "guest"
+    # No `with`: the lifespan (background jobs, price hub) is not started
+    yield TestClient(app), fetcher
+    app.dependency_overrides.clear()
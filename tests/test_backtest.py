@@ -0,0 +1,109 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.backtest import evaluate, run_grid, shutdown_grid_pool, trade_returns
+from backend.gap_matrix import GapMatrix
+
+FEE = 0.002
+
+def _matrix(opens, closes) -> GapMatrix:
+    opens, closes = np.atleast_2d(np.asarray(opens, dtype=float)), np.atleast_2d(np.asarray(closes, dtype=float))
+    bars = {
+        "Open": opens, "Close": closes,
+        "High": np.maximum(opens, closes), "Low": np.minimum(opens, closes), "Volume": np.ones_like(closes),
+    }
+    dates = np.datetime64("2026-01-05") + np.arange(opens.shape[1])
+    return GapMatrix([f"S{i}" for i in range(len(opens))], bars, dates)
+
+def test_trade_returns_same_day():
+    # Day 1 gaps down 10% (buy 90, close 100), day 2 does not gap, day 3 gaps up 10% (short 110, close 100)
+    matrix = _matrix([100, 90, 100, 110], [100, 100, 100, 100])
+    fade = trade_returns(matrix, 5.0, 0, "fade", FEE)
+    np.testing.assert_allclose(fade, [[100 / 90 - 1 - FEE, np.nan, 1 - 100 / 110 - FEE]])
+    follow = trade_returns(matrix, 5.0, 0, "follow", FEE)
+    np.testing.assert_allclose(follow, [[1 - 100 / 90 - FEE, np.nan, 100 / 110 - 1 - FEE]])
+    assert np.isnan(trade_returns(matrix, 15.0, 0, "fade", FEE)).all()
+
+def test_trade_returns_hold_exits_later_and_drops_open_trades():
+    matrix = _matrix([100, 90, 96, 110], [100, 95, 100, 100])
+    # Entry at day 1's open, exit at day 2's close; the day 3 entry has no exit in the data
+    np.testing.assert_allclose(trade_returns(matrix, 5.0, 1, "fade", FEE), [[100 / 90 - 1 - FEE, np.nan, np.nan]])
+
+def test_multi_day_holds_use_hold_days_plus_one_sleeves():
+    # Every day gaps down 10% and closes at 100: each trade returns 1/9
+    matrix = _matrix([100, 90, 90, 90, 90], [100] * 5)
+    held = evaluate(matrix, 5.0, hold_days=1, fee_rate=0.0)
+    assert held["trades"] == 3
+    assert held["hit_rate"] == 100.0
+    assert held["avg_return_pct"] == pytest.approx(11.111)
+    # Two overlapping sleeves of half the capital each: (1 + 1/18)^3, not (1 + 1/9)^3 = 37.17%
+    assert held["total_return_pct"] == 17.61
+    assert [p["equity"] for p in held["equity_curve"]] == pytest.approx([1.0, 19 / 18, (19 / 18) ** 2, (19 / 18) ** 3], abs=1e-5)
+
+    same_day = evaluate(matrix, 5.0, hold_days=0, fee_rate=0.0)
+    assert same_day["trades"] == 4
+    assert same_day["total_return_pct"] == pytest.approx(((10 / 9) ** 4 - 1) * 100, abs=0.005)
+
+def test_trades_of_one_day_share_the_capital():
+    # Both gap down 10%; S0 recovers to 100 (+11.1%), S1 falls to 81 (-10%)
+    matrix = _matrix([[100, 90], [100, 90]], [[100, 100], [100, 81]])
+    result = evaluate(matrix, 5.0, fee_rate=0.0)
+    assert result["trades"] == 2
+    assert result["hit_rate"] == 50.0
+    assert result["total_return_pct"] == pytest.approx((1 / 9 - 0.1) / 2 * 100, abs=0.005)
+
+def test_drawdown():
+    # Day 1: buy 90, close 81 (-10%); day 2 gaps up 11% from 81 to 90: short 90, close 90 (0%)
+    result = evaluate(_matrix([100, 90, 90], [100, 81, 90]), 5.0, fee_rate=0.0)
+    assert result["trades"] == 2
+    assert result["total_return_pct"] == -10.0
+    assert result["max_drawdown_pct"] == -10.0
+
+def _daily(dates, gap_days=()) -> pd.DataFrame:
+    """Bars closing at 100 each day; on `gap_days` the open gaps down 10%."""
+    opens = np.where(np.isin(dates, pd.DatetimeIndex(gap_days)), 90.0, 100.0)
+    return pd.DataFrame(
+        {"Open": opens, "High": 100.0, "Low": opens, "Close": 100.0, "Volume": 1.0}, index=dates
+    )
+
+def test_stocks_and_crypto_trade_on_their_own_sessions():
+    weekdays = pd.bdate_range("2026-01-05", periods=25)
+    mondays = weekdays[weekdays.dayofweek == 0][1:]
+    stock = _daily(weekdays, mondays)
+    crypto = _daily(pd.date_range("2026-01-05", weekdays[-1]))
+    alone = GapMatrix.from_frames({"AAPL": stock}, None)
+    mixed = GapMatrix.from_frames({"AAPL": stock, "BTCUSDT": crypto}, None)
+
+    # Monday's previous close is Friday's, not the (missing) Sunday column
+    assert evaluate(alone, 5.0, fee_rate=0.0)["trades"] == len(mondays) == 4
+    result = evaluate(mixed, 5.0, fee_rate=0.0)
+    assert result["trades"] == 4
+    assert result["total_return_pct"] == pytest.approx(((10 / 9) ** 4 - 1) * 100, abs=0.005)
+    assert result["equity_curve"][-1]["time"] == int(weekdays[-1].timestamp())
+    returns = trade_returns(mixed, 5.0, 0, "fade", FEE)
+    np.testing.assert_allclose(returns[0][~np.isnan(returns[0])], np.full(4, 1 / 0.9 - 1 - FEE))
+
+    # hold_days counts the stock's sessions: a Friday entry held one session exits Monday
+    fridays = weekdays[weekdays.dayofweek == 4][:1]
+    stock = _daily(weekdays, fridays)
+    stock.loc[fridays[0] + pd.Timedelta(days=3), "Close"] = 110.0
+    matrix = GapMatrix.from_frames({"AAPL": stock, "BTCUSDT": crypto}, None)
+    held = trade_returns(matrix, 5.0, 1, "fade", 0.0)
+    friday = int(np.flatnonzero(matrix.dates == np.datetime64(fridays[0]))[0]) - 1
+    assert held[0][friday] == pytest.approx(110 / 90 - 1)
+
+def test_grid_matches_single_evaluations():
+    rng = np.random.default_rng(0)
+    closes = 100 * np.cumprod(1 + rng.normal(0, 0.02, (5, 120)), axis=1)
+    opens = closes * (1 + rng.normal(0, 0.03, closes.shape))
+    matrix = _matrix(opens, closes)
+    expected = sorted(
+        (evaluate(matrix, t, h, include_curve=False) for t in (2.0, 4.0) for h in (0, 2)),
+        key=lambda r: r["total_return_pct"], reverse=True,
+    )
+    assert run_grid(matrix, [2.0, 4.0], [0, 2], max_workers=1) == expected
+    try:
+        assert run_grid(matrix, [2.0, 4.0], [0, 2], max_workers=2) == expected
+    finally:
+        shutdown_grid_pool()
@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+
+from backend.gap_matrix import GapMatrix, compute_gap_metrics
+
+def _bars(dates, close=100.0, last_open=None):
+    frame = pd.DataFrame(
+        {"Open": close, "High": close + 1, "Low": close - 1, "Close": close, "Volume": 1000.0},
+        index=pd.DatetimeIndex(dates),
+    )
+    if last_open is not None:
+        frame.iloc[-1, frame.columns.get_loc("Open")] = last_open
+    return frame
+
+def test_gap_on_the_symbols_own_last_bar():
+    dates = pd.bdate_range("2026-01-05", periods=30)
+    # B lacks A's newest date; its own newest bar opens 8% above the previous close
+    matrix = GapMatrix.from_frames({"A": _bars(dates), "B": _bars(dates[:-1], last_open=108.0)})
+    metrics = compute_gap_metrics(matrix)
+    np.testing.assert_allclose(metrics["gap_pct"], [0.0, 8.0])
+    np.testing.assert_allclose(metrics["change_pct"], [0.0, 0.0])
+    np.testing.assert_allclose(metrics["price"], [100.0, 100.0])
+    np.testing.assert_allclose(metrics["atr_pct"], [2.0, 2.0])
+    np.testing.assert_allclose(metrics["gap_z"], [0.0, 4.0])
+
+def test_missing_days_inside_the_history_are_skipped():
+    dates = pd.bdate_range("2026-01-05", periods=30)
+    gappy = _bars(dates.delete([10, 20]), last_open=95.0)
+    metrics = compute_gap_metrics(GapMatrix.from_frames({"A": _bars(dates), "B": gappy}))
+    np.testing.assert_allclose(metrics["gap_pct"], [0.0, -5.0])
+    np.testing.assert_allclose(metrics["volume_ratio"], [1.0, 1.0])
+
+def test_stale_symbols_get_no_metrics():
+    dates = pd.bdate_range("2026-01-05", periods=30)
+    matrix = GapMatrix.from_frames({"A": _bars(dates), "B": _bars(dates[:-5], last_open=110.0)})
+    metrics = compute_gap_metrics(matrix, max_lag=3)
+    assert metrics["gap_pct"][0] == 0.0
+    assert np.isnan(metrics["gap_pct"][1]) and np.isnan(metrics["price"][1])
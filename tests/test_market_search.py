@@ -0,0 +1,38 @@
+import time
+
+import pytest
+
+from backend.market_search import MarketSearch
+
+class FakeBinance:
+    def __init__(self):
+        self.calls = 0
+        self.down = False
+
+    def get_exchange_info(self):
+        self.calls += 1
+        if self.down:
+            raise ConnectionError("Binance down")
+        return {"symbols": [{"symbol": "BTCUSDT", "baseAsset": "BTC", "quoteAsset": "USDT"}]}
+
+def test_failed_index_rebuilds_back_off():
+    client = FakeBinance()
+    search = MarketSearch(client, refresh_interval=0.0, retry_interval=0.5)
+    assert search.is_known_crypto("btcusdt")
+    client.down = True
+    time.sleep(0.55)
+    # One background attempt for the whole burst of keystrokes; the old index keeps serving
+    for _ in range(20):
+        assert search._search_crypto("BTC")[0]["symbol"] == "BTCUSDT"
+        time.sleep(0.005)
+    time.sleep(0.05)
+    assert client.calls == 2
+
+def test_failed_first_build_backs_off():
+    client = FakeBinance()
+    client.down = True
+    search = MarketSearch(client, retry_interval=60.0)
+    for _ in range(3):
+        with pytest.raises(Exception):
+            search.is_known_crypto("BTCUSDT")
+    assert client.calls == 1
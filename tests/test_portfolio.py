@@ -0,0 +1,117 @@
+from datetime import datetime
+
+import pytest
+from sqlmodel import Session
+
+from backend.migrations import backfill_position_aggregates
+from backend.models import PositionAggregate, Ticker, Trade
+from backend.portfolio import Portfolio
+from backend.strategy import Strategy
+
+def _aggregate(session: Session, symbol: str, side: str) -> dict:
+    session.expire_all()
+    row = session.get(PositionAggregate, (symbol, side))
+    return {
+        "open_trades": row.open_trades,
+        "open_quantity": row.open_quantity,
+        "open_cost": row.open_cost,
+        "open_fees": pytest.approx(row.open_fees),
+        "closed_trades": row.closed_trades,
+        "winning_trades": row.winning_trades,
+        "realized_pnl": pytest.approx(row.realized_pnl),
+    }
+
+def test_open_and_close_update_the_aggregates(session):
+    strategy = Strategy(session)
+    first = strategy.execute_paper_trade("AAPL", 10, 100.0, "buy")  # fees 2.00
+    strategy.execute_paper_trade("AAPL", 5, 110.0, "buy")  # fees 1.10
+    assert _aggregate(session, "AAPL", "buy") == {
+        "open_trades": 2, "open_quantity": 15, "open_cost": 1550.0, "open_fees": 3.1,
+        "closed_trades": 0, "winning_trades": 0, "realized_pnl": 0.0,
+    }
+
+    closed = Portfolio(session).close_trade(first, 120.0)
+    assert closed.status == "closed"
+    assert closed.p_and_l == pytest.approx(20 * 10 - 2.0)
+    assert _aggregate(session, "AAPL", "buy") == {
+        "open_trades": 1, "open_quantity": 5, "open_cost": 550.0, "open_fees": 1.1,
+        "closed_trades": 1, "winning_trades": 1, "realized_pnl": 198.0,
+    }
+
+    # Short side: a rising price is a loss
+    short = strategy.execute_paper_trade("TSLA", 2, 200.0, "sell")  # fees 0.80
+    Portfolio(session).close_trade(short, 210.0)
+    assert _aggregate(session, "TSLA", "sell") == {
+        "open_trades": 0, "open_quantity": 0, "open_cost": 0.0, "open_fees": 0.0,
+        "closed_trades": 1, "winning_trades": 0, "realized_pnl": -20.8,
+    }
+
+def test_closing_a_stale_copy_books_nothing(session):
+    trade = Strategy(session).execute_paper_trade("AAPL", 1, 100.0, "buy")
+    with Session(session.get_bind()) as other:
+        # Loaded by a concurrent request before the first close lands
+        stale = other.get(Trade, trade.id)
+        Portfolio(session).close_trade(trade, 110.0)
+        with pytest.raises(ValueError):
+            Portfolio(other).close_trade(stale, 120.0)
+    assert _aggregate(session, "AAPL", "buy")["closed_trades"] == 1
+    assert _aggregate(session, "AAPL", "buy")["realized_pnl"] == pytest.approx(10 - 0.2)
+
+def test_positions_marked_to_quotes_with_ticker_fallback(session):
+    strategy = Strategy(session)
+    strategy.execute_paper_trade("AAPL", 10, 100.0, "buy")  # fees 2.00
+    strategy.execute_paper_trade("MSFT", 1, 300.0, "buy")  # fees 0.60
+    strategy.execute_paper_trade("NVDA", 4, 50.0, "sell")  # fees 0.40
+    # Stale scan price for AAPL is ignored when a quote exists; MSFT only has the Ticker row
+    session.add(Ticker(symbol="AAPL", last_price=90.0, change_pct=0.0, updated_at=datetime.utcnow()))
+    session.add(Ticker(symbol="MSFT", last_price=310.0, change_pct=0.0, updated_at=datetime.utcnow()))
+    session.commit()
+
+    quotes = {"AAPL": {"price": 105.0, "updated_at": datetime.utcnow()}}
+    portfolio = Portfolio(session)
+    assert portfolio.open_symbols() == ["AAPL", "MSFT", "NVDA"]
+    positions = {p["symbol"]: p for p in portfolio.positions(quotes=quotes)}
+    assert positions["AAPL"]["mark_price"] == 105.0
+    assert positions["AAPL"]["unrealized_pnl"] == pytest.approx(1050 - 1000 - 2.0)
+    assert positions["MSFT"]["mark_price"] == 310.0
+    assert positions["MSFT"]["unrealized_pnl"] == pytest.approx(310 - 300 - 0.6)
+    assert positions["NVDA"]["mark_price"] is None
+
+    summary = portfolio.summary(quotes)
+    assert summary["unrealized_pnl"] == pytest.approx(48.0 + 9.4)
+    assert summary["exposure"] == pytest.approx(1050 + 310)
+    assert summary["unmarked_positions"] == ["NVDA"]
+
+def test_backfill_builds_aggregates_from_existing_trades(session):
+    session.add_all([
+        Trade(symbol="AAPL", side="buy", quantity=10, entry_price=100.0, fees=2.0, status="open"),
+        Trade(symbol="AAPL", side="buy", quantity=5, entry_price=90.0, fees=0.9, status="closed", exit_price=99.0, p_and_l=44.1),
+        Trade(symbol="AAPL", side="buy", quantity=1, entry_price=90.0, fees=0.18, status="closed", exit_price=80.0, p_and_l=-10.18),
+        Trade(symbol="TSLA", side="sell", quantity=2, entry_price=200.0, fees=0.8, status="open"),
+    ])
+    session.commit()
+    with session.get_bind().begin() as conn:
+        backfill_position_aggregates(conn)
+    assert _aggregate(session, "AAPL", "buy") == {
+        "open_trades": 1, "open_quantity": 10, "open_cost": 1000.0, "open_fees": 2.0,
+        "closed_trades": 2, "winning_trades": 1, "realized_pnl": 33.92,
+    }
+    assert _aggregate(session, "TSLA", "sell")["open_cost"] == 400.0
+
+def test_api_marks_with_one_batched_lookup_and_rejects_a_double_close(session, client):
+    http, fetcher = client
+    strategy = Strategy(session)
+    trade = strategy.execute_paper_trade("AAPL", 10, 100.0, "buy")
+    strategy.execute_paper_trade("BTCUSDT", 0.1, 40000.0, "buy")
+
+    summary = http.get("/trades/summary").json()
+    assert sorted(fetcher.calls) == [("crypto", ["BTCUSDT"]), ("stocks", ["AAPL"])]
+    assert summary["unrealized_pnl"] == pytest.approx((1200 - 1000 - 2.0) + (5000 - 4000 - 8.0))
+    assert summary["unmarked_positions"] == []
+
+    first = http.post(f"/trades/{trade.id}/close", params={"exit_price": 120.0})
+    assert first.status_code == 200
+    assert first.json()["trade"]["p_and_l"] == pytest.approx(198.0)
+    second = http.post(f"/trades/{trade.id}/close", params={"exit_price": 125.0})
+    assert second.status_code == 409
+    assert http.get("/trades/summary").json()["realized_pnl"] == pytest.approx(198.0)
@@ -0,0 +1,86 @@
+import asyncio
+import json
+
+import pytest
+from fastapi import WebSocketDisconnect
+
+from backend.price_hub import FakePriceSource, PriceHub, PriceSource
+
+class FakeWebSocket:
+    """Accepted connection: `send` queues a client message, `close` disconnects, sent frames land in `sent`."""
+
+    def __init__(self):
+        self.incoming: asyncio.Queue = asyncio.Queue()
+        self.sent = []
+
+    def send(self, message):
+        self.incoming.put_nowait(message)
+
+    def close(self):
+        self.incoming.put_nowait(None)
+
+    async def receive_text(self):
+        message = await self.incoming.get()
+        if message is None:
+            raise WebSocketDisconnect()
+        return json.dumps(message)
+
+    async def send_json(self, data):
+        self.sent.append(data)
+
+    def prices(self):
+        return [{symbol: quote["price"] for symbol, quote in frame["prices"].items()} for frame in self.sent]
+
+def test_price_source_requires_run():
+    with pytest.raises(TypeError):
+        PriceSource()
+
+def test_hub_subscribe_throttle_coalesce_unsubscribe():
+    async def scenario():
+        source = FakePriceSource(interval=3600)
+        # At most 5 frames per second per client: one frame, then 200 ms quiet
+        hub = PriceHub(source, source, max_updates_per_second=5)
+        await hub.start()
+        a, b = FakeWebSocket(), FakeWebSocket()
+        serving = [asyncio.create_task(hub.serve(a)), asyncio.create_task(hub.serve(b))]
+
+        a.send({"action": "subscribe", "symbols": ["aapl", "BTCUSDT"]})
+        b.send({"action": "subscribe", "symbols": ["AAPL"]})
+        await asyncio.sleep(0.02)
+        # One upstream subscription per symbol, however many clients want it
+        assert source.symbols == {"AAPL", "BTCUSDT"}
+
+        # Ticks published before the sender runs are coalesced: only the latest price goes out
+        for price in (101.0, 102.0, 103.0):
+            source.push("AAPL", price)
+        await asyncio.sleep(0.02)
+        assert a.prices() == [{"AAPL": 103.0}]
+        assert b.prices() == [{"AAPL": 103.0}]
+
+        # Within the throttle interval nothing is sent; afterwards the latest tick is
+        source.push("AAPL", 104.0)
+        source.push("BTCUSDT", 50000.0)
+        source.push("AAPL", 105.0)
+        await asyncio.sleep(0.05)
+        assert len(a.sent) == 1
+        await asyncio.sleep(0.25)
+        assert a.prices()[1:] == [{"AAPL": 105.0, "BTCUSDT": 50000.0}]
+        assert b.prices()[1:] == [{"AAPL": 105.0}]
+
+        # The upstream subscription ends with the last client of a symbol
+        a.send({"action": "unsubscribe", "symbols": ["AAPL"]})
+        await asyncio.sleep(0.02)
+        assert source.symbols == {"AAPL", "BTCUSDT"}
+        b.close()
+        await asyncio.sleep(0.02)
+        assert source.symbols == {"BTCUSDT"}
+        source.push("AAPL", 106.0)
+        await asyncio.sleep(0.25)
+        assert all("AAPL" not in frame for frame in a.prices()[2:])
+
+        a.close()
+        await asyncio.gather(*serving)
+        assert source.symbols == set()
+        await hub.stop()
+
+    asyncio.run(scenario())
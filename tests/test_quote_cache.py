@@ -0,0 +1,25 @@
+import asyncio
+
+from backend.quote_cache import QuoteCache
+
+def test_empty_values_are_cached_failures_are_not():
+    async def scenario():
+        cache = QuoteCache()
+        calls = []
+
+        async def fetch_many(symbols):
+            calls.append(list(symbols))
+            # A: legitimately empty, B: upstream failed (None), C: not returned at all
+            return {"A": {"published": []}, "B": None}
+
+        assert await cache.get_many("news", ["A", "B", "C"], fetch_many) == {"A": {"published": []}}
+        assert await cache.get_many("news", ["A", "B", "C"], fetch_many) == {"A": {"published": []}}
+        assert calls == [["A", "B", "C"], ["B", "C"]]
+
+        async def failed():
+            return None
+
+        assert await cache.get("overview", "market", failed) is None
+        assert cache.stats()["entries"] == 1
+
+    asyncio.run(scenario())
@@ -0,0 +1,47 @@
+import pytest
+
+from backend.universe import is_crypto, is_ticker, parse_symbols, yahoo_symbol
+
+def test_comma_and_space_separated_lists():
+    assert parse_symbols("AAPL,MSFT,TSLA") == ["AAPL", "MSFT", "TSLA"]
+    assert parse_symbols("AAPL MSFT") == ["AAPL", "MSFT"]
+    assert parse_symbols("aapl; msft\ttsla\n\nnvda, aapl") == ["AAPL", "MSFT", "TSLA", "NVDA"]
+
+def test_one_symbol_per_line_with_comments():
+    assert parse_symbols("# Tech\nAAPL  # Apple\nbrk.b\n\n^GSPC\n") == ["AAPL", "BRK-B", "^GSPC"]
+
+def test_broker_csv_uses_the_symbol_column():
+    text = 'Name;Ticker;Stück\n"Apple Inc.";AAPL;10\n"Berkshire Hathaway";BRK.B;2\n'
+    assert parse_symbols(text) == ["AAPL", "BRK-B"]
+    text = "Symbol,Description,Quantity\nMSFT,Microsoft,5\nKO,Coca-Cola,12\n"
+    assert parse_symbols(text) == ["MSFT", "KO"]
+
+def test_only_class_share_dots_become_dashes():
+    assert parse_symbols("brk.b, BF.B, SAP.DE, VOD.L, 7203.T, RDS.A") == ["BRK-B", "BF-B", "SAP.DE", "VOD.L", "7203.T", "RDS-A"]
+    assert yahoo_symbol(" sap.de ") == "SAP.DE"
+
+def test_one_column_csv_skips_the_header():
+    assert parse_symbols("Symbol\nAAPL\nMSFT\n") == ["AAPL", "MSFT"]
+    assert parse_symbols('"Ticker"\r\n"SAP"\r\n') == ["SAP"]
+
+def test_csv_without_symbol_column_is_rejected():
+    with pytest.raises(ValueError, match="Symbol"):
+        parse_symbols("Name,Qty\nApple,10")
+    with pytest.raises(ValueError, match="Symbol"):
+        parse_symbols('Wertpapier;ISIN;Stück\n"Apple Inc.";US0378331005;10\n')
+    # Symbol lists spread over several lines are not tables
+    assert parse_symbols("AAPL,MSFT\nTSLA,NVDA") == ["AAPL", "MSFT", "TSLA", "NVDA"]
+    assert parse_symbols("AAPL, 42\nMSFT") == ["AAPL", "MSFT"]
+
+def test_malformed_entries_are_rejected():
+    rejected = []
+    assert parse_symbols("AAPL, ???, 42, EURUSD=X, $TSLA", rejected) == ["AAPL", "EURUSD=X"]
+    assert rejected == ["???", "42", "$TSLA"]
+
+def test_ticker_shapes():
+    assert is_ticker("BRK-B") and is_ticker("SAP.DE") and is_ticker("^GSPC") and is_ticker("BTCUSDT")
+    assert not is_ticker("AAPL MSFT") and not is_ticker("AAPL,MSFT") and not is_ticker("10") and not is_ticker("")
+
+def test_is_crypto():
+    assert is_crypto("BTCUSDT") and is_crypto("ETHBTC")
+    assert not is_crypto("AAPL") and not is_crypto("USDT") and not is_crypto("BRK-B")
@@ -0,0 +1,41 @@
+from sqlmodel import select
+
+from backend.models import Ticker
+
+def test_full_marks_tickers_from_the_quote_cache(session, client):
+    http, fetcher = client
+    watchlist = http.post("/watchlists", params={"name": "Main"}).json()
+    added = http.post(
+        f"/watchlists/{watchlist['id']}/tickers/batch",
+        json={"symbols": ["AAPL", "BTCUSDT", "MSFT", "SAP.DE"], "validate_symbols": False},
+    ).json()
+    assert added["added"] == 4
+    # MSFT has a scan price but no quote; SAP.DE was never priced
+    msft = session.exec(select(Ticker).where(Ticker.symbol == "MSFT")).one()
+    msft.last_price, msft.change_pct = 310.0, -1.5
+    session.add(msft)
+    session.commit()
+
+    response = http.get("/watchlists/full")
+    assert response.status_code == 200
+    tickers = {t["symbol"]: t for t in response.json()["watchlists"][0]["tickers"]}
+    assert (tickers["AAPL"]["last_price"], tickers["AAPL"]["change_pct"]) == (120.0, 1.0)
+    assert tickers["BTCUSDT"]["last_price"] == 50000.0
+    assert (tickers["MSFT"]["last_price"], tickers["MSFT"]["change_pct"]) == (310.0, -1.5)
+    assert (tickers["SAP.DE"]["last_price"], tickers["SAP.DE"]["change_pct"]) == (None, None)
+    assert sorted(fetcher.calls) == [("crypto", ["BTCUSDT"]), ("stocks", ["AAPL", "MSFT", "SAP.DE"])]
+
+    etag = response.headers["ETag"]
+    assert http.get("/watchlists/full", headers={"If-None-Match": etag}).status_code == 304
+
+def test_import_rejects_a_table_without_symbol_column(session, client):
+    http, _ = client
+    watchlist = http.post("/watchlists", params={"name": "Depot"}).json()
+    response = http.post(
+        f"/watchlists/{watchlist['id']}/tickers/import",
+        params={"validate_symbols": False},
+        files={"file": ("depot.csv", b"Name,Qty\nApple,10\n", "text/csv")},
+    )
+    assert response.status_code == 400
+    assert "Symbol" in response.json()["detail"]
+    assert http.get(f"/watchlists/{watchlist['id']}/tickers").json() == []